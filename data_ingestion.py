@@ -1,33 +1,297 @@
 import argparse
+import cProfile
+import json
+import os
+import pstats
+import time
+import tracemalloc
 from pathlib import Path
-from typing import Sequence
+from typing import Optional, Sequence
 
+from src.common.config import settings
+from src.common.manifest import IngestManifest, canonical_path
+from src.common.pipeline import prefetch
+from src.common.profiling import ingest_profiler, print_report
+from src.common.vector_backends import create_backend
 from src.common.processor import DocumentProcessor
-from src.common.embedding_generator import EmbeddingGenerator
 from src.common.vector_store import VectorStore
 
 # --------------------------------------------------------------------------- #
 # Initialize shared services
 # --------------------------------------------------------------------------- #
 processor = DocumentProcessor()
-embedder = EmbeddingGenerator()
-vector_store = VectorStore()
+# Created on first use, so `--help` and commands that do not need the index
+# or the embedding model start without their SDKs and control-plane calls.
+_vector_store: Optional[VectorStore] = None
 
 
-def update_index_from_path(path: str | Path) -> None:
-    """Ingest files under *path*, embed them, and upsert into the vector store."""
-    processed = processor.process_document(Path(path))
-    embedded = embedder.generate_embeddings(processed)
-    vector_store.upsert_vectors(embedded)
+def get_vector_store(refresh_resources: bool = False) -> VectorStore:
+    """
+    The shared ``VectorStore``. *refresh_resources* re-resolves the Vertex
+    index and endpoint instead of using ``VERTEX_RESOURCE_CACHE_PATH``.
+    """
+    global _vector_store
+    if _vector_store is None or refresh_resources:
+        _vector_store = VectorStore(backend=create_backend(refresh=refresh_resources))
+    return _vector_store
+
+
+# Seconds between manifest checkpoints during a streaming update.
+MANIFEST_SAVE_INTERVAL = 30
+
+
+def update_index_from_path(
+    path: str | Path, full: bool = False, max_in_flight: Optional[int] = None
+) -> None:
+    """
+    Ingest new or changed files under *path*, embed them, and upsert into the
+    vector store. Chunks of changed or deleted files are removed, and the
+    manifest is updated so the next run skips everything already indexed.
+    With *full*, every file is treated as changed.
+
+    Extraction, embedding and upserting run as overlapping stages connected by
+    bounded queues, so memory stays flat and each batch lands in the index as
+    soon as it is embedded. *max_in_flight* caps how many files may be
+    extracted ahead of the embedding stage.
+    """
+    max_in_flight = max_in_flight or settings.INGEST_MAX_IN_FLIGHT
+    ingest_profiler.reset()
+    vector_store = get_vector_store()
+
+    def embed(chunks):
+        # The embedding model is only loaded once there is something to embed.
+        return vector_store._get_embedder().generate_embeddings(chunks)
+
+    manifest = IngestManifest(settings.MANIFEST_PATH)
+    file_paths = processor.list_files(path)
+    if full:
+        changed = {fp: IngestManifest.hash_file(fp) for fp in file_paths}
+        removed = manifest.diff([], root_path=path).removed
+        removed = [fp for fp in removed if fp not in changed]
+    else:
+        diff = manifest.diff(file_paths, root_path=path)
+        changed, removed = diff.changed, diff.removed
+    print(
+        f"{len(file_paths)} files found: {len(changed)} new or changed, "
+        f"{len(removed)} removed"
+    )
+
+    def file_records():
+        """Stage 1: extract and chunk files, keeping only chunks to embed."""
+        for file_path, chunks in processor.iter_processed_files(
+            list(changed), max_in_flight=max_in_flight
+        ):
+            # Files that failed to extract keep their previous chunks and stay
+            # out of the manifest, so the next run retries them.
+            if chunks is None:
+                continue
+            previous = manifest.chunk_indexes(file_path)
+            # Chunk IDs are content-addressed, so chunks whose text did not
+            # change are already in the index and need no new embedding; only
+            # those that moved within the file get their metadata rewritten.
+            to_embed, moved = [], []
+            for c in chunks:
+                previous_index = previous.get(c["metadata"]["chunk_id"])
+                if full or previous_index is None:
+                    to_embed.append(c)
+                elif previous_index != c["metadata"]["chunk_index"]:
+                    moved.append(c)
+            yield {
+                "file_path": file_path,
+                "chunk_ids": [c["metadata"]["chunk_id"] for c in chunks],
+                "chunk_indexes": [c["metadata"]["chunk_index"] for c in chunks],
+                "previous_ids": set(previous),
+                "to_embed": to_embed,
+                "moved": moved,
+            }
+
+    def embedded_batches(records):
+        """
+        Stage 2: embed chunks in upsert-sized batches. Each batch carries the
+        files whose last chunk it contains, so they can be committed to the
+        manifest once the batch has landed.
+        """
+        buffer, completed = [], []
+        for record in records:
+            for chunk in record.pop("to_embed"):
+                buffer.append(chunk)
+                if len(buffer) >= settings.UPSERT_BATCH_SIZE:
+                    yield embed(buffer), completed
+                    buffer, completed = [], []
+            completed.append(record)
+        if buffer or completed:
+            yield (embed(buffer) if buffer else []), completed
+
+    # Stage 3 (this thread): upsert, drop stale chunks, commit files.
+    batches = prefetch(
+        embedded_batches(prefetch(file_records(), max_in_flight)), maxsize=2
+    )
+    n_files = n_chunks = 0
+    last_save = time.monotonic()
+    for embedded, completed in batches:
+        if embedded:
+            vector_store.upsert_vectors(embedded)
+            n_chunks += len(embedded)
+
+        moved = [c for record in completed for c in record.pop("moved")]
+        if moved:
+            print(f"Updating positions of {len(moved)} unchanged chunks...")
+            vector_store.update_chunk_metadata(moved)
+
+        stale_ids = []
+        for record in completed:
+            stale_ids.extend(record["previous_ids"] - set(record["chunk_ids"]))
+        if stale_ids:
+            print(f"Removing {len(stale_ids)} stale chunks...")
+            vector_store.delete_vectors(stale_ids)
+
+        for record in completed:
+            file_path = record["file_path"]
+            manifest.record(
+                file_path, changed[file_path], record["chunk_ids"], record["chunk_indexes"]
+            )
+        n_files += len(completed)
+        if time.monotonic() - last_save >= MANIFEST_SAVE_INTERVAL:
+            # Local indexes are saved before the manifest that refers to them.
+            vector_store.flush()
+            manifest.save()
+            last_save = time.monotonic()
+
+    stale_ids = []
+    for file_path in removed:
+        stale_ids.extend(manifest.chunk_ids(file_path))
+        manifest.forget(file_path)
+    if stale_ids:
+        print(f"Removing {len(stale_ids)} chunks of deleted files...")
+        vector_store.delete_vectors(stale_ids)
+    vector_store.flush()
+    manifest.save()
+    print(f"Ingested {n_files} files ({n_chunks} chunks embedded)")
+
+
+def run_profiled(
+    run,
+    report_path: Optional[str] = None,
+    cprofile_path: Optional[str] = None,
+    trace_memory: bool = False,
+) -> None:
+    """
+    Runs *run* and prints the ingestion profile (stage timings, throughput,
+    peak memory, slowest files), also saved as JSON to *report_path*.
+
+    *cprofile_path* dumps cProfile stats for the main thread (the upsert
+    stage; extraction and embedding run on worker threads and processes and
+    are covered by the stage timings). *trace_memory* adds the peak Python
+    heap size from tracemalloc, at a noticeable slowdown.
+    """
+    profiler = cProfile.Profile() if cprofile_path else None
+    if trace_memory:
+        tracemalloc.start()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        run()
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(cprofile_path)
+            pstats.Stats(profiler).sort_stats("cumulative").print_stats(20)
+        report = ingest_profiler.report()
+        if trace_memory:
+            tracemalloc.stop()
+        print_report(report)
+        if report_path:
+            with open(report_path, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+            print(f"Wrote ingestion profile to {report_path}")
 
 
 def remove_vectors(ids: Sequence[str]) -> None:
     """Delete vectors with the given *ids* from the vector store."""
+    vector_store = get_vector_store()
     vector_store.delete_vectors(list(ids))
+    vector_store.flush()
+
+
+def remove_paths(paths: Sequence[str]) -> None:
+    """
+    Delete every chunk of the ingested files at or under *paths* (files or
+    directories, existing or not). The manifest maps each source file to its
+    chunk IDs, so this is one batched delete with no re-scan of the corpus.
+    Paths are matched in ``canonical_path`` form, however they were spelled.
+    """
+    manifest = IngestManifest(settings.MANIFEST_PATH)
+    file_paths = []
+    for path in paths:
+        matched = manifest.files_under(canonical_path(path))
+        if not matched:
+            print(
+                f"Warning: no ingested files under {canonical_path(path)} "
+                f"(manifest: {settings.MANIFEST_PATH})"
+            )
+        file_paths.extend(matched)
+    file_paths = list(dict.fromkeys(file_paths))
+    if not file_paths:
+        return
+
+    ids = [chunk_id for fp in file_paths for chunk_id in manifest.chunk_ids(fp)]
+    print(f"Removing {len(ids)} chunks of {len(file_paths)} files...")
+    vector_store = get_vector_store()
+    vector_store.delete_vectors(ids)
+    vector_store.flush()
+    for file_path in file_paths:
+        manifest.forget(file_path)
+    manifest.save()
+
+
+def sync_paths(paths: Sequence[str], max_in_flight: Optional[int] = None) -> None:
+    """
+    Bring the index in line with each of *paths*: an existing file or
+    directory is updated incrementally (only its new, changed or deleted
+    chunks are touched), a path that no longer exists has its chunks removed.
+    """
+    for path in paths:
+        if os.path.exists(path):
+            update_index_from_path(path, max_in_flight=max_in_flight)
+        else:
+            remove_paths([path])
+
+
+def build_ann_index(nlist: Optional[int] = None) -> None:
+    """
+    Retrain the local ANN index (``VECTOR_BACKEND=ivf``) or the quantizer of
+    a quantized local index (``LOCAL_INDEX_QUANTIZATION``) on its current
+    vectors.
+    """
+    backend = get_vector_store().backend
+    if not hasattr(backend, "build"):
+        raise SystemExit(
+            f"{type(backend).__name__} has no trainable index; set VECTOR_BACKEND=ivf "
+            "or LOCAL_INDEX_QUANTIZATION"
+        )
+    if hasattr(backend, "quantizer"):
+        backend.build()
+        backend.flush()
+        print(
+            f"Encoded {len(backend)} vectors with {backend.quantizer.kind} "
+            f"({backend.code_bytes} bytes per vector)"
+        )
+        return
+    backend.build(nlist=nlist)
+    backend.flush()
+    print(f"Built index with {backend.nlist} clusters over {len(backend)} vectors")
 
 
 def main() -> None:
     parser = argparse.ArgumentParser(description="Manage your document vector index.")
+    parser.add_argument(
+        "--refresh-resources",
+        action="store_true",
+        help=(
+            "Look up the Vertex AI index, endpoint and deployed index again "
+            "instead of using the cached names (VERTEX_RESOURCE_CACHE_PATH)."
+        ),
+    )
     subparsers = parser.add_subparsers(dest="command", required=True)
 
     # `update` sub-command
@@ -41,26 +305,115 @@ def main() -> None:
         metavar="DIR",
         help="Root directory containing documents to ingest.",
     )
+    update_parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Re-ingest every file, ignoring the ingestion manifest.",
+    )
+    update_parser.add_argument(
+        "--max-in-flight",
+        type=int,
+        default=None,
+        metavar="N",
+        help=(
+            "Maximum number of files extracted ahead of embedding "
+            "(default: INGEST_MAX_IN_FLIGHT setting)."
+        ),
+    )
+
+    update_parser.add_argument(
+        "--profile-json",
+        default=None,
+        metavar="FILE",
+        help="Write the end-of-run ingestion profile to FILE as JSON.",
+    )
+    update_parser.add_argument(
+        "--cprofile",
+        default=None,
+        metavar="FILE",
+        help="Dump cProfile stats of the main thread to FILE.",
+    )
+    update_parser.add_argument(
+        "--tracemalloc",
+        action="store_true",
+        help="Report peak Python heap usage (slows ingestion down).",
+    )
+
+    # `sync` sub-command
+    sync_parser = subparsers.add_parser(
+        "sync",
+        help="Re-ingest changed files and drop deleted ones under the given paths.",
+    )
+    sync_parser.add_argument(
+        "paths",
+        nargs="+",
+        metavar="PATH",
+        help="Files or directories; paths that no longer exist are removed.",
+    )
+    sync_parser.add_argument(
+        "--max-in-flight",
+        type=int,
+        default=None,
+        metavar="N",
+        help=(
+            "Maximum number of files extracted ahead of embedding "
+            "(default: INGEST_MAX_IN_FLIGHT setting)."
+        ),
+    )
 
     # `remove` sub-command
     remove_parser = subparsers.add_parser(
         "remove", help="Remove vectors from the index."
     )
-    remove_parser.add_argument(
+    remove_target = remove_parser.add_mutually_exclusive_group(required=True)
+    remove_target.add_argument(
         "--ids",
         "-i",
-        required=True,
         nargs="+",
         metavar="ID",
         help="One or more vector IDs to delete.",
     )
+    remove_target.add_argument(
+        "--path",
+        "-p",
+        nargs="+",
+        metavar="PATH",
+        help="Delete all chunks of these ingested files or directories.",
+    )
+
+    # `build-index` sub-command
+    build_parser = subparsers.add_parser(
+        "build-index", help="Retrain the local ANN (IVF) index or quantizer."
+    )
+    build_parser.add_argument(
+        "--nlist",
+        type=int,
+        default=None,
+        help="Number of clusters (default: IVF_NLIST, or ~4*sqrt(n) if unset).",
+    )
 
     args = parser.parse_args()
 
+    if args.refresh_resources:
+        get_vector_store(refresh_resources=True)
     if args.command == "update":
-        update_index_from_path(args.path)
+        run_profiled(
+            lambda: update_index_from_path(
+                args.path, full=args.full, max_in_flight=args.max_in_flight
+            ),
+            report_path=args.profile_json,
+            cprofile_path=args.cprofile,
+            trace_memory=args.tracemalloc,
+        )
+    elif args.command == "sync":
+        sync_paths(args.paths, max_in_flight=args.max_in_flight)
     elif args.command == "remove":
-        remove_vectors(args.ids)
+        if args.path:
+            remove_paths(args.path)
+        else:
+            remove_vectors(args.ids)
+    elif args.command == "build-index":
+        build_ann_index(args.nlist)
 
 
 if __name__ == "__main__":
@@ -4,6 +4,19 @@ import argparse
 import os
 
 from src.agent.agent import rag_agent
+from src.common.config import settings
+
+RETRIEVAL_SETTINGS = (
+    "CHUNK_STORE",
+    "QUERY_CACHE_SIZE",
+    "QUERY_CACHE_TTL_SECONDS",
+    "INDEX_VERSION_REFRESH_SECONDS",
+    "HYBRID_CANDIDATES",
+    "RRF_K",
+    "MMR_FETCH_K",
+    "MMR_LAMBDA",
+    "DEDUP_THRESHOLD",
+)
 
 
 def parse_args() -> argparse.Namespace:
@@ -29,13 +42,45 @@ def main():
     args = parse_args()
     vertexai.init(staging_bucket=args.staging_bucket)
 
+    extra_packages = ["src/agent", "src/common"]
+    env_vars = {
+        "VERTEX_AI_LOCATION": settings.VERTEX_AI_LOCATION,
+        "EMBEDDING_MODEL": settings.EMBEDDING_MODEL,
+        "ENDPOINT_ID": settings.ENDPOINT_ID,
+        "DEPLOYED_INDEX_ID": settings.DEPLOYED_INDEX_ID,
+        "FIRESTORE_COLLECTION": settings.FIRESTORE_COLLECTION,
+        "RETRIEVAL_TOP_K": str(settings.RETRIEVAL_TOP_K),
+    }
+    # Retrieval tuning is read by the agent at query time; forward it so the
+    # deployed agent does not silently fall back to the defaults.
+    for name in RETRIEVAL_SETTINGS:
+        env_vars[name] = str(getattr(settings, name))
+    # Ship the BM25 index with the agent so retrieval can run hybrid search.
+    lexical_path = settings.LEXICAL_INDEX_PATH
+    if lexical_path and os.path.exists(lexical_path):
+        extra_packages.append(lexical_path)
+        env_vars["LEXICAL_INDEX_PATH"] = lexical_path
+    # A local chunk store replaces Firestore reads on the query path.
+    if settings.CHUNK_STORE == "local":
+        if not os.path.isdir(settings.CHUNK_STORE_PATH):
+            raise SystemExit(
+                f"CHUNK_STORE=local but {settings.CHUNK_STORE_PATH} does not exist; "
+                "run data_ingestion.py update first"
+            )
+        extra_packages.append(settings.CHUNK_STORE_PATH)
+        env_vars["CHUNK_STORE_PATH"] = settings.CHUNK_STORE_PATH
+
     remote_app = agent_engines.create(
         agent_engine=rag_agent,
         requirements=[
             "google-cloud-aiplatform[agent_engines,adk,langchain,ag2,llama_index]==1.90.0",
             "google-cloud-firestore==2.20.2",
+            "pydantic-settings==2.9.1",
+            "python-dotenv==1.0.1",
         ],
-        extra_packages=["src/agent"],
+        extra_packages=extra_packages,
+        # The retrieval tool reads its resource IDs from Settings at runtime.
+        env_vars=env_vars,
     )
 
     print(f"Remote agent created: {remote_app.name}")
@@ -12,16 +12,35 @@ from ragas.metrics import (
 )
 import pandas as pd
 import argparse
+import json
+import os
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import List, Dict, Any, Optional
 import vertexai
 from vertexai import agent_engines
 
+from src.common.config import settings
+from src.common.retry import call_with_backoff
+
 # Initialize the agent engine
-agent_engine = vertexai.agent_engines.get(
-    "projects/163097687798/locations/us-central1/reasoningEngines/8537074470983041024"
-)
-session = agent_engine.create_session(user_id="test_user")
+agent_engine = vertexai.agent_engines.get(settings.AGENT_ENGINE_RESOURCE)
+EVAL_USER_ID = "test_user"
+
+# Each worker thread talks to the agent through its own session, so
+# concurrent questions do not share (or pollute) a conversation history.
+_worker = threading.local()
+
+
+def get_worker_session_id() -> str:
+    if getattr(_worker, "session_id", None) is None:
+        session = call_with_backoff(
+            agent_engine.create_session, user_id=EVAL_USER_ID, retry_on=(Exception,)
+        )
+        _worker.session_id = session["id"]
+    return _worker.session_id
 
 # Available metrics mapping
 AVAILABLE_METRICS = {
@@ -51,7 +70,7 @@ def call_agent(query: str) -> tuple[str, list[str]]:
     response_text = ""
     contexts = []
     for event in agent_engine.stream_query(
-        user_id="test_user", session_id=session["id"], message=query
+        user_id=EVAL_USER_ID, session_id=get_worker_session_id(), message=query
     ):
         text = event["content"]["parts"][0].get("text", None)
         function_response = event["content"]["parts"][0].get("function_response", None)
@@ -64,24 +83,159 @@ def call_agent(query: str) -> tuple[str, list[str]]:
             )
     return response_text, contexts
 
-def run_rag(q: str) -> tuple[str, list[str]]:
+def run_rag(
+    q: str, max_attempts: int = 5, timing: Optional[Dict[str, Any]] = None
+) -> tuple[str, list[str]]:
     """
     Run RAG with retry logic for rate limiting.
     
+    Failed calls are retried with exponential backoff and jitter, up to
+    ``max_attempts`` attempts; the last error is then raised.
+    
     Args:
         q (str): The query to process
+        max_attempts (int): Maximum number of attempts
+        timing (Optional[Dict[str, Any]]): Filled with ``attempts`` and the
+            ``latency_seconds`` of the successful attempt, so backoff sleeps
+            and failed attempts do not count as agent latency
         
     Returns:
         tuple[str, list[str]]: The answer and contexts
     """
-    while True:  # handle rate limit
-        try:
-            answer, contexts = call_agent(q)
-            break
-        except Exception as e:
-            print(f"Error occurred, retrying: {str(e)}")
-            continue
-    return answer, contexts
+    timing = {} if timing is None else timing
+    timing["attempts"] = 0
+
+    def attempt() -> tuple[str, list[str]]:
+        timing["attempts"] += 1
+        start = time.perf_counter()
+        result = call_agent(q)
+        timing["latency_seconds"] = time.perf_counter() - start
+        return result
+
+    return call_with_backoff(attempt, retry_on=(Exception,), max_attempts=max_attempts)
+
+def load_checkpoint(path: str) -> Dict[int, Dict[str, Any]]:
+    """
+    Load completed records from a JSONL checkpoint file.
+    
+    Args:
+        path (str): Path to the checkpoint file
+        
+    Returns:
+        Dict[int, Dict[str, Any]]: Completed records keyed by test sample index
+    """
+    done = {}
+    if not os.path.exists(path):
+        return done
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # partially written last line of an interrupted run
+            done[record["index"]] = record
+    return done
+
+def collect_answers(
+    samples: List[Dict[str, str]],
+    checkpoint_path: str,
+    concurrency: int = 8,
+    max_attempts: int = 5,
+) -> List[Dict[str, Any]]:
+    """
+    Query the agent for every test sample, ``concurrency`` questions at a time.
+    
+    Each completed record (with the latency of its successful attempt, its
+    retry count and the total time including backoff) is appended to the
+    checkpoint file as soon as it is ready, and samples already in it are
+    skipped, so an interrupted run resumes where it stopped. Questions that
+    still fail after ``max_attempts`` are reported and left out; rerunning
+    retries only those.
+    
+    Args:
+        samples (List[Dict[str, str]]): Test samples from ``load_test_data``
+        checkpoint_path (str): Path to the JSONL checkpoint file
+        concurrency (int): Number of questions in flight at once
+        max_attempts (int): Maximum attempts per question
+        
+    Returns:
+        List[Dict[str, Any]]: Completed records in test data order
+    """
+    done = load_checkpoint(checkpoint_path)
+    # Only reuse records whose question still matches the test data row.
+    done = {
+        i: r for i, r in done.items()
+        if i < len(samples) and r["question"] == samples[i]["question"]
+    }
+    pending = [i for i in range(len(samples)) if i not in done]
+    print(f"{len(done)} questions already answered, {len(pending)} to go")
+
+    lock = threading.Lock()
+
+    def answer(i: int) -> Dict[str, Any]:
+        sample = samples[i]
+        timing = {}
+        start = time.perf_counter()
+        ans, ctxs = run_rag(sample["question"], max_attempts=max_attempts, timing=timing)
+        record = {
+            "index": i,
+            "question": sample["question"],
+            "answer": ans,
+            "contexts": ctxs,
+            "latency_seconds": timing["latency_seconds"],
+            "retries": timing["attempts"] - 1,
+            "total_seconds": time.perf_counter() - start,
+        }
+        if "ground_truth" in sample:
+            record["ground_truth"] = sample["ground_truth"]
+        with lock, open(checkpoint_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+        return record
+
+    failed = 0
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = {pool.submit(answer, i): i for i in pending}
+        for n, future in enumerate(as_completed(futures), start=1):
+            try:
+                record = future.result()
+                done[record["index"]] = record
+            except Exception as e:
+                failed += 1
+                print(f"Question {futures[future]} failed after retries: {e}")
+            if n % 10 == 0 or n == len(futures):
+                print(f"Answered {n}/{len(futures)} questions")
+
+    if failed:
+        print(f"Warning: {failed} questions failed and are excluded; rerun to retry them")
+    return [done[i] for i in sorted(done)]
+
+def print_latency_summary(records: List[Dict[str, Any]]) -> None:
+    """
+    Print agent latency percentiles and, separately, the retries spent.
+    
+    Latency covers only the successful attempt of each question; time lost
+    to failed attempts and backoff is reported on its own line.
+    
+    Args:
+        records (List[Dict[str, Any]]): Completed records from ``collect_answers``
+    """
+    latency = pd.Series([r["latency_seconds"] for r in records])
+    print(
+        f"\nAgent latency: mean {latency.mean():.2f}s, "
+        f"p50 {latency.quantile(0.5):.2f}s, "
+        f"p95 {latency.quantile(0.95):.2f}s"
+    )
+    retries = [r.get("retries", 0) for r in records]
+    if any(retries):
+        total = pd.Series([r.get("total_seconds", r["latency_seconds"]) for r in records])
+        print(
+            f"Retries: {sum(retries)} across {sum(1 for n in retries if n)} questions; "
+            f"time including retries and backoff: p50 {total.quantile(0.5):.2f}s, "
+            f"p95 {total.quantile(0.95):.2f}s"
+        )
 
 def load_test_data(file_path: str, question_col: str = "question", answer_col: str = "answer", require_answer: bool = False) -> List[Dict[str, str]]:
     """
@@ -170,6 +324,14 @@ def main():
                       help="Name of the column containing questions in the CSV (default: 'question')")
     parser.add_argument("--answer_col", type=str, default="answer",
                       help="Name of the column containing ground truth answers in the CSV (default: 'answer')")
+    parser.add_argument("--concurrency", type=int, default=8,
+                      help="Number of questions sent to the agent concurrently (default: 8)")
+    parser.add_argument("--max_attempts", type=int, default=5,
+                      help="Maximum attempts per question before giving up (default: 5)")
+    parser.add_argument("--checkpoint", type=str, default=None,
+                      help="JSONL file of completed answers used to resume interrupted runs (default: <test_data>.checkpoint.jsonl)")
+    parser.add_argument("--output", type=str, default=None,
+                      help="Optional CSV file for per-question scores and latency")
     
     args = parser.parse_args()
     
@@ -182,20 +344,22 @@ def main():
     # Load test data
     TEST_SET = load_test_data(args.test_data, args.question_col, args.answer_col, needs_ground_truth)
     
-    # Process each test sample
-    records = []
-    for sample in TEST_SET:
-        ans, ctxs = run_rag(sample["question"])
-        record = {
-            "question": sample["question"],
-            "answer": ans,
-            "contexts": ctxs,
-        }
-        if "ground_truth" in sample:
-            record["ground_truth"] = sample["ground_truth"]
-        records.append(record)
+    # Query the agent for each test sample (concurrently, resumable)
+    checkpoint_path = args.checkpoint or f"{args.test_data}.checkpoint.jsonl"
+    records = collect_answers(
+        TEST_SET, checkpoint_path, args.concurrency, args.max_attempts
+    )
+    if not records:
+        print("No answers collected; nothing to evaluate.")
+        sys.exit(1)
+
+    # Printed before scoring so latency is reported even if evaluation fails.
+    print_latency_summary(records)
 
-    eval_ds = Dataset.from_list(records)
+    eval_ds = Dataset.from_list([
+        {k: v for k, v in r.items() if k in ("question", "answer", "contexts", "ground_truth")}
+        for r in records
+    ])
 
     # Initialize LLM and embeddings
     chat_llm = ChatVertexAI(
@@ -222,5 +386,12 @@ def main():
     print("\nEvaluation Results:")
     print(results)
 
+    if args.output:
+        scores = results.to_pandas()
+        scores["latency_seconds"] = [r["latency_seconds"] for r in records]
+        scores["retries"] = [r.get("retries", 0) for r in records]
+        scores.to_csv(args.output, index=False)
+        print(f"Per-question scores written to {args.output}")
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,233 @@
+import argparse
+import csv
+import hashlib
+import json
+import os
+import time
+from collections import defaultdict
+from typing import Any, Dict, List
+
+import numpy as np
+
+from src.common.chunk_store import MemoryChunkStore
+from src.common.config import settings
+from src.common.hybrid import search_neighbors
+from src.common.lexical_index import BM25Index, tokenize
+from src.common.local_index import LocalVectorBackend
+from src.common.manifest import canonical_path
+from src.common.processor import DocumentProcessor
+from src.common.query_cache import normalize_query
+from src.common.vector_store import VectorStore
+
+
+class HashingEmbedder:
+    """
+    Deterministic stand-in for ``EmbeddingGenerator``: hashed bag-of-words
+    vectors (feature hashing with signed buckets), L2-normalised. No network
+    calls, same output on every run, and texts sharing words are close.
+    """
+
+    def __init__(self, dim: int = settings.EMBEDDING_DIM):
+        self.dim = dim
+
+    def _embed(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for token in tokenize(text):
+            digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dim
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def embed_texts(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.empty((0, self.dim), dtype=np.float32)
+        return np.stack([self._embed(t) for t in texts])
+
+    def generate_embeddings(self, chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        for chunk, embedding in zip(chunks, self.embed_texts([c["text"] for c in chunks])):
+            chunk["embedding"] = embedding
+        return chunks
+
+
+class StageTimer:
+    """Collects wall-clock samples per named stage."""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+
+    def time(self, stage: str, fn, *args, **kwargs):
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        self.samples[stage].append(time.perf_counter() - start)
+        return result
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        report = {}
+        for stage, samples in self.samples.items():
+            ms = np.array(samples) * 1000
+            report[stage] = {
+                "count": len(samples),
+                "total_s": float(ms.sum() / 1000),
+                "p50_ms": float(np.percentile(ms, 50)),
+                "p95_ms": float(np.percentile(ms, 95)),
+                "p99_ms": float(np.percentile(ms, 99)),
+            }
+        return report
+
+
+def load_questions(path: str) -> List[Dict[str, str]]:
+    """
+    Labelled questions from a CSV or JSONL file with ``question`` and ``file``
+    (the relevant document, relative to the corpus root) and an optional
+    ``evidence`` column: a short verbatim span of that document. Chunks of
+    ``file`` that contain the evidence (or any chunk of ``file`` when it is
+    empty) count as relevant.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            rows = [json.loads(line) for line in f if line.strip()]
+        else:
+            rows = list(csv.DictReader(f))
+    for row in rows:
+        if not row.get("question") or not row.get("file"):
+            raise ValueError(f"Each row needs 'question' and 'file': {row}")
+    return rows
+
+
+def is_relevant(result: Dict[str, Any], label: Dict[str, str], corpus: str) -> bool:
+    expected = canonical_path(os.path.join(corpus, label["file"]))
+    if canonical_path(result["file_path"]) != expected:
+        return False
+    evidence = label.get("evidence")
+    return not evidence or normalize_query(evidence) in normalize_query(result["text"])
+
+
+def ingest(corpus: str, store: VectorStore, processor: DocumentProcessor, timer: StageTimer) -> int:
+    """Runs extraction, chunking, embedding and upserting with per-stage timings."""
+    chunks = []
+    for file_path in processor.list_files(corpus):
+        try:
+            text = timer.time("extract", processor.extract_text, file_path)
+        except Exception as e:
+            print(f"Skipping {file_path}: {e}")
+            continue
+        pieces = timer.time("chunk", processor._chunk_text, text)
+        chunks.extend(processor._add_metadata([{"chunks": pieces, "file_path": file_path}]))
+
+    batch_size = settings.UPSERT_BATCH_SIZE
+    for i in range(0, len(chunks), batch_size):
+        batch = timer.time(
+            "embed_batch", store._get_embedder().generate_embeddings, chunks[i : i + batch_size]
+        )
+        timer.time("upsert_batch", store.upsert_vectors, batch)
+    return len(chunks)
+
+
+def evaluate(
+    questions: List[Dict[str, str]],
+    store: VectorStore,
+    corpus: str,
+    ks: List[int],
+    timer: StageTimer,
+) -> Dict[str, float]:
+    """recall@k (share of questions with a relevant chunk in the top k) and MRR."""
+    depth = max(ks)
+    hits = {k: 0 for k in ks}
+    reciprocal_ranks = []
+    for label in questions:
+        question = label["question"]
+        start = time.perf_counter()
+        embedding = timer.time("query_embed", store._get_embedder().embed_texts, [question])[0]
+        neighbors = timer.time(
+            "search", search_neighbors, store.backend, store.lexical, embedding, question, depth
+        )
+        results = timer.time("hydrate", store.hydrate, [neighbors])[0]
+        timer.samples["query_total"].append(time.perf_counter() - start)
+
+        rank = next(
+            (i for i, r in enumerate(results, start=1) if is_relevant(r, label, corpus)),
+            None,
+        )
+        reciprocal_ranks.append(1.0 / rank if rank else 0.0)
+        for k in ks:
+            hits[k] += bool(rank and rank <= k)
+
+    n = max(len(questions), 1)
+    metrics = {f"recall@{k}": hits[k] / n for k in ks}
+    metrics["mrr"] = float(np.mean(reciprocal_ranks)) if reciprocal_ranks else 0.0
+    return metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Offline retrieval benchmark: recall@k, MRR and per-stage latency "
+        "with a local index, in-memory chunk store and deterministic embedder."
+    )
+    parser.add_argument("--corpus", required=True, help="Directory of documents to ingest")
+    parser.add_argument("--questions", required=True, help="Labelled questions (CSV or JSONL)")
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 3, 5, 10])
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--chunk-overlap", type=int, default=50)
+    parser.add_argument("--no-hybrid", action="store_true", help="Disable BM25 fusion")
+    parser.add_argument("--mmr-fetch-k", type=int, default=None,
+                        help="Override MMR_FETCH_K (<= k disables MMR)")
+    parser.add_argument("--min-recall", type=float, default=None,
+                        help=f"Exit with status 1 if recall@{settings.RETRIEVAL_TOP_K} is lower")
+    parser.add_argument("--json", dest="json_path", help="Also write results to this file")
+    args = parser.parse_args()
+
+    if args.mmr_fetch_k is not None:
+        settings.MMR_FETCH_K = args.mmr_fetch_k
+    ks = sorted(set(args.k) | {settings.RETRIEVAL_TOP_K})
+
+    embedder = HashingEmbedder()
+    store = VectorStore(
+        backend=LocalVectorBackend(None, dim=embedder.dim, metric="cosine"),
+        embedder=embedder,
+        chunk_store=MemoryChunkStore(),
+        lexical_path="",
+    )
+    store.lexical = None if args.no_hybrid else BM25Index()
+    processor = DocumentProcessor(
+        chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap
+    )
+    timer = StageTimer()
+
+    n_chunks = ingest(args.corpus, store, processor, timer)
+    questions = load_questions(args.questions)
+    metrics = evaluate(questions, store, args.corpus, ks, timer)
+    stages = timer.report()
+
+    print(f"\n{n_chunks} chunks, {len(questions)} questions")
+    for name, value in metrics.items():
+        print(f"{name:<12}{value:>8.3f}")
+    print(f"\n{'stage':<14}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for stage, s in stages.items():
+        print(f"{stage:<14}{s['count']:>7}{s['p50_ms']:>10.2f}{s['p95_ms']:>10.2f}{s['p99_ms']:>10.2f}")
+
+    if args.json_path:
+        report = {
+            "corpus": args.corpus,
+            "chunks": n_chunks,
+            "questions": len(questions),
+            "chunk_size": args.chunk_size,
+            "chunk_overlap": args.chunk_overlap,
+            "hybrid": not args.no_hybrid,
+            "mmr_fetch_k": settings.MMR_FETCH_K,
+            "metrics": metrics,
+            "stages": stages,
+        }
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.min_recall is not None:
+        recall = metrics[f"recall@{settings.RETRIEVAL_TOP_K}"]
+        if recall < args.min_recall:
+            raise SystemExit(
+                f"recall@{settings.RETRIEVAL_TOP_K} {recall:.3f} is below {args.min_recall}"
+            )
+
+
+if __name__ == "__main__":
+    main()
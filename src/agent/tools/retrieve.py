@@ -1,11 +1,84 @@
 # agent/tools/retrieve.py
-# from typing import List
-# from agent.common.vector_store import VectorStore
-# from agent.common.embedding_generator import EmbeddingGenerator
+import os
+import threading
+import time
+from typing import Dict
 
-# Initialize shared utilities
-# _vs = VectorStore()
-# _embedder = EmbeddingGenerator()
+from src.common.chunk_store import create_chunk_store, create_index_version
+from src.common.config import settings
+from src.common.hybrid import search_neighbors
+from src.common.hydration import hydrate_from_store
+from src.common.lexical_index import BM25Index
+from src.common.metrics import metrics
+from src.common.query_cache import LRUCache, normalize_query
+from src.common.vector_backends import create_backend
+
+
+class RetrievalContext:
+    """
+    Clients needed by ``retrieve_documents``, built once per agent worker.
+
+    Construction runs ``vertexai.init``, loads the embedding model and opens the
+    vector backend (the Vector Search endpoint by default) and the chunk
+    store. The Firestore client keeps its gRPC channel open, so later calls
+    reuse the warm connection instead of paying the handshake again; with
+    ``CHUNK_STORE=local`` chunks are read from memory-mapped files shipped
+    with the agent and Firestore is not used at all.
+    """
+
+    def __init__(self):
+        from vertexai.language_models import TextEmbeddingModel
+        import vertexai
+
+        project = settings.GOOGLE_CLOUD_PROJECT or None
+        vertexai.init(project=project, location=settings.VERTEX_AI_LOCATION)
+
+        self.embedder = TextEmbeddingModel.from_pretrained(settings.EMBEDDING_MODEL)
+        self.backend = create_backend(query_only=True)
+        # Optional BM25 index shipped alongside the agent for hybrid search.
+        lexical_path = settings.LEXICAL_INDEX_PATH
+        self.lexical = (
+            BM25Index(lexical_path)
+            if lexical_path and os.path.exists(lexical_path)
+            else None
+        )
+        self.collection = settings.FIRESTORE_COLLECTION
+        if settings.CHUNK_STORE == "local":
+            self.db = None
+            self.chunk_store = create_chunk_store("local")
+        else:
+            from google.cloud import firestore
+
+            self.db = firestore.Client(project=project)
+            self.chunk_store = create_chunk_store("firestore", db=self.db)
+
+        self.top_k = settings.RETRIEVAL_TOP_K
+
+        # Query embeddings never go stale for a fixed model; final results are
+        # keyed by index version so an upsert or delete invalidates them.
+        self.embedding_cache = LRUCache(settings.QUERY_CACHE_SIZE)
+        self.result_cache = LRUCache(
+            settings.QUERY_CACHE_SIZE, ttl=settings.QUERY_CACHE_TTL_SECONDS
+        )
+        self.index_version = create_index_version(
+            self.collection,
+            refresh_seconds=settings.INDEX_VERSION_REFRESH_SECONDS,
+            db=self.db,
+        )
+
+
+_context = None
+_context_lock = threading.Lock()
+
+
+def get_retrieval_context() -> RetrievalContext:
+    """Returns the process-wide retrieval context, creating it on first use."""
+    global _context
+    if _context is None:
+        with _context_lock:
+            if _context is None:
+                _context = RetrievalContext()
+    return _context
 
 
 def retrieve_documents(query: str):
@@ -17,36 +90,38 @@ def retrieve_documents(query: str):
     Returns:
         List of document text snippets.
     """
-    from vertexai.language_models import TextEmbeddingModel
-    from google.cloud.aiplatform.matching_engine import MatchingEngineIndexEndpoint
-    from google.cloud import firestore
-    import vertexai
-
-    vertexai.init(
-        project="yuan-449301",
-        location="us-central1",
-    )
+    start = time.perf_counter()
+    ctx = get_retrieval_context()
+    normalized = normalize_query(query)
+    result_key = (normalized, ctx.top_k, ctx.index_version.get())
+    cached = ctx.result_cache.get(result_key)
+    if cached is not None:
+        metrics.observe("rag_retrieval_seconds", time.perf_counter() - start, cache="hit")
+        return [dict(r) for r in cached]
 
-    _embedder = TextEmbeddingModel.from_pretrained("text-embedding-005")
-    _endpoint = MatchingEngineIndexEndpoint(index_endpoint_name="7694472531129925632")
-    _db = firestore.Client()
+    query_embedding = ctx.embedding_cache.get(normalized)
+    if query_embedding is None:
+        embed_start = time.perf_counter()
+        query_embedding = ctx.embedder.get_embeddings([query])[0].values
+        elapsed = time.perf_counter() - embed_start
+        metrics.observe("rag_query_embedding_seconds", elapsed)
+        ctx.embedding_cache.put(normalized, query_embedding, elapsed)
 
-    query_embedding = _embedder.get_embeddings([query])[0].values
-    response = _endpoint.find_neighbors(
-        deployed_index_id="deployed_index_1747401318896",
-        queries=[query_embedding],
-        num_neighbors=3,
+    neighbors = search_neighbors(
+        ctx.backend, ctx.lexical, query_embedding, query, ctx.top_k
     )
 
-    retrieved_results = []
-    for response_ in response[0]:
-        r = response_.id
-        r = _db.collection("rag").document(r).get().to_dict()
-        retrieved_results.append(
-            {
-                "text": r["text"],
-                "file_name": r["file_name"],
-                "file_path": r["file_path"],
-            }
-        )
-    return retrieved_results
+    results = hydrate_from_store(ctx.chunk_store, ctx.collection, [neighbors])[0]
+    elapsed = time.perf_counter() - start
+    ctx.result_cache.put(result_key, results, elapsed)
+    metrics.observe("rag_retrieval_seconds", elapsed, cache="miss")
+    return [dict(r) for r in results]
+
+
+def cache_stats() -> Dict[str, Dict[str, float]]:
+    """Hit/miss counters and saved latency of the retrieval caches."""
+    ctx = get_retrieval_context()
+    return {
+        "query_embedding": ctx.embedding_cache.stats(),
+        "retrieval_result": ctx.result_cache.stats(),
+    }
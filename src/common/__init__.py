@@ -2,15 +2,26 @@
 """
 Common utilities package: exposes shared configuration, document processing,
 embedding generation, and vector store interfaces.
+
+Submodules are imported on first attribute access so that lightweight callers
+(e.g. the agent's retrieval tool, which only needs ``config``) do not pull in
+the document-parsing and Vertex AI dependencies.
 """
-from .config import settings
-from .processor import DocumentProcessor
-from .embedding_generator import EmbeddingGenerator
-from .vector_store import VectorStore
+import importlib
+
+_EXPORTS = {
+    "settings": ".config",
+    "DocumentProcessor": ".processor",
+    "EmbeddingGenerator": ".embedding_generator",
+    "VectorStore": ".vector_store",
+}
+
+__all__ = list(_EXPORTS)
+
 
-__all__ = [
-    "settings",
-    "DocumentProcessor",
-    "EmbeddingGenerator",
-    "VectorStore",
-]
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,101 @@
+# chat_events.py
+import json
+import time
+from typing import Any, Dict, List, Tuple
+
+from .metrics import metrics
+
+# First occurrence of these event types is timed from the start of the turn.
+_FIRST_EVENT_METRICS = {
+    "tool_call": "chat_time_to_first_tool_call_seconds",
+    "text": "chat_time_to_first_token_seconds",
+}
+
+
+def parse_agent_event(event: Dict[str, Any]) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    Splits one ``stream_query`` event into ``(event_type, payload)`` pairs:
+    ``text`` for model output, ``tool_call`` and ``tool_result`` for tool
+    activity. Other parts are ignored.
+    """
+    content = event.get("content") or {}
+    role = content.get("role")
+    parsed = []
+    for part in content.get("parts") or []:
+        if part.get("function_call"):
+            call = part["function_call"]
+            parsed.append(
+                ("tool_call", {"name": call.get("name"), "args": call.get("args")})
+            )
+        elif part.get("function_response"):
+            response = part["function_response"]
+            parsed.append(
+                (
+                    "tool_result",
+                    {"name": response.get("name"), "sources": _sources(response)},
+                )
+            )
+        elif part.get("text") is not None and role == "model":
+            parsed.append(("text", {"text": part["text"]}))
+    return parsed
+
+
+def _sources(function_response: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Distinct documents cited in a ``retrieve_documents`` tool response."""
+    result = (function_response.get("response") or {}).get("result")
+    if not isinstance(result, list):
+        return []
+    sources = {}
+    for item in result:
+        if isinstance(item, dict) and item.get("file_path"):
+            sources.setdefault(
+                item["file_path"],
+                {"file_name": item.get("file_name", ""), "file_path": item["file_path"]},
+            )
+    return list(sources.values())
+
+
+class TurnRecorder:
+    """Accumulates the answer text and cited sources of one agent turn."""
+
+    def __init__(self):
+        self.text = ""
+        self._sources: Dict[str, Dict[str, Any]] = {}
+
+    def record(self, event_type: str, payload: Dict[str, Any]) -> None:
+        if event_type == "text":
+            self.text += payload["text"]
+        elif event_type == "tool_result":
+            for source in payload.get("sources", []):
+                self._sources.setdefault(source["file_path"], source)
+
+    @property
+    def sources(self) -> List[Dict[str, Any]]:
+        return list(self._sources.values())
+
+
+class TurnTimer:
+    """
+    Latency metrics for one chat turn: time to the first tool call and to the
+    first model text, and the total time by outcome (``agent``, ``cached``
+    or ``error``).
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self._seen = set()
+
+    def record(self, event_type: str) -> None:
+        name = _FIRST_EVENT_METRICS.get(event_type)
+        if name is not None and event_type not in self._seen:
+            self._seen.add(event_type)
+            metrics.observe(name, time.perf_counter() - self.start)
+
+    def finish(self, outcome: str) -> None:
+        metrics.observe("chat_turn_seconds", time.perf_counter() - self.start, outcome=outcome)
+        metrics.inc("chat_turns_total", outcome=outcome)
+
+
+def format_sse(event_type: str, payload: Dict[str, Any]) -> str:
+    """Encodes one Server-Sent Event."""
+    return f"event: {event_type}\ndata: {json.dumps(payload)}\n\n"
@@ -0,0 +1,500 @@
+# chunk_store.py
+"""
+Chunk text and metadata behind ``VectorStore``.
+
+Vector backends only know chunk IDs; a chunk store maps those IDs back to
+``{file_path, file_name, chunk_index, text}`` documents and keeps the
+per-collection index version used to invalidate query caches.
+``create_chunk_store`` picks the implementation named by
+``settings.CHUNK_STORE``.
+"""
+import json
+import mmap
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .config import settings
+
+
+def chunk_document(item: Dict[str, Any]) -> Dict[str, Any]:
+    """The stored document for one embedded chunk."""
+    metadata = item["metadata"]
+    return {
+        "file_path": metadata["source"],
+        "file_name": metadata["file_name"],
+        "chunk_index": metadata["chunk_index"],
+        "text": item["text"],
+    }
+
+
+class ChunkStore(ABC):
+    @abstractmethod
+    def write(self, collection: str, data: Sequence[Dict[str, Any]]) -> List[str]:
+        """Stores embedded chunks keyed by chunk ID; returns IDs that failed."""
+
+    @abstractmethod
+    def delete(self, collection: str, ids: Sequence[str]) -> None:
+        """Removes *ids*; unknown IDs are ignored."""
+
+    @abstractmethod
+    def get_many(self, collection: str, ids: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+        """Documents for *ids* that exist, keyed by ID."""
+
+    @abstractmethod
+    def bump_version(self, collection: str) -> None:
+        """Marks *collection* as changed so cached query results expire."""
+
+    def flush(self) -> None:
+        """Persists buffered changes (no-op for stores that write through)."""
+
+
+class FirestoreChunkStore(ChunkStore):
+    def __init__(self, db=None):
+        from google.cloud import firestore
+
+        self.db = db or firestore.Client()
+
+    def _bulk_writer(self, failed: List[str]):
+        """
+        A rate-limited BulkWriter that retries each failed operation on its
+        own and appends the document IDs that still fail to *failed*.
+        """
+        from google.cloud.firestore_v1.bulk_writer import BulkWriterOptions
+
+        writer = self.db.bulk_writer(
+            options=BulkWriterOptions(
+                max_ops_per_second=settings.FIRESTORE_MAX_OPS_PER_SECOND
+            )
+        )
+
+        def on_write_error(error, _writer) -> bool:
+            if error.attempts < settings.WRITE_MAX_ATTEMPTS:
+                return True  # BulkWriter re-enqueues just this write
+            failed.append(error.operation.reference.id)
+            return False
+
+        writer.on_write_error(on_write_error)
+        return writer
+
+    def write(self, collection, data) -> List[str]:
+        """Streams chunk documents through a BulkWriter; returns failed doc IDs."""
+        failed = []
+        writer = self._bulk_writer(failed)
+        coll = self.db.collection(collection)
+        for item in data:
+            writer.set(coll.document(item["metadata"]["chunk_id"]), chunk_document(item))
+        writer.close()  # flushes and waits for outstanding writes
+        return failed
+
+    def delete(self, collection, ids) -> None:
+        """Batched deletes through a BulkWriter (deleting a missing doc is a no-op)."""
+        failed = []
+        writer = self._bulk_writer(failed)
+        coll = self.db.collection(collection)
+        for idx in ids:
+            writer.delete(coll.document(str(idx)))
+        writer.close()
+        if failed:
+            raise RuntimeError(f"Failed to delete {len(failed)} chunk documents: {failed[:10]}")
+
+    def get_many(self, collection, ids) -> Dict[str, Dict[str, Any]]:
+        if not ids:
+            return {}
+        coll = self.db.collection(collection)
+        refs = [coll.document(str(i)) for i in ids]
+        # `get_all` streams snapshots back in arbitrary order, so index them by ID.
+        return {snap.id: snap.to_dict() for snap in self.db.get_all(refs) if snap.exists}
+
+    def bump_version(self, collection) -> None:
+        from .query_cache import bump_index_version
+
+        bump_index_version(self.db, collection)
+
+
+class MemoryChunkStore(ChunkStore):
+    """Dict-backed store for tests and offline benchmarks."""
+
+    def __init__(self):
+        self._docs: Dict[str, Dict[str, Dict[str, Any]]] = defaultdict(dict)
+        self.versions: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def write(self, collection, data) -> List[str]:
+        with self._lock:
+            docs = self._docs[collection]
+            for item in data:
+                docs[item["metadata"]["chunk_id"]] = chunk_document(item)
+        return []
+
+    def delete(self, collection, ids) -> None:
+        with self._lock:
+            docs = self._docs[collection]
+            for idx in ids:
+                docs.pop(idx, None)
+
+    def get_many(self, collection, ids) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            docs = self._docs[collection]
+            return {str(i): dict(docs[str(i)]) for i in ids if str(i) in docs}
+
+    def bump_version(self, collection) -> None:
+        with self._lock:
+            self.versions[collection] += 1
+
+    def __len__(self) -> int:
+        return sum(len(docs) for docs in self._docs.values())
+
+
+# One fixed-width row per chunk; IDs are the 32 hex chars of ``make_chunk_id``.
+_RECORD = np.dtype(
+    [
+        ("id", "S32"),
+        ("offset", "<u8"),
+        ("length", "<u4"),
+        ("source", "<u4"),
+        ("chunk_index", "<u4"),
+    ]
+)
+
+
+class _LocalCollection:
+    """Files and in-memory state of one collection of ``MmapChunkStore``."""
+
+    def __init__(self, root: str, name: str):
+        self.blob_path = os.path.join(root, f"{name}.blob")
+        self.table_path = os.path.join(root, f"{name}.idx.npy")
+        self.meta_path = os.path.join(root, f"{name}.json")
+        self.table = np.empty(0, dtype=_RECORD)
+        self.sources: List[str] = []
+        self.source_ids: Dict[str, int] = {}
+        self.version = 0
+        # Changes since the last flush, layered over the sorted table.
+        self.pending: Dict[bytes, tuple] = {}
+        self.deleted = set()
+        self.dirty = False
+        self.blob_size = 0
+        self._appender = None
+        self._map: Optional[mmap.mmap] = None
+        self._stamp = None
+        self.load()
+
+    def _disk_stamp(self) -> tuple:
+        # ``flush`` replaces the metadata first and the table second, so both
+        # are checked: a reader may look in between.
+        stamp = []
+        for path in (self.meta_path, self.table_path):
+            try:
+                stat = os.stat(path)
+                stamp.append((stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                stamp.append(None)
+        return tuple(stamp)
+
+    def load(self) -> None:
+        """(Re)reads the metadata, table and blob size persisted by ``flush``."""
+        self._stamp = self._disk_stamp()
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            self.sources = meta["sources"]
+            self.source_ids = {path: i for i, path in enumerate(self.sources)}
+            self.version = meta.get("version", 0)
+        if os.path.exists(self.table_path):
+            self.table = np.load(self.table_path, mmap_mode="r")
+        self.blob_size = os.path.getsize(self.blob_path) if os.path.exists(self.blob_path) else 0
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+    def refresh(self) -> None:
+        """
+        Picks up a flush by another process (the ingesting one) when the
+        metadata or table file changed. Skipped while this process has unflushed
+        changes of its own.
+        """
+        if not self.dirty and self._disk_stamp() != self._stamp:
+            self.load()
+
+    def live_count(self) -> int:
+        count = len(self.table) - len(self.deleted) + len(self.pending)
+        if self.pending and len(self.table):
+            # Rewritten rows are both in the table and pending.
+            pending = np.array(list(self.pending), dtype="S32")
+            count -= int(np.isin(pending, self.table["id"]).sum())
+        return count
+
+    def find(self, keys: List[bytes]) -> Dict[bytes, tuple]:
+        """Current ``(offset, length, source, chunk_index)`` of each live key."""
+        found = {}
+        table_keys = []
+        for key in keys:
+            if key in self.pending:
+                found[key] = self.pending[key]
+            elif key not in self.deleted:
+                table_keys.append(key)
+        if table_keys and len(self.table):
+            ids = self.table["id"]
+            query = np.array(table_keys, dtype="S32")
+            rows = np.minimum(np.searchsorted(ids, query), len(ids) - 1)
+            for key, row in zip(table_keys, rows):
+                record = self.table[row]
+                if record["id"] == key:
+                    found[key] = (
+                        int(record["offset"]),
+                        int(record["length"]),
+                        int(record["source"]),
+                        int(record["chunk_index"]),
+                    )
+        return found
+
+    def append(self, blobs: List[bytes]) -> List[int]:
+        """Appends texts to the blob file; returns their offsets."""
+        if self._appender is None:
+            self._appender = open(self.blob_path, "ab")
+        offsets = []
+        for blob in blobs:
+            offsets.append(self.blob_size)
+            self.blob_size += len(blob)
+        self._appender.write(b"".join(blobs))
+        self._appender.flush()
+        return offsets
+
+    def read(self, offset: int, length: int) -> str:
+        if length == 0:
+            return ""  # an empty blob file cannot be mapped
+        if self._map is None or offset + length > len(self._map):
+            # The blob grew since it was mapped (or was never mapped).
+            if self._map is not None:
+                self._map.close()
+            with open(self.blob_path, "rb") as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map[offset : offset + length].decode("utf-8")
+
+    def source_id(self, path: str) -> int:
+        if path not in self.source_ids:
+            self.source_ids[path] = len(self.sources)
+            self.sources.append(path)
+        return self.source_ids[path]
+
+    def flush(self) -> None:
+        if not self.dirty:
+            return
+        keep = np.ones(len(self.table), dtype=bool)
+        if len(self.table) and (self.pending or self.deleted):
+            replaced = np.array(list(self.pending) + list(self.deleted), dtype="S32")
+            keep = ~np.isin(self.table["id"], replaced)
+        added = np.array(
+            [(key, *record) for key, record in self.pending.items()], dtype=_RECORD
+        )
+        table = np.concatenate([np.asarray(self.table)[keep], added])
+        table.sort(order="id")
+
+        # Sources only ever grow, so the metadata is written first: an old
+        # table stays valid against it if the process stops in between.
+        with open(f"{self.meta_path}.tmp", "w", encoding="utf-8") as f:
+            json.dump({"sources": self.sources, "version": self.version}, f)
+        os.replace(f"{self.meta_path}.tmp", self.meta_path)
+        np.save(f"{self.table_path}.tmp.npy", table)
+        os.replace(f"{self.table_path}.tmp.npy", self.table_path)
+
+        self.table = np.load(self.table_path, mmap_mode="r")
+        self.pending, self.deleted = {}, set()
+        self.dirty = False
+        self._stamp = self._disk_stamp()
+
+
+class MmapChunkStore(ChunkStore):
+    """
+    Read-optimised local chunk store, built at ingestion time and shipped
+    with the agent.
+
+    Each collection is an append-only UTF-8 text blob plus a table of
+    fixed-width ``(id, offset, length, source, chunk_index)`` rows sorted by
+    chunk ID, both memory-mapped at startup. A lookup is a binary search
+    over the ID column and one slice of the blob, with no network round
+    trip. File paths are stored once per source file. Writes and deletes are
+    buffered in memory until ``flush``; the text of deleted chunks stays in
+    the blob until the store is rebuilt. Stores opened by other processes
+    reload a collection on their next access after it was flushed.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._collections: Dict[str, _LocalCollection] = {}
+        self._lock = threading.Lock()
+
+    def _collection(self, name: str) -> _LocalCollection:
+        if name not in self._collections:
+            self._collections[name] = _LocalCollection(self.path, name)
+        return self._collections[name]
+
+    @staticmethod
+    def _key(chunk_id: str) -> bytes:
+        key = str(chunk_id).encode("ascii")
+        if len(key) > 32:
+            raise ValueError(f"Chunk IDs are at most 32 characters: {chunk_id!r}")
+        return key
+
+    def write(self, collection, data) -> List[str]:
+        with self._lock:
+            os.makedirs(self.path, exist_ok=True)
+            coll = self._collection(collection)
+            coll.refresh()
+            keys = [self._key(item["metadata"]["chunk_id"]) for item in data]
+            # Chunk IDs are content-addressed: a live ID already has this text,
+            # so only its metadata is updated (e.g. a chunk that moved).
+            existing = coll.find(keys)
+            for key, item in zip(keys, data):
+                if key in existing:
+                    offset, length = existing[key][:2]
+                    metadata = item["metadata"]
+                    record = (
+                        offset,
+                        length,
+                        coll.source_id(metadata["source"]),
+                        metadata["chunk_index"],
+                    )
+                    if record != existing[key]:
+                        coll.pending[key] = record
+                        coll.dirty = True
+            new = [(k, item) for k, item in zip(keys, data) if k not in existing]
+            offsets = coll.append([item["text"].encode("utf-8") for _, item in new])
+            for (key, item), offset in zip(new, offsets):
+                metadata = item["metadata"]
+                coll.pending[key] = (
+                    offset,
+                    len(item["text"].encode("utf-8")),
+                    coll.source_id(metadata["source"]),
+                    metadata["chunk_index"],
+                )
+                coll.deleted.discard(key)
+            coll.dirty = coll.dirty or bool(new)
+        return []
+
+    def delete(self, collection, ids) -> None:
+        with self._lock:
+            coll = self._collection(collection)
+            coll.refresh()
+            keys = [self._key(idx) for idx in ids]
+            for key in keys:
+                coll.pending.pop(key, None)
+            # Only rows of the table need a tombstone; unknown IDs are ignored.
+            coll.deleted.update(coll.find(keys))
+            coll.dirty = coll.dirty or bool(ids)
+
+    def get_many(self, collection, ids) -> Dict[str, Dict[str, Any]]:
+        if not ids:
+            return {}
+        with self._lock:
+            coll = self._collection(collection)
+            coll.refresh()
+            docs = {}
+            for key, (offset, length, source, chunk_index) in coll.find(
+                [self._key(i) for i in ids]
+            ).items():
+                file_path = coll.sources[source] if source < len(coll.sources) else ""
+                docs[key.decode("ascii")] = {
+                    "file_path": file_path,
+                    "file_name": os.path.basename(file_path),
+                    "chunk_index": chunk_index,
+                    "text": coll.read(offset, length),
+                }
+            return docs
+
+    def bump_version(self, collection) -> None:
+        with self._lock:
+            coll = self._collection(collection)
+            coll.refresh()
+            coll.version += 1
+            coll.dirty = True
+
+    def flush(self) -> None:
+        with self._lock:
+            for coll in self._collections.values():
+                coll.flush()
+
+    def __len__(self) -> int:
+        """Live chunks across all collections, on disk or pending."""
+        with self._lock:
+            if os.path.isdir(self.path):
+                # Open collections that have not been accessed yet.
+                for file_name in os.listdir(self.path):
+                    if file_name.endswith(".idx.npy"):
+                        self._collection(file_name[: -len(".idx.npy")])
+            for coll in self._collections.values():
+                coll.refresh()
+            return sum(c.live_count() for c in self._collections.values())
+
+
+class LocalIndexVersion:
+    """
+    ``query_cache.IndexVersion`` counterpart for ``MmapChunkStore``. Reads the
+    version from the collection's metadata file, which ``flush`` rewrites, so
+    processes other than the ingesting one (the web servers) see version
+    bumps; their ``MmapChunkStore`` reloads the table when that file changes.
+    The file is re-read at most every *refresh_seconds*.
+    """
+
+    def __init__(self, path: str, collection: str, refresh_seconds: float = 0.0):
+        self.meta_path = os.path.join(path, f"{collection}.json")
+        self.refresh_seconds = refresh_seconds
+        self._version = 0
+        self._checked_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def get(self) -> int:
+        now = time.monotonic()
+        with self._lock:
+            if self._checked_at is not None and now - self._checked_at < self.refresh_seconds:
+                return self._version
+        try:
+            with open(self.meta_path, "r", encoding="utf-8") as f:
+                version = json.load(f).get("version", 0)
+        except FileNotFoundError:
+            version = 0
+        with self._lock:
+            self._version, self._checked_at = version, now
+        return version
+
+
+def create_chunk_store(kind: Optional[str] = None, db=None) -> ChunkStore:
+    """
+    Builds the chunk store named *kind* (default ``settings.CHUNK_STORE``):
+    ``"firestore"`` (using *db* if given) or ``"local"`` (``MmapChunkStore``
+    at ``CHUNK_STORE_PATH``).
+    """
+    kind = kind or settings.CHUNK_STORE
+    if kind == "firestore":
+        return FirestoreChunkStore(db)
+    if kind == "local":
+        return MmapChunkStore(settings.CHUNK_STORE_PATH)
+    raise ValueError(f"Unknown chunk store: {kind!r}")
+
+
+def create_index_version(
+    collection: str, refresh_seconds: float = 0.0, kind: Optional[str] = None, db=None
+):
+    """
+    The index version reader for the chunk store named *kind* (default
+    ``settings.CHUNK_STORE``), i.e. wherever that store's ``bump_version``
+    writes: ``query_cache.IndexVersion`` on Firestore (using *db* if given)
+    or ``LocalIndexVersion``.
+    """
+    kind = kind or settings.CHUNK_STORE
+    if kind == "firestore":
+        from google.cloud import firestore
+
+        from .query_cache import IndexVersion
+
+        return IndexVersion(
+            db or firestore.Client(), collection, refresh_seconds=refresh_seconds
+        )
+    if kind == "local":
+        return LocalIndexVersion(settings.CHUNK_STORE_PATH, collection, refresh_seconds)
+    raise ValueError(f"Unknown chunk store: {kind!r}")
@@ -23,20 +23,117 @@ class Settings(BaseSettings):
     INDEX_DISPLAY_NAME: str = os.getenv("INDEX_DISPLAY_NAME", "")
     ENDPOINT_DISPLAY_NAME: str = os.getenv("ENDPOINT_DISPLAY_NAME", "")
     ENDPOINT_ID: str = os.getenv("ENDPOINT_ID", "")
+    DEPLOYED_INDEX_ID: str = os.getenv("DEPLOYED_INDEX_ID", "")
     EMBEDDING_DIM: int = 768
+    # Local cache of resolved index / endpoint / deployed index names, so
+    # ingestion skips the control-plane lookups (empty string disables it)
+    VERTEX_RESOURCE_CACHE_PATH: str = os.getenv(
+        "VERTEX_RESOURCE_CACHE_PATH", ".vertex_resources.json"
+    )
+
+    # Vector index backend: "vertex" (Vertex AI Vector Search), "local"
+    # (exact NumPy search) or "ivf" (approximate local IVF index)
+    VECTOR_BACKEND: str = os.getenv("VECTOR_BACKEND", "vertex")
+    LOCAL_INDEX_DIR: str = os.getenv("LOCAL_INDEX_DIR", ".local_index")
+    LOCAL_INDEX_METRIC: str = os.getenv("LOCAL_INDEX_METRIC", "dot")
+    # IVF clusters (0 = ~4*sqrt(n)) and clusters probed per query
+    IVF_NLIST: int = int(os.getenv("IVF_NLIST", "0"))
+    IVF_NPROBE: int = int(os.getenv("IVF_NPROBE", "8"))
+    # Compact codes searched by VECTOR_BACKEND=local: "" (float32), "int8"
+    # (4x smaller) or "pq" (dim / PQ_SUBVECTORS times smaller); the best
+    # QUANTIZATION_RESCORE candidates are re-ranked at full precision (0 = off)
+    LOCAL_INDEX_QUANTIZATION: str = os.getenv("LOCAL_INDEX_QUANTIZATION", "")
+    PQ_SUBVECTORS: int = int(os.getenv("PQ_SUBVECTORS", "96"))
+    QUANTIZATION_RESCORE: int = int(os.getenv("QUANTIZATION_RESCORE", "50"))
+
+    # Retrieval settings
+    FIRESTORE_COLLECTION: str = os.getenv("FIRESTORE_COLLECTION", "rag")
+    # Chunk text/metadata store: "firestore" or "local" (memory-mapped files
+    # under CHUNK_STORE_PATH, built at ingestion and shipped with the agent)
+    CHUNK_STORE: str = os.getenv("CHUNK_STORE", "firestore")
+    CHUNK_STORE_PATH: str = os.getenv("CHUNK_STORE_PATH", ".chunk_store")
+    RETRIEVAL_TOP_K: int = int(os.getenv("RETRIEVAL_TOP_K", "3"))
+    QUERY_CACHE_SIZE: int = int(os.getenv("QUERY_CACHE_SIZE", "1024"))
+    QUERY_CACHE_TTL_SECONDS: float = float(os.getenv("QUERY_CACHE_TTL_SECONDS", "3600"))
+    # How often the index version is re-read, i.e. how long cached results
+    # may outlive an index update; 0 reads it on every query (a Firestore
+    # round trip even on cache hits).
+    INDEX_VERSION_REFRESH_SECONDS: float = float(
+        os.getenv("INDEX_VERSION_REFRESH_SECONDS", "5")
+    )
+    # BM25 index fused with vector results. Off by default: when enabled, each
+    # query fetches HYBRID_CANDIDATES neighbours instead of RETRIEVAL_TOP_K.
+    LEXICAL_INDEX_PATH: str = os.getenv("LEXICAL_INDEX_PATH", "")
+    # Candidates fetched from each retriever before reciprocal-rank fusion
+    HYBRID_CANDIDATES: int = int(os.getenv("HYBRID_CANDIDATES", "50"))
+    RRF_K: int = int(os.getenv("RRF_K", "60"))
+    # Candidates re-ranked by MMR (<= RETRIEVAL_TOP_K, the default, disables
+    # diversification; on Vertex AI it makes queries return full datapoints),
+    # relevance/diversity trade-off, and cosine above which chunks are duplicates
+    MMR_FETCH_K: int = int(os.getenv("MMR_FETCH_K", "0"))
+    MMR_LAMBDA: float = float(os.getenv("MMR_LAMBDA", "0.7"))
+    DEDUP_THRESHOLD: float = float(os.getenv("DEDUP_THRESHOLD", "0.95"))
+
+    # Ingestion write settings
+    UPSERT_BATCH_SIZE: int = int(os.getenv("UPSERT_BATCH_SIZE", "500"))
+    UPSERT_MAX_WORKERS: int = int(os.getenv("UPSERT_MAX_WORKERS", "4"))
+    FIRESTORE_MAX_OPS_PER_SECOND: int = int(
+        os.getenv("FIRESTORE_MAX_OPS_PER_SECOND", "1000")
+    )
+    WRITE_MAX_ATTEMPTS: int = int(os.getenv("WRITE_MAX_ATTEMPTS", "5"))
 
     # LLM settings
     LLM_MODEL: str = os.getenv("LLM_MODEL", "gemini-pro")
     EMBEDDING_MODEL: str = os.getenv("EMBEDDING_MODEL", "text-embedding-005")
 
+    # Embedding request settings
+    EMBED_MAX_BATCH_ITEMS: int = int(os.getenv("EMBED_MAX_BATCH_ITEMS", "250"))
+    EMBED_MAX_BATCH_TOKENS: int = int(os.getenv("EMBED_MAX_BATCH_TOKENS", "15000"))
+    EMBED_PARALLELISM: int = int(os.getenv("EMBED_PARALLELISM", "4"))
+    EMBED_MAX_ATTEMPTS: int = int(os.getenv("EMBED_MAX_ATTEMPTS", "6"))
+    # Set to an empty string to disable the on-disk embedding cache.
+    EMBEDDING_CACHE_PATH: str = os.getenv(
+        "EMBEDDING_CACHE_PATH", ".embedding_cache.sqlite"
+    )
+    EMBEDDING_CACHE_MAX_ENTRIES: int = int(
+        os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "200000")
+    )
+
     # Document processing settings
     CHUNK_SIZE: int = 1000
     CHUNK_OVERLAP: int = 200
     SUPPORTED_FILE_TYPES: list = [".txt", ".pdf", ".docx", ".md"]
+    EXTRACT_PROCESS_WORKERS: int = int(
+        os.getenv("EXTRACT_PROCESS_WORKERS", str(os.cpu_count() or 1))
+    )
+    EXTRACT_THREAD_WORKERS: int = int(os.getenv("EXTRACT_THREAD_WORKERS", "8"))
+    EXTRACT_FILE_TIMEOUT: float = float(os.getenv("EXTRACT_FILE_TIMEOUT", "300"))
+    INGEST_MAX_IN_FLIGHT: int = int(os.getenv("INGEST_MAX_IN_FLIGHT", "32"))
+    MANIFEST_PATH: str = os.getenv("MANIFEST_PATH", ".ingest_manifest.json")
 
     # Web interface settings
     HOST: str = "0.0.0.0"
     PORT: int = 8000
+    AGENT_ENGINE_RESOURCE: str = os.getenv(
+        "AGENT_ENGINE_RESOURCE",
+        "projects/163097687798/locations/us-central1/reasoningEngines/8537074470983041024",
+    )
+    # Async server (web_chatbot_asgi.py): concurrent upstream stream_query
+    # calls, idle time before a browser's session is dropped, session cap and
+    # number of pre-created sessions kept ready for new visitors
+    CHAT_MAX_CONCURRENT_STREAMS: int = int(os.getenv("CHAT_MAX_CONCURRENT_STREAMS", "32"))
+    CHAT_SESSION_IDLE_SECONDS: float = float(
+        os.getenv("CHAT_SESSION_IDLE_SECONDS", "1800")
+    )
+    CHAT_MAX_SESSIONS: int = int(os.getenv("CHAT_MAX_SESSIONS", "1000"))
+    CHAT_WARM_SESSIONS: int = int(os.getenv("CHAT_WARM_SESSIONS", "4"))
+    # Semantic answer cache in front of the agent (size 0 disables it);
+    # questions at or above the cosine threshold share an answer
+    SEMANTIC_CACHE_SIZE: int = int(os.getenv("SEMANTIC_CACHE_SIZE", "2000"))
+    SEMANTIC_CACHE_THRESHOLD: float = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+    SEMANTIC_CACHE_VERSION_REFRESH_SECONDS: float = float(
+        os.getenv("SEMANTIC_CACHE_VERSION_REFRESH_SECONDS", "30")
+    )
 
     # Storage settings
     DOCUMENT_STORAGE_BUCKET: str = os.getenv("DOCUMENT_STORAGE_BUCKET", "")
@@ -0,0 +1,110 @@
+# diversify.py
+import itertools
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from .config import settings
+from .vector_backends import Neighbor, VectorBackend
+
+
+def mmr_select(
+    relevance: np.ndarray,
+    vectors: np.ndarray,
+    k: int,
+    lambda_mult: float = 0.7,
+    dedup_threshold: float = 0.95,
+) -> List[int]:
+    """
+    Maximal-marginal-relevance selection over a candidate set.
+
+    *relevance* holds one score per candidate (higher is better) and *vectors*
+    their embeddings. Each step picks the candidate maximising
+    ``lambda * relevance - (1 - lambda) * max_sim_to_selected``; candidates
+    whose cosine similarity to an already selected one reaches
+    *dedup_threshold* are dropped as near-duplicates. The pairwise similarity
+    matrix is computed once, so each step is a vectorised update.
+    Returns indices into the candidates in selection order.
+    """
+    n = len(relevance)
+    if n == 0 or k <= 0:
+        return []
+    vectors = np.asarray(vectors, dtype=np.float32)
+    vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    similarity = vectors @ vectors.T
+
+    max_sim = np.full(n, -np.inf, dtype=np.float32)
+    available = np.ones(n, dtype=bool)
+    selected: List[int] = []
+    while len(selected) < k and available.any():
+        redundancy = np.where(np.isfinite(max_sim), max_sim, 0.0)
+        score = lambda_mult * relevance - (1 - lambda_mult) * redundancy
+        best = int(np.argmax(np.where(available, score, -np.inf)))
+        selected.append(best)
+        max_sim = np.maximum(max_sim, similarity[best])
+        available[best] = False
+        available &= max_sim < dedup_threshold
+    return selected
+
+
+def _relevance(neighbors: Sequence[Neighbor]) -> np.ndarray:
+    """
+    Incoming scores rescaled to [0, 1]. Works for raw similarities and fused
+    RRF scores alike, and keeps the relevance term on the same scale as the
+    cosine redundancy term.
+    """
+    scores = np.array([n.distance for n in neighbors], dtype=np.float32)
+    span = scores.max() - scores.min()
+    if span <= 0:
+        return np.ones_like(scores)
+    return (scores - scores.min()) / span
+
+
+def diversify_neighbors(
+    backend: VectorBackend,
+    neighbors: Sequence[Neighbor],
+    top_k: int,
+    lambda_mult: Optional[float] = None,
+    dedup_threshold: Optional[float] = None,
+) -> List[Neighbor]:
+    """
+    Reduces over-fetched *neighbors* (best first) to *top_k* diverse results.
+
+    Candidates that arrived without an embedding (e.g. BM25-only matches) are
+    read from a local *backend* in one batched call. A remote backend would
+    need an extra round trip for that, so there they are not diversified:
+    they keep their incoming rank and MMR fills the remaining positions. The
+    same applies to candidates the backend does not hold.
+    """
+    if len(neighbors) <= 1:
+        return [n._replace(vector=None) for n in neighbors[:top_k]]
+    lambda_mult = settings.MMR_LAMBDA if lambda_mult is None else lambda_mult
+    if dedup_threshold is None:
+        dedup_threshold = settings.DEDUP_THRESHOLD
+
+    missing = [n.id for n in neighbors if n.vector is None]
+    if missing and not backend.remote:
+        fetched = backend.get_vectors(missing)
+        neighbors = [
+            n._replace(vector=fetched[n.id]) if n.id in fetched else n
+            for n in neighbors
+        ]
+    if any(n.vector is None for n in neighbors):
+        with_vectors = [n for n in neighbors if n.vector is not None]
+        selected = iter(
+            diversify_neighbors(backend, with_vectors, top_k, lambda_mult, dedup_threshold)
+        )
+        merged = []
+        for n in neighbors:
+            if n.vector is None:
+                merged.append(n)
+            else:
+                merged.extend(itertools.islice(selected, 1))
+        return merged[:top_k]
+
+    vectors = np.stack([np.asarray(n.vector, dtype=np.float32) for n in neighbors])
+    keep = mmr_select(
+        _relevance(neighbors), vectors, top_k, lambda_mult, dedup_threshold
+    )
+    # Embeddings are not needed past this point; don't carry them into results.
+    return [neighbors[i]._replace(vector=None) for i in keep]
@@ -0,0 +1,126 @@
+# embedding_cache.py
+import hashlib
+import sqlite3
+import threading
+import time
+from typing import Dict, Sequence
+
+import numpy as np
+
+# SQLite caps the number of bound parameters per statement.
+_QUERY_BATCH = 500
+
+
+class EmbeddingCache:
+    """
+    Persistent embedding cache keyed by (model, dimensionality, text hash).
+
+    Vectors are stored as float32 blobs in SQLite. Once the cache holds more
+    than *max_entries* vectors, the least recently used ones are evicted down
+    to ``EVICT_TO`` of the limit, so the table is only counted again after
+    that many more inserts rather than on every batch.
+    """
+
+    EVICT_TO = 0.9
+
+    def __init__(self, path: str, max_entries: int = 200_000):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                dim INTEGER NOT NULL,
+                text_hash BLOB NOT NULL,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (model, dim, text_hash)
+            ) WITHOUT ROWID
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings(last_used)"
+        )
+        self._conn.commit()
+        # Upper bound on the row count: replaced rows are counted as new.
+        (self._count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+
+    @staticmethod
+    def text_hash(text: str) -> bytes:
+        return hashlib.sha256(text.encode("utf-8")).digest()
+
+    def get_many(self, model: str, dim: int, texts: Sequence[str]) -> Dict[str, np.ndarray]:
+        """Returns ``{text: embedding}`` for the *texts* found in the cache."""
+        by_hash = {self.text_hash(t): t for t in texts}
+        found = {}
+        hashes = list(by_hash)
+        now = time.time()
+        with self._lock:
+            for i in range(0, len(hashes), _QUERY_BATCH):
+                batch = hashes[i : i + _QUERY_BATCH]
+                rows = self._conn.execute(
+                    "SELECT text_hash, vector FROM embeddings "
+                    f"WHERE model = ? AND dim = ? AND text_hash IN ({','.join('?' * len(batch))})",
+                    (model, dim, *batch),
+                ).fetchall()
+                for text_hash, vector in rows:
+                    found[by_hash[text_hash]] = np.frombuffer(vector, dtype=np.float32)
+                if rows:
+                    self._conn.executemany(
+                        "UPDATE embeddings SET last_used = ? "
+                        "WHERE model = ? AND dim = ? AND text_hash = ?",
+                        [(now, model, dim, h) for h, _ in rows],
+                    )
+            if found:
+                self._conn.commit()
+            self.hits += len(found)
+            self.misses += len(by_hash) - len(found)
+        return found
+
+    def put_many(self, model: str, dim: int, items: Dict[str, Sequence[float]]) -> None:
+        """Stores ``{text: embedding}`` and evicts the LRU overflow."""
+        now = time.time()
+        rows = [
+            (model, dim, self.text_hash(text), np.asarray(vector, dtype=np.float32).tobytes(), now)
+            for text, vector in items.items()
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?, ?)", rows
+            )
+            self._count += len(rows)
+            if self._count > self.max_entries:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        if count > self.max_entries:
+            target = int(self.max_entries * self.EVICT_TO)
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE (model, dim, text_hash) IN ("
+                "SELECT model, dim, text_hash FROM embeddings "
+                "ORDER BY last_used LIMIT ?)",
+                (count - target,),
+            )
+            count = target
+        self._count = count
+
+    def stats(self) -> Dict[str, float]:
+        """Hit counters and the maintained (upper-bound) entry count."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": self._count,
+        }
+
+    def close(self) -> None:
+        self._conn.close()
@@ -1,11 +1,27 @@
-from typing import List, Dict, Any
-from google.cloud import aiplatform
-from vertexai.language_models import TextEmbeddingModel
+import time
+from typing import List, Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+
 from .config import settings
+from .embedding_cache import EmbeddingCache
+from .profiling import ingest_profiler
+from .retry import call_with_backoff
+
+# The embedding API truncates each input to this many tokens.
+MAX_INPUT_TOKENS = 2048
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token), capped per input."""
+    return min(MAX_INPUT_TOKENS, len(text) // 4 + 1)
 
 
 class EmbeddingGenerator:
-    def __init__(self):
+    def __init__(
+        self, parallelism: Optional[int] = None, persistent_cache: bool = True
+    ):
         # self.project = settings.GOOGLE_CLOUD_PROJECT
         # self.location = settings.VERTEX_AI_LOCATION
         self.model = settings.EMBEDDING_MODEL
@@ -18,39 +34,132 @@ class EmbeddingGenerator:
         )
         """
 
-        # Initialize the embedding model
+        # Initialize the embedding model (the Vertex AI SDK is imported here
+        # rather than at module level to keep imports of this module cheap)
+        from vertexai.language_models import TextEmbeddingModel
+
         self.embedding_model = TextEmbeddingModel.from_pretrained(self.model)
 
-    def generate_embeddings(
-        self, chunks: List[Dict[str, Any]], chunk_batch_size=20
-    ) -> List[Dict[str, Any]]:
+        self.max_batch_items = settings.EMBED_MAX_BATCH_ITEMS
+        self.max_batch_tokens = settings.EMBED_MAX_BATCH_TOKENS
+        self.parallelism = (
+            settings.EMBED_PARALLELISM if parallelism is None else parallelism
+        )
+
+        self.dim = settings.EMBEDDING_DIM
+        self.cache = (
+            EmbeddingCache(
+                settings.EMBEDDING_CACHE_PATH,
+                max_entries=settings.EMBEDDING_CACHE_MAX_ENTRIES,
+            )
+            if persistent_cache and settings.EMBEDDING_CACHE_PATH
+            else None
+        )
+
+    def generate_embeddings(self, chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Generate embeddings for text chunks."""
         print("Creating embeddings...")
+        start = time.perf_counter()
 
         # Extract texts from chunks
         texts = [chunk["text"] for chunk in chunks]
 
         # Generate embeddings
-        try:
-            embeddings = self.embedding_model.get_embeddings(texts)
-        except:
-            # process in batch if too many tokens
-            print("Token length too large for embedding - breaking down by batch")
-            embeddings = []
-            for i in range(0, len(texts), chunk_batch_size):
-                batch = texts[i : i + chunk_batch_size]  # slice is safe at end
-                batch_emb = self.embedding_model.get_embeddings(
-                    batch
-                )  # returns list/array
-                embeddings.extend(batch_emb)
-
-        # Combine embeddings with original chunk data
+        embeddings = self.embed_texts(texts)
+
+        # Combine embeddings with original chunk data; each chunk gets a row
+        # view of the batch matrix rather than its own list of floats.
         for chunk, embedding in zip(chunks, embeddings):
-            chunk["embedding"] = embedding.values
+            chunk["embedding"] = embedding
+        ingest_profiler.record(
+            "embed", time.perf_counter() - start, chunks=len(chunks)
+        )
 
+        if self.cache is not None:
+            stats = self.cache.stats()
+            print(
+                f"Embedding cache: {stats['hits']} hits, {stats['misses']} misses "
+                f"({stats['hit_rate']:.0%} hit rate)"
+            )
         return chunks
 
-    def generate_single_embedding(self, text: str) -> List[float]:
+    def generate_single_embedding(self, text: str) -> np.ndarray:
         """Generate embedding for a single text."""
-        embedding = self.embedding_model.get_embeddings([text])[0]
-        return embedding.values
+        return self.embed_texts([text])[0]
+
+    def embed_texts(self, texts: List[str]) -> np.ndarray:
+        """
+        Embeds *texts* into a contiguous ``(len(texts), dim)`` float32 matrix,
+        preserving order.
+
+        Texts found in the on-disk cache are served from it; the rest are
+        embedded and written back.
+        """
+        if self.cache is None:
+            return self._embed_uncached(texts)
+
+        found = self.cache.get_many(self.model, self.dim, texts)
+        missing = list(dict.fromkeys(t for t in texts if t not in found))
+        if missing:
+            computed = dict(zip(missing, self._embed_uncached(missing)))
+            self.cache.put_many(self.model, self.dim, computed)
+            found.update(computed)
+        embeddings = np.empty((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            embeddings[i] = found[text]
+        return embeddings
+
+    def _embed_uncached(self, texts: List[str]) -> np.ndarray:
+        """
+        Texts are packed into batches bounded by both item count and estimated
+        tokens, and up to ``parallelism`` batches are in flight at once. A batch
+        that hits a rate limit is retried on its own with exponential backoff.
+        """
+        batches = self._plan_batches(texts)
+        embeddings = np.empty((len(texts), self.dim), dtype=np.float32)
+        if not batches:
+            return embeddings
+
+        with ThreadPoolExecutor(max_workers=max(1, self.parallelism)) as pool:
+            futures = {
+                pool.submit(self._embed_batch, [texts[i] for i in batch]): batch
+                for batch in batches
+            }
+            for future in as_completed(futures):
+                for i, values in zip(futures[future], future.result()):
+                    embeddings[i] = values
+        return embeddings
+
+    def _plan_batches(self, texts: List[str]) -> List[List[int]]:
+        """Greedily packs text indices into batches within the request limits."""
+        batches, current, current_tokens = [], [], 0
+        for i, text in enumerate(texts):
+            tokens = estimate_tokens(text)
+            if current and (
+                len(current) >= self.max_batch_items
+                or current_tokens + tokens > self.max_batch_tokens
+            ):
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append(i)
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    def _embed_batch(self, batch: List[str]) -> List[List[float]]:
+        from google.api_core import exceptions as api_exceptions
+
+        try:
+            embeddings = call_with_backoff(
+                self.embedding_model.get_embeddings,
+                batch,
+                max_attempts=settings.EMBED_MAX_ATTEMPTS,
+            )
+        except api_exceptions.InvalidArgument:
+            # The token estimate undershot the request limit: split and retry.
+            if len(batch) == 1:
+                raise
+            mid = len(batch) // 2
+            return self._embed_batch(batch[:mid]) + self._embed_batch(batch[mid:])
+        return [embedding.values for embedding in embeddings]
@@ -0,0 +1,125 @@
+# hybrid.py
+from typing import List, Optional, Sequence, Tuple
+
+from .config import settings
+from .diversify import diversify_neighbors
+from .lexical_index import BM25Index, reciprocal_rank_fusion
+from .vector_backends import Neighbor, VectorBackend
+
+
+def fuse_neighbors(
+    vector_neighbors: Sequence[Neighbor],
+    lexical_hits: Sequence[Tuple[str, float]],
+    top_k: int,
+    rrf_k: int = 60,
+) -> List[Neighbor]:
+    """
+    Combines a vector and a BM25 ranking with reciprocal-rank fusion.
+
+    Ranks rather than raw scores are fused, so cosine similarities and BM25
+    scores need no calibration against each other. The returned ``distance``
+    is the fused score (larger is closer, like the backends); vectors attached
+    to *vector_neighbors* are kept.
+    """
+    fused = reciprocal_rank_fusion(
+        [[n.id for n in vector_neighbors], [doc_id for doc_id, _ in lexical_hits]],
+        k=rrf_k,
+    )
+    vectors = {n.id: n.vector for n in vector_neighbors}
+    return [
+        Neighbor(doc_id, score, vectors.get(doc_id))
+        for doc_id, score in fused[:top_k]
+    ]
+
+
+def hybrid_search(
+    backend: VectorBackend,
+    lexical: Optional[BM25Index],
+    query_embeddings: Sequence[Sequence[float]],
+    query_texts: Optional[Sequence[Optional[str]]],
+    top_k: int,
+    candidates: Optional[int] = None,
+    return_vectors: bool = False,
+) -> List[List[Neighbor]]:
+    """
+    Nearest neighbours of each query embedding, fused with BM25 matches for
+    the matching query text when a lexical index is available.
+
+    All queries go to the backend in one batched call. Both retrievers
+    over-fetch *candidates* results (default ``HYBRID_CANDIDATES``) so
+    documents ranked moderately by both can still make the final *top_k*.
+    Without a lexical index or query texts this is a plain vector search.
+    """
+    texts = list(query_texts) if query_texts else [None] * len(query_embeddings)
+    use_lexical = lexical is not None and len(lexical) > 0 and any(texts)
+    if not use_lexical:
+        return backend.search(query_embeddings, top_k, return_vectors=return_vectors)
+
+    candidates = max(candidates or settings.HYBRID_CANDIDATES, top_k)
+    vector_results = backend.search(
+        query_embeddings, candidates, return_vectors=return_vectors
+    )
+    results = []
+    for vector_neighbors, text in zip(vector_results, texts):
+        if not text:
+            results.append(list(vector_neighbors[:top_k]))
+            continue
+        lexical_hits = lexical.search(text, candidates)
+        results.append(
+            fuse_neighbors(vector_neighbors, lexical_hits, top_k, settings.RRF_K)
+        )
+    return results
+
+
+def search_neighbors_many(
+    backend: VectorBackend,
+    lexical: Optional[BM25Index],
+    query_embeddings: Sequence[Sequence[float]],
+    query_texts: Optional[Sequence[Optional[str]]],
+    top_k: int,
+) -> List[List[Neighbor]]:
+    """
+    Full retrieval stage for a batch of queries: hybrid search over
+    ``MMR_FETCH_K`` candidates, then near-duplicate removal and MMR down to
+    *top_k*. Overlapping chunks of the same passage otherwise tend to fill the
+    whole result list. With ``MMR_FETCH_K <= top_k`` diversification is skipped.
+    """
+    if len(query_embeddings) == 0:
+        return []
+    fetch_k = settings.MMR_FETCH_K
+    if fetch_k <= top_k:
+        return hybrid_search(backend, lexical, query_embeddings, query_texts, top_k)
+    candidate_lists = hybrid_search(
+        backend,
+        lexical,
+        query_embeddings,
+        query_texts,
+        fetch_k,
+        candidates=max(settings.HYBRID_CANDIDATES, fetch_k),
+        return_vectors=True,
+    )
+    return [
+        diversify_neighbors(backend, candidates, top_k)
+        for candidates in candidate_lists
+    ]
+
+
+def search_neighbors(
+    backend: VectorBackend,
+    lexical: Optional[BM25Index],
+    query_embedding: Sequence[float],
+    query_text: Optional[str],
+    top_k: int,
+) -> List[Neighbor]:
+    """Single-query form of ``search_neighbors_many``."""
+    return search_neighbors_many(
+        backend, lexical, [query_embedding], [query_text], top_k
+    )[0]
+
+
+def load_lexical_index(path: Optional[str] = None) -> Optional[BM25Index]:
+    """Opens the BM25 index at *path* (default ``LEXICAL_INDEX_PATH``), if enabled."""
+    path = settings.LEXICAL_INDEX_PATH if path is None else path
+    if not path:
+        return None
+    return BM25Index(path)
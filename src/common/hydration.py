@@ -0,0 +1,53 @@
+# hydration.py
+from typing import Any, Dict, List, Sequence
+
+from .metrics import metrics
+
+
+def hydrate_from_store(
+    chunk_store, collection: str, neighbor_lists: Sequence[Sequence[Any]]
+) -> List[List[Dict[str, Any]]]:
+    """
+    Maps the ANN neighbors of many queries back to their chunk text and
+    source in one batched ``ChunkStore.get_many`` read (a single Firestore
+    ``get_all`` by default).
+
+    Neighbors are backend matches (anything with ``id`` and ``distance``).
+    Chunk IDs are de-duplicated across queries; results keep the neighbor
+    order, and neighbors whose document is missing are skipped instead of
+    failing the whole lookup.
+    """
+    ids = list(dict.fromkeys(str(n.id) for ns in neighbor_lists for n in ns))
+    with metrics.span("rag_hydration_seconds"):
+        docs = chunk_store.get_many(collection, ids) if ids else {}
+    return neighbor_results(neighbor_lists, docs, collection)
+
+
+def neighbor_results(
+    neighbor_lists: Sequence[Sequence[Any]],
+    docs: Dict[str, Dict[str, Any]],
+    collection: str,
+) -> List[List[Dict[str, Any]]]:
+    """
+    Joins neighbors with their chunk documents (keyed by ID). Neighbors
+    without a document are skipped.
+    """
+    all_results = []
+    for neighbors in neighbor_lists:
+        results = []
+        for neighbor in neighbors:
+            doc = docs.get(str(neighbor.id))
+            if doc is None:
+                print(f"Chunk {neighbor.id} not found in '{collection}', skipping")
+                continue
+            results.append(
+                {
+                    "id": str(neighbor.id),
+                    "text": doc.get("text", ""),
+                    "file_name": doc.get("file_name", ""),
+                    "file_path": doc.get("file_path", ""),
+                    "distance": neighbor.distance,
+                }
+            )
+        all_results.append(results)
+    return all_results
@@ -0,0 +1,199 @@
+# ivf_index.py
+import os
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from .local_index import LocalVectorBackend, top_k_indices
+from .vector_backends import Neighbor
+
+
+def spherical_kmeans(
+    vectors: np.ndarray, k: int, iterations: int = 10, seed: int = 0
+) -> np.ndarray:
+    """
+    K-means under inner-product similarity with unit-norm centroids, which
+    matches how the index is searched for both ``dot`` and ``cosine``.
+    """
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), size=k, replace=False)].copy()
+    for _ in range(iterations):
+        centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+        assign = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, vectors)
+        counts = np.bincount(assign, minlength=k)
+        empty = counts == 0
+        # Re-seed empty clusters from random points so k stays effective.
+        sums[empty] = vectors[rng.choice(len(vectors), size=int(empty.sum()))]
+        centroids = sums
+    centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+    return centroids.astype(np.float32)
+
+
+class IVFVectorBackend(LocalVectorBackend):
+    """
+    Approximate local index: inverted lists over k-means clusters (IVF-Flat).
+
+    Vectors are partitioned among ``nlist`` centroids; a query scores the
+    centroids, then searches exactly within its ``nprobe`` closest clusters.
+    Raising ``nprobe`` trades speed for recall (``nprobe == nlist`` is exact).
+    Until the index is trained (``build``, or automatically once it holds
+    enough vectors) searches fall back to brute force. Centroids and cluster
+    assignments are persisted next to the vectors and loaded at startup.
+    """
+
+    # Train automatically once there are this many vectors per cluster.
+    MIN_POINTS_PER_CLUSTER = 39
+
+    def __init__(
+        self,
+        path: str,
+        dim: int,
+        metric: str = "dot",
+        nlist: int = 0,
+        nprobe: int = 8,
+    ):
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self._centroids: Optional[np.ndarray] = None
+        self._assign = np.empty(0, dtype=np.int32)
+        self._order: Optional[np.ndarray] = None
+        self._offsets: Optional[np.ndarray] = None
+        super().__init__(path, dim, metric=metric)
+
+    @property
+    def trained(self) -> bool:
+        return self._centroids is not None
+
+    # ───────────────────────────── persistence ───────────────────────────── #
+
+    def _load(self) -> None:
+        super()._load()
+        if not self.path:
+            return
+        centroids_path = os.path.join(self.path, "centroids.npy")
+        if os.path.exists(centroids_path):
+            self._centroids = np.load(centroids_path)
+            self._assign = np.load(os.path.join(self.path, "assign.npy"))
+            self.nlist = len(self._centroids)
+
+    def flush(self) -> None:
+        with self._lock:
+            dirty = self._dirty
+            super().flush()
+            if dirty and self.trained and self.path:
+                np.save(os.path.join(self.path, "centroids.npy"), self._centroids)
+                np.save(
+                    os.path.join(self.path, "assign.npy"), self._assign[: len(self._ids)]
+                )
+
+    # ─────────────────────────────── training ────────────────────────────── #
+
+    def build(self, nlist: Optional[int] = None, sample_size: int = 100_000) -> None:
+        """(Re)trains the centroids on a sample and reassigns every vector."""
+        with self._lock:
+            n = len(self._ids)
+            nlist = min(nlist or self._default_nlist(), n)
+            if nlist == 0:
+                return
+            vectors = self._vectors[:n]
+            rng = np.random.default_rng(0)
+            sample = vectors[rng.choice(n, size=min(n, sample_size), replace=False)]
+            self._centroids = spherical_kmeans(np.asarray(sample), nlist)
+            self.nlist = nlist
+            self._assign = np.empty(self._vectors.shape[0], dtype=np.int32)
+            self._assign[:n] = self._nearest_centroid(vectors)
+            self._order = None
+            self._dirty = True
+
+    def _default_nlist(self) -> int:
+        """Configured ``nlist``, or ~4·sqrt(n) clusters when left at 0."""
+        return self.nlist or max(1, int(4 * np.sqrt(len(self._ids))))
+
+    def _nearest_centroid(self, vectors: np.ndarray, batch: int = 65536) -> np.ndarray:
+        return np.concatenate(
+            [
+                np.argmax(vectors[i : i + batch] @ self._centroids.T, axis=1)
+                for i in range(0, len(vectors), batch)
+            ]
+        ).astype(np.int32)
+
+    # ─────────────────────────────── updates ─────────────────────────────── #
+
+    def _ensure_capacity(self, needed: int) -> None:
+        super()._ensure_capacity(needed)
+        if self._assign.shape[0] < self._vectors.shape[0]:
+            grown = np.zeros(self._vectors.shape[0], dtype=np.int32)
+            grown[: len(self._assign)] = self._assign
+            self._assign = grown
+
+    def _move_row(self, src: int, dst: int) -> None:
+        super()._move_row(src, dst)
+        self._assign[dst] = self._assign[src]
+
+    def upsert(self, ids: Sequence[str], vectors) -> None:
+        with self._lock:
+            super().upsert(ids, vectors)
+            if self.trained:
+                rows = np.array([self._rows[i] for i in ids], dtype=np.int64)
+                self._assign[rows] = self._nearest_centroid(self._vectors[rows])
+                self._order = None
+            elif len(self._ids) >= self._default_nlist() * self.MIN_POINTS_PER_CLUSTER:
+                self.build()
+
+    def delete(self, ids: Sequence[str]) -> None:
+        with self._lock:
+            super().delete(ids)
+            self._order = None
+
+    # ──────────────────────────────── search ─────────────────────────────── #
+
+    def _inverted_lists(self):
+        """Rows grouped by cluster: ``order[offsets[c]:offsets[c + 1]]``."""
+        if self._order is None:
+            assign = self._assign[: len(self._ids)]
+            self._order = np.argsort(assign, kind="stable")
+            self._offsets = np.concatenate(
+                [[0], np.cumsum(np.bincount(assign, minlength=self.nlist))]
+            )
+        return self._order, self._offsets
+
+    def search(
+        self,
+        queries,
+        top_k: int,
+        return_vectors: bool = False,
+        nprobe: Optional[int] = None,
+    ) -> List[List[Neighbor]]:
+        if not self.trained:
+            return super().search(queries, top_k, return_vectors=return_vectors)
+
+        queries = self._prepare(queries)
+        nprobe = min(nprobe or self.nprobe, self.nlist)
+        with self._lock:
+            order, offsets = self._inverted_lists()
+            probes = top_k_indices(queries @ self._centroids.T, nprobe)
+            results = []
+            for q, clusters in zip(queries, probes):
+                candidates = np.concatenate(
+                    [order[offsets[c] : offsets[c + 1]] for c in clusters]
+                )
+                if len(candidates) == 0:
+                    results.append([])
+                    continue
+                scores = self._vectors[candidates] @ q
+                best = top_k_indices(scores[None, :], top_k)[0]
+                results.append(
+                    [
+                        Neighbor(
+                            self._ids[candidates[j]],
+                            float(scores[j]),
+                            np.array(self._vectors[candidates[j]])
+                            if return_vectors
+                            else None,
+                        )
+                        for j in best
+                    ]
+                )
+            return results
@@ -0,0 +1,238 @@
+# lexical_index.py
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Words plus compound codes such as "hr-204", "err_timeout" or "v2.1".
+_TOKEN = re.compile(r"[a-z0-9]+(?:[-_./:][a-z0-9]+)*")
+_SEPARATORS = re.compile(r"[-_./:]")
+_MAX_TOKEN_LENGTH = 64
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lower-cased word tokens. Compound codes are kept whole and also split into
+    their parts, so "ERR-404" matches both "err-404" and "404".
+    """
+    tokens = []
+    for token in _TOKEN.findall(text.lower()):
+        token = token[:_MAX_TOKEN_LENGTH]
+        tokens.append(token)
+        if _SEPARATORS.search(token):
+            tokens.extend(_SEPARATORS.split(token))
+    return tokens
+
+
+class BM25Index:
+    """
+    Okapi BM25 over an inverted index.
+
+    Postings are kept in CSR form (``offsets`` into parallel ``docs``/``tfs``
+    arrays per term) and saved as a compressed ``.npz``. Documents added since
+    the last save live in a small in-memory overlay and removed documents are
+    tombstoned; ``save`` folds both into a fresh CSR layout. Per-document
+    length norms are precomputed, so a query costs one vectorised pass over
+    the postings of its terms.
+    """
+
+    def __init__(self, path: Optional[str] = None, k1: float = 1.2, b: float = 0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self.ids: List[str] = []
+        self._doc_of: Dict[str, int] = {}
+        self._lens: List[int] = []
+        self._alive: List[bool] = []
+        self._total_len = 0
+        # Base CSR postings.
+        self._vocab: Dict[str, int] = {}
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._docs = np.empty(0, dtype=np.int32)
+        self._tfs = np.empty(0, dtype=np.float32)
+        # Overlay of postings added since the last compaction.
+        self._pending: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        self._norms: Optional[np.ndarray] = None
+        self._alive_mask: Optional[np.ndarray] = None
+        self._dirty = False
+        if path and os.path.exists(path):
+            self._load(path)
+
+    def __len__(self) -> int:
+        return len(self._doc_of)
+
+    # ─────────────────────────────── updates ─────────────────────────────── #
+
+    def add_many(self, items: Iterable[Tuple[str, str]]) -> None:
+        """Indexes ``(doc_id, text)`` pairs, replacing existing documents."""
+        with self._lock:
+            for doc_id, text in items:
+                self._remove(doc_id)
+                counts = Counter(tokenize(text))
+                doc = len(self.ids)
+                self.ids.append(doc_id)
+                self._doc_of[doc_id] = doc
+                length = sum(counts.values())
+                self._lens.append(length)
+                self._alive.append(True)
+                self._total_len += length
+                for term, tf in counts.items():
+                    self._pending[term].append((doc, tf))
+            self._norms = self._alive_mask = None
+            self._dirty = True
+
+    def remove_many(self, doc_ids: Iterable[str]) -> None:
+        with self._lock:
+            for doc_id in doc_ids:
+                self._remove(doc_id)
+            self._norms = self._alive_mask = None
+
+    def _remove(self, doc_id: str) -> None:
+        doc = self._doc_of.pop(doc_id, None)
+        if doc is None:
+            return
+        self._alive[doc] = False
+        self._total_len -= self._lens[doc]
+        self._dirty = True
+
+    # ──────────────────────────────── search ─────────────────────────────── #
+
+    def _doc_norms(self) -> np.ndarray:
+        """``k1 * (1 - b + b * len / avgdl)`` per document, cached."""
+        if self._norms is None:
+            lens = np.asarray(self._lens, dtype=np.float32)
+            avgdl = self._total_len / max(len(self._doc_of), 1) or 1.0
+            self._norms = self.k1 * (1 - self.b + self.b * lens / avgdl)
+        return self._norms
+
+    def _postings(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        docs, tfs = [], []
+        tid = self._vocab.get(term)
+        if tid is not None:
+            start, end = self._offsets[tid], self._offsets[tid + 1]
+            docs.append(self._docs[start:end])
+            tfs.append(self._tfs[start:end])
+        pending = self._pending.get(term)
+        if pending:
+            arr = np.asarray(pending, dtype=np.int64)
+            docs.append(arr[:, 0].astype(np.int32))
+            tfs.append(arr[:, 1].astype(np.float32))
+        if not docs:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+        docs, tfs = np.concatenate(docs), np.concatenate(tfs)
+        if self._alive_mask is None:
+            self._alive_mask = np.asarray(self._alive, dtype=bool)
+        alive = self._alive_mask[docs]
+        return docs[alive], tfs[alive]
+
+    def search(self, query: str, top_k: int) -> List[Tuple[str, float]]:
+        """Returns up to *top_k* ``(doc_id, score)`` pairs, best first."""
+        with self._lock:
+            n = len(self._doc_of)
+            terms = set(tokenize(query))
+            if n == 0 or not terms:
+                return []
+            norms = self._doc_norms()
+            all_docs, all_scores = [], []
+            for term in terms:
+                docs, tfs = self._postings(term)
+                if len(docs) == 0:
+                    continue
+                idf = np.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+                all_docs.append(docs)
+                all_scores.append(idf * tfs * (self.k1 + 1) / (tfs + norms[docs]))
+            if not all_docs:
+                return []
+            docs = np.concatenate(all_docs)
+            scores = np.concatenate(all_scores)
+            unique_docs, inverse = np.unique(docs, return_inverse=True)
+            totals = np.bincount(inverse, weights=scores)
+            k = min(top_k, len(unique_docs))
+            best = np.argpartition(-totals, k - 1)[:k]
+            best = best[np.argsort(-totals[best])]
+            return [(self.ids[unique_docs[i]], float(totals[i])) for i in best]
+
+    # ───────────────────────────── persistence ───────────────────────────── #
+
+    def _compact(self) -> None:
+        """Rebuilds the CSR postings without tombstoned documents."""
+        alive = np.asarray(self._alive, dtype=bool)
+        remap = np.full(len(self.ids), -1, dtype=np.int64)
+        remap[alive] = np.arange(int(alive.sum()))
+
+        terms = set(self._vocab) | set(self._pending)
+        vocab, offsets, docs, tfs = {}, [0], [], []
+        for term in sorted(terms):
+            term_docs, term_tfs = self._postings(term)
+            if len(term_docs) == 0:
+                continue
+            vocab[term] = len(vocab)
+            docs.append(remap[term_docs].astype(np.int32))
+            tfs.append(term_tfs)
+            offsets.append(offsets[-1] + len(term_docs))
+
+        self.ids = [doc_id for doc_id, a in zip(self.ids, self._alive) if a]
+        self._doc_of = {doc_id: i for i, doc_id in enumerate(self.ids)}
+        self._lens = [length for length, a in zip(self._lens, self._alive) if a]
+        self._alive = [True] * len(self.ids)
+        self._vocab = vocab
+        self._offsets = np.asarray(offsets, dtype=np.int64)
+        self._docs = np.concatenate(docs) if docs else np.empty(0, dtype=np.int32)
+        self._tfs = np.concatenate(tfs) if tfs else np.empty(0, dtype=np.float32)
+        self._pending = defaultdict(list)
+        self._norms = self._alive_mask = None
+
+    def save(self, path: Optional[str] = None) -> None:
+        path = path or self.path
+        with self._lock:
+            if not self._dirty and path == self.path:
+                return
+            self._compact()
+            terms = sorted(self._vocab, key=self._vocab.get)
+            tmp_path = f"{path}.tmp.npz"
+            np.savez_compressed(
+                tmp_path,
+                vocab=np.frombuffer("\n".join(terms).encode("utf-8"), dtype=np.uint8),
+                ids=np.frombuffer("\n".join(self.ids).encode("utf-8"), dtype=np.uint8),
+                offsets=self._offsets,
+                docs=self._docs,
+                tfs=self._tfs.astype(np.uint16),
+                lens=np.asarray(self._lens, dtype=np.int32),
+                params=np.asarray([self.k1, self.b], dtype=np.float64),
+            )
+            os.replace(tmp_path, path)
+            self._dirty = False
+
+    def _load(self, path: str) -> None:
+        with np.load(path) as data:
+            vocab = data["vocab"].tobytes().decode("utf-8")
+            ids = data["ids"].tobytes().decode("utf-8")
+            terms = vocab.split("\n") if vocab else []
+            self.ids = ids.split("\n") if ids else []
+            self._vocab = {term: i for i, term in enumerate(terms)}
+            self._offsets = data["offsets"]
+            self._docs = data["docs"]
+            self._tfs = data["tfs"].astype(np.float32)
+            self._lens = data["lens"].tolist()
+            self.k1, self.b = (float(x) for x in data["params"])
+        self._doc_of = {doc_id: i for i, doc_id in enumerate(self.ids)}
+        self._alive = [True] * len(self.ids)
+        self._total_len = int(sum(self._lens))
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[str]], k: int = 60
+) -> List[Tuple[str, float]]:
+    """
+    Merges ranked ID lists: each list contributes ``1 / (k + rank)`` per ID.
+    Returns ``(id, fused_score)`` pairs, best first.
+    """
+    scores: Dict[str, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] += 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
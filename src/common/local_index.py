@@ -0,0 +1,168 @@
+# local_index.py
+import json
+import os
+import threading
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .vector_backends import Neighbor, VectorBackend
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Row-wise indices of the *k* largest *scores*, best first.
+
+    ``argpartition`` finds the top k in linear time; only those k are sorted.
+    """
+    k = min(k, scores.shape[1])
+    if k <= 0:
+        return np.empty((scores.shape[0], 0), dtype=np.int64)
+    part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(scores, part, axis=1), axis=1)
+    return np.take_along_axis(part, order, axis=1)
+
+
+class LocalVectorBackend(VectorBackend):
+    """
+    Exact in-process vector index over a contiguous float32 matrix.
+
+    The matrix is saved as ``vectors.npy`` next to an ``ids.json`` row map and
+    memory-mapped on load, so startup cost does not depend on corpus size.
+    Search is a single batched matrix product followed by ``argpartition``.
+    With ``metric="cosine"`` vectors and queries are L2-normalised first.
+    Without a *path* the index lives in memory only.
+    """
+
+    def __init__(self, path: Optional[str], dim: int, metric: str = "dot"):
+        if metric not in ("dot", "cosine"):
+            raise ValueError(f"Unsupported metric: {metric!r}")
+        self.path = path
+        self.dim = dim
+        self.metric = metric
+        self._lock = threading.RLock()
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._vectors = np.empty((0, dim), dtype=np.float32)
+        self._dirty = False
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    # ───────────────────────────── persistence ───────────────────────────── #
+
+    def _load(self) -> None:
+        if not self.path:
+            return
+        vectors_path = os.path.join(self.path, "vectors.npy")
+        ids_path = os.path.join(self.path, "ids.json")
+        if not os.path.exists(vectors_path):
+            return
+        with open(ids_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("metric", self.metric) != self.metric:
+            raise ValueError(
+                f"Index at {self.path} was built with metric {meta['metric']!r}"
+            )
+        # Read-only memory map; copied into a writable buffer on first change.
+        self._vectors = np.load(vectors_path, mmap_mode="r")
+        self._ids = meta["ids"]
+        self._rows = {id_: row for row, id_ in enumerate(self._ids)}
+
+    def flush(self) -> None:
+        with self._lock:
+            if not self._dirty or not self.path:
+                return
+            os.makedirs(self.path, exist_ok=True)
+            vectors_path = os.path.join(self.path, "vectors.npy")
+            ids_path = os.path.join(self.path, "ids.json")
+            np.save(f"{vectors_path}.tmp.npy", self._vectors[: len(self._ids)])
+            with open(f"{ids_path}.tmp", "w", encoding="utf-8") as f:
+                json.dump({"metric": self.metric, "ids": self._ids}, f)
+            os.replace(f"{vectors_path}.tmp.npy", vectors_path)
+            os.replace(f"{ids_path}.tmp", ids_path)
+            self._dirty = False
+
+    # ─────────────────────────────── updates ─────────────────────────────── #
+
+    def _prepare(self, vectors) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        if self.metric == "cosine":
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors = vectors / np.maximum(norms, 1e-12)
+        return vectors
+
+    def _ensure_capacity(self, needed: int) -> None:
+        """Makes the buffer writable and large enough for *needed* rows."""
+        capacity = self._vectors.shape[0]
+        if isinstance(self._vectors, np.memmap) or capacity < needed:
+            grown = capacity if capacity >= needed else 2 * capacity
+            new_capacity = max(needed, grown, 1024)
+            buffer = np.empty((new_capacity, self.dim), dtype=np.float32)
+            buffer[: len(self._ids)] = self._vectors[: len(self._ids)]
+            self._vectors = buffer
+
+    def _move_row(self, src: int, dst: int) -> None:
+        self._vectors[dst] = self._vectors[src]
+
+    def upsert(self, ids: Sequence[str], vectors) -> None:
+        vectors = self._prepare(vectors)
+        with self._lock:
+            new_ids = [i for i in dict.fromkeys(ids) if i not in self._rows]
+            self._ensure_capacity(len(self._ids) + len(new_ids))
+            for id_ in new_ids:
+                self._rows[id_] = len(self._ids)
+                self._ids.append(id_)
+            rows = np.fromiter((self._rows[i] for i in ids), dtype=np.int64, count=len(ids))
+            self._vectors[rows] = vectors
+            self._dirty = True
+
+    def delete(self, ids: Sequence[str]) -> None:
+        with self._lock:
+            self._ensure_capacity(len(self._ids))
+            for id_ in ids:
+                row = self._rows.pop(id_, None)
+                if row is None:
+                    continue
+                # Swap-remove keeps the matrix contiguous.
+                last = len(self._ids) - 1
+                if row != last:
+                    moved = self._ids[last]
+                    self._move_row(last, row)
+                    self._ids[row] = moved
+                    self._rows[moved] = row
+                self._ids.pop()
+                self._dirty = True
+
+    # ──────────────────────────────── search ─────────────────────────────── #
+
+    def search(self, queries, top_k: int, return_vectors: bool = False) -> List[List[Neighbor]]:
+        queries = self._prepare(queries)
+        with self._lock:
+            n = len(self._ids)
+            if n == 0:
+                return [[] for _ in range(len(queries))]
+            scores = queries @ self._vectors[:n].T
+            best = top_k_indices(scores, top_k)
+            return [
+                [
+                    Neighbor(
+                        self._ids[j],
+                        float(scores[q, j]),
+                        np.array(self._vectors[j]) if return_vectors else None,
+                    )
+                    for j in best[q]
+                ]
+                for q in range(len(queries))
+            ]
+
+    def get_vectors(self, ids: Sequence[str]) -> Dict[str, np.ndarray]:
+        """
+        Stored vectors of the *ids* in the index (normalised when the metric
+        is cosine); unknown IDs are skipped.
+        """
+        with self._lock:
+            found = [i for i in ids if i in self._rows]
+            rows = [self._rows[i] for i in found]
+            return dict(zip(found, np.array(self._vectors[rows], dtype=np.float32)))
@@ -0,0 +1,126 @@
+# manifest.py
+import hashlib
+import json
+import os
+from typing import Dict, List, NamedTuple, Optional
+
+
+class ManifestDiff(NamedTuple):
+    changed: Dict[str, str]  # new or modified file -> content hash
+    removed: List[str]  # previously ingested files that no longer exist
+
+
+def canonical_path(path) -> str:
+    """
+    The one spelling of *path* used for manifest keys and chunk IDs: absolute,
+    normalised, with symlinks resolved. ``docs/a.pdf``, ``./docs/a.pdf`` and
+    ``/srv/docs/a.pdf`` all name the same file.
+    """
+    return os.path.realpath(os.fspath(path))
+
+
+class IngestManifest:
+    """
+    Local record of ingested files: content hash, mtime/size, chunk IDs and
+    their ``chunk_index``.
+
+    ``diff`` compares a directory listing against the manifest so an update run
+    only touches new or changed files. mtime and size are checked first; the
+    file is hashed only when they differ, so unchanged trees are cheap to scan.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.files: Dict[str, Dict] = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                files = json.load(f).get("files", {})
+            # Older manifests keyed files as typed; their chunk IDs stay valid.
+            self.files = {canonical_path(fp): entry for fp, entry in files.items()}
+
+    @staticmethod
+    def hash_file(file_path: str, block_size: int = 1 << 20) -> str:
+        """SHA-256 of the file contents."""
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(block_size), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def diff(self, file_paths: List[str], root_path: Optional[str] = None) -> ManifestDiff:
+        """
+        Returns files that need (re-)ingesting and previously ingested files
+        that disappeared. Only entries under *root_path* count as removed, so
+        one manifest can track several ingestion roots. Paths are compared in
+        ``canonical_path`` form.
+        """
+        file_paths = [canonical_path(fp) for fp in file_paths]
+        changed = {}
+        for file_path in file_paths:
+            stat = os.stat(file_path)
+            entry = self.files.get(file_path)
+            if entry and entry["mtime"] == stat.st_mtime and entry["size"] == stat.st_size:
+                continue
+            sha256 = self.hash_file(file_path)
+            if entry and entry["sha256"] == sha256:
+                # Touched but not modified: refresh the stat fields only.
+                entry["mtime"], entry["size"] = stat.st_mtime, stat.st_size
+                continue
+            changed[file_path] = sha256
+
+        present = set(file_paths)
+        removed = [fp for fp in self.files_under(root_path) if fp not in present]
+        return ManifestDiff(changed=changed, removed=removed)
+
+    def files_under(self, root_path: Optional[str] = None) -> List[str]:
+        """Ingested files that are *root_path* or inside it (all if ``None``)."""
+        return [fp for fp in self.files if _is_under(fp, root_path)]
+
+    def chunk_ids(self, file_path: str) -> List[str]:
+        """Chunk IDs recorded for *file_path* (empty if never ingested)."""
+        return list(self.files.get(canonical_path(file_path), {}).get("chunk_ids", []))
+
+    def chunk_indexes(self, file_path: str) -> Dict[str, int]:
+        """
+        ``{chunk_id: chunk_index}`` recorded for *file_path*. Entries written
+        before indexes were recorded fall back to list positions.
+        """
+        entry = self.files.get(canonical_path(file_path), {})
+        chunk_ids = entry.get("chunk_ids", [])
+        indexes = entry.get("chunk_indexes") or range(len(chunk_ids))
+        return dict(zip(chunk_ids, indexes))
+
+    def record(
+        self,
+        file_path: str,
+        sha256: str,
+        chunk_ids: List[str],
+        chunk_indexes: Optional[List[int]] = None,
+    ) -> None:
+        stat = os.stat(file_path)
+        entry = {
+            "sha256": sha256,
+            "mtime": stat.st_mtime,
+            "size": stat.st_size,
+            "chunk_ids": list(chunk_ids),
+        }
+        if chunk_indexes is not None:
+            entry["chunk_indexes"] = list(chunk_indexes)
+        self.files[canonical_path(file_path)] = entry
+
+    def forget(self, file_path: str) -> None:
+        self.files.pop(canonical_path(file_path), None)
+
+    def save(self) -> None:
+        """Writes the manifest atomically (temp file + rename)."""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "files": self.files}, f)
+        os.replace(tmp_path, self.path)
+
+
+def _is_under(file_path: str, root_path: Optional[str]) -> bool:
+    if root_path is None:
+        return True
+    root = canonical_path(root_path)
+    return file_path == root or file_path.startswith(root.rstrip(os.sep) + os.sep)
@@ -0,0 +1,146 @@
+# metrics.py
+"""
+In-process latency histograms and counters for the query hot path, rendered
+in the Prometheus text format by the web servers' ``/metrics`` endpoints.
+
+Recording is a ``bisect`` into fixed buckets under a lock, so spans can stay
+on in production. Metrics are per process: retrieval spans recorded inside a
+deployed agent show up on that process's registry, not the web server's.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, List, Sequence, Tuple
+
+# Seconds; covers cache hits (ms) through long agent turns.
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0
+)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._help: Dict[str, Tuple[str, str]] = {}  # name -> (type, description)
+        self._buckets: Dict[str, Sequence[float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, _Histogram]] = {}
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+
+    def histogram(
+        self, name: str, description: str, buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> None:
+        with self._lock:
+            self._help[name] = ("histogram", description)
+            self._buckets[name] = tuple(buckets)
+            self._histograms.setdefault(name, {})
+
+    def counter(self, name: str, description: str) -> None:
+        with self._lock:
+            self._help[name] = ("counter", description)
+            self._counters.setdefault(name, {})
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._histograms[name]
+            hist = series.get(key)
+            if hist is None:
+                hist = series[key] = _Histogram(self._buckets[name])
+            hist.observe(value)
+
+    def inc(self, name: str, amount: float = 1, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters[name]
+            series[key] = series.get(key, 0) + amount
+
+    @contextmanager
+    def span(self, name: str, **labels: str):
+        """Observes the wall-clock time of the ``with`` block into *name*."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        lines: List[str] = []
+        with self._lock:
+            for name, (kind, description) in sorted(self._help.items()):
+                lines.append(f"# HELP {name} {description}")
+                lines.append(f"# TYPE {name} {kind}")
+                if kind == "counter":
+                    for key, value in sorted(self._counters[name].items()):
+                        lines.append(f"{name}{_labels(key)} {value:g}")
+                    continue
+                for key, hist in sorted(self._histograms[name].items()):
+                    cumulative = 0
+                    for bound, count in zip(hist.buckets, hist.counts):
+                        cumulative += count
+                        le = (("le", f"{bound:g}"),)
+                        lines.append(f"{name}_bucket{_labels(key + le)} {cumulative}")
+                    inf = (("le", "+Inf"),)
+                    lines.append(f"{name}_bucket{_labels(key + inf)} {hist.count}")
+                    lines.append(f"{name}_sum{_labels(key)} {hist.sum:.6f}")
+                    lines.append(f"{name}_count{_labels(key)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(key: LabelKey) -> str:
+    if not key:
+        return ""
+    escaped = (
+        (k, v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in key
+    )
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+
+# Content-Type of ``MetricsRegistry.render`` output.
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+metrics = MetricsRegistry()
+
+# Retrieval (``retrieve_documents`` and ``VectorStore`` searches)
+metrics.histogram("rag_query_embedding_seconds", "Query embedding latency.")
+metrics.histogram(
+    "rag_find_neighbors_seconds", "Vector Search find_neighbors latency."
+)
+metrics.histogram("rag_hydration_seconds", "Chunk document hydration latency.")
+metrics.histogram(
+    "rag_retrieval_seconds", "End-to-end retrieve_documents latency, by result cache."
+)
+
+# Chat turns (web servers)
+metrics.histogram(
+    "chat_answer_cache_lookup_seconds", "Semantic answer cache lookup latency."
+)
+metrics.histogram(
+    "chat_time_to_first_tool_call_seconds",
+    "Time from sending a question to the agent's first tool call.",
+)
+metrics.histogram(
+    "chat_time_to_first_token_seconds",
+    "Time from sending a question to the first model text.",
+)
+metrics.histogram("chat_turn_seconds", "Total chat turn latency, by outcome.")
+metrics.counter("chat_turns_total", "Chat turns, by outcome.")
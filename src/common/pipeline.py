@@ -0,0 +1,54 @@
+# pipeline.py
+import queue
+import threading
+from typing import Iterable, Iterator, TypeVar
+
+T = TypeVar("T")
+
+_ITEM, _DONE, _ERROR = range(3)
+
+
+def prefetch(iterable: Iterable[T], maxsize: int) -> Iterator[T]:
+    """
+    Runs *iterable* on a background thread and yields its items through a
+    queue holding at most *maxsize* of them.
+
+    Chaining ``prefetch`` over generator stages makes the stages run
+    concurrently while the bounded queue applies backpressure: a stage that
+    gets ahead blocks instead of buffering the whole corpus. Errors raised by
+    the producer are re-raised in the consumer, and closing the consumer early
+    stops the producer.
+    """
+    items: queue.Queue = queue.Queue(maxsize=max(1, maxsize))
+    stop = threading.Event()
+
+    def put(entry) -> bool:
+        while not stop.is_set():
+            try:
+                items.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce() -> None:
+        try:
+            for item in iterable:
+                if not put((_ITEM, item)):
+                    return
+            put((_DONE, None))
+        except BaseException as e:
+            put((_ERROR, e))
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            kind, value = items.get()
+            if kind == _DONE:
+                return
+            if kind == _ERROR:
+                raise value
+            yield value
+    finally:
+        stop.set()
@@ -1,61 +1,264 @@
-from typing import List, Dict, Any
-import PyPDF2
-from docx import Document
-import markdown
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+from collections import Counter, deque
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+import hashlib
+import math
+import multiprocessing
+import time
 import os
-import pandas as pd
-import pytesseract
-from PIL import Image
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 from .config import settings
+from .manifest import canonical_path
+from .profiling import ingest_profiler
+
+
+# Formats whose extraction is CPU-bound (parsing, OCR) and benefits from
+# running in separate processes rather than threads.
+CPU_BOUND_TYPES = {".pdf", ".png", ".jpg", ".jpeg"}
 
 
 class DocumentProcessor:
-    def __init__(self):
+    def __init__(
+        self,
+        process_workers: Optional[int] = None,
+        thread_workers: Optional[int] = None,
+        file_timeout: Optional[float] = None,
+        chunk_size: int = 1000,
+        chunk_overlap: int = 50,
+    ):
         # self.supported_types = settings.SUPPORTED_FILE_TYPES
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=50,
-            length_function=len,
-            is_separator_regex=False,
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self._text_splitter = None
+        self.process_workers = (
+            settings.EXTRACT_PROCESS_WORKERS if process_workers is None else process_workers
+        )
+        self.thread_workers = (
+            settings.EXTRACT_THREAD_WORKERS if thread_workers is None else thread_workers
         )
+        self.file_timeout = (
+            settings.EXTRACT_FILE_TIMEOUT if file_timeout is None else file_timeout
+        )
+        # file_path -> error message for files skipped by the last run
+        self.failed_files: Dict[str, str] = {}
+
+    @property
+    def text_splitter(self):
+        # Format parsers and langchain are imported on first use, so callers
+        # that never extract or chunk (e.g. ``data_ingestion.py remove``)
+        # start without them.
+        if self._text_splitter is None:
+            from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+            self._text_splitter = RecursiveCharacterTextSplitter(
+                chunk_size=self.chunk_size,
+                chunk_overlap=self.chunk_overlap,
+                length_function=len,
+                is_separator_regex=False,
+            )
+        return self._text_splitter
 
     def process_document(self, root_path: str) -> List[Dict[str, Any]]:
         """Process a document and return chunks with metadata."""
-        print("Processing data...")
+        return self.process_files(self.list_files(root_path))
+
+    def list_files(self, root_path: str) -> List[str]:
+        """
+        Return every file under *root_path* in a stable (sorted) order, as
+        ``canonical_path`` paths, so the manifest keys and chunk IDs derived
+        from them do not depend on how the root was spelled.
+        """
         if not os.path.exists(root_path):
-            raise FileNotFoundError(f"File not found: {file_path}")
+            raise FileNotFoundError(f"File not found: {root_path}")
+        if os.path.isfile(root_path):
+            return [canonical_path(root_path)]
 
-        chunks_collection = []
+        file_paths = []
         for root, dirs, files in os.walk(root_path):
-            for file in files:
-                file_path = os.path.join(root, file)
+            dirs.sort()
+            for file in sorted(files):
+                file_paths.append(canonical_path(os.path.join(root, file)))
+        return file_paths
+
+    def process_files(self, file_paths: List[str]) -> List[Dict[str, Any]]:
+        """
+        Extract and chunk the given files and return chunks with metadata.
+
+        Files that fail or time out are skipped and listed in
+        ``self.failed_files``; output order always follows *file_paths*.
+        """
+        results = []
+        for _, chunks in self.iter_processed_files(file_paths):
+            results.extend(chunks or [])
+        return results
+
+    def iter_processed_files(
+        self, file_paths: List[str], max_in_flight: Optional[int] = None
+    ) -> Iterator[Tuple[str, Optional[List[Dict[str, Any]]]]]:
+        """
+        Yields ``(file_path, chunks)`` per file in input order, with at most
+        *max_in_flight* files being extracted ahead of the consumer. ``chunks``
+        is ``None`` for files that failed (see ``self.failed_files``).
+        """
+        print("Processing data...")
+        self.failed_files = {}
+        for file_path, text in self._iter_extracted(file_paths, max_in_flight):
+            if text is None:
+                yield file_path, None
+                continue
+            # Chunk the text and add metadata
+            chunks = self._chunk_text(text)
+            yield file_path, self._add_metadata(
+                [{"chunks": chunks, "file_path": file_path}]
+            )
+
+        if self.failed_files:
+            print(f"Skipped {len(self.failed_files)} files that failed to extract")
+
+    def extract_text(self, file_path: str) -> str:
+        """Extract text based on file type."""
+        file_ext = os.path.splitext(file_path)[1].lower()
+        # if file_ext not in self.supported_types:
+        # raise ValueError(f"Unsupported file type: {file_ext}")
+        if file_ext == ".pdf":
+            return self._extract_pdf_text(file_path)
+        elif file_ext == ".docx":
+            return self._extract_docx_text(file_path)
+        elif file_ext == ".md":
+            return self._extract_markdown_text(file_path)
+        elif file_ext == ".csv":
+            return self._extract_csv(file_path)
+        elif file_ext in [".png", ".jpeg", ".jpg"]:
+            return self._extract_image(file_path)
+        else:  # .txt
+            return self._extract_text_file(file_path)
+
+    def _iter_extracted(
+        self, file_paths: List[str], max_in_flight: Optional[int] = None
+    ) -> Iterator[Tuple[str, Optional[str]]]:
+        """
+        Extracts files concurrently: CPU-bound formats on a process pool, the
+        rest on a thread pool. Yields texts in input order, ``None`` for files
+        that raised or did not finish within ``file_timeout`` seconds.
+
+        At most *max_in_flight* files are queued ahead, and a pool is never
+        given more files than it has workers, so a file's timeout runs from
+        when a worker picks it up. A timeout replaces the file's pool: process
+        workers are terminated and their unfinished files resubmitted, so one
+        hung document does not hold a worker for the rest of the run.
+        """
+        window = max_in_flight or max(1, len(file_paths))
+        use_processes = self.process_workers > 0 and any(
+            os.path.splitext(fp)[1].lower() in CPU_BOUND_TYPES for fp in file_paths
+        )
+        workers = {"thread": max(1, self.thread_workers), "process": self.process_workers}
+        pools: Dict[str, Any] = {"thread": None, "process": None}
+        # [file_path, pool kind, future (None until submitted), deadline]
+        entries: deque = deque()
+        abandoned = False
+
+        def new_pool(kind: str):
+            if kind == "thread":
+                return ThreadPoolExecutor(max_workers=workers["thread"])
+            # Workers are spawned rather than forked: this runs on a pipeline
+            # thread of a process that already has others (gRPC, prefetch),
+            # and forking a multi-threaded process can deadlock the child.
+            return ProcessPoolExecutor(
+                max_workers=workers["process"],
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+
+        def submit_ready() -> None:
+            running = Counter(
+                kind for _, kind, future, _ in entries
+                if future is not None and not future.done()
+            )
+            for entry in entries:
+                file_path, kind, future, _ = entry
+                if future is not None or running[kind] >= workers[kind]:
+                    continue
+                if pools[kind] is None:
+                    pools[kind] = new_pool(kind)
+                if kind == "process":
+                    entry[2] = pools[kind].submit(_extract_in_worker, file_path)
+                else:
+                    entry[2] = pools[kind].submit(_timed, self.extract_text, file_path)
+                entry[3] = (
+                    time.monotonic() + self.file_timeout if self.file_timeout else math.inf
+                )
+                running[kind] += 1
+
+        def recycle(kind: str) -> None:
+            """Replaces the pool of a file that timed out."""
+            nonlocal abandoned
+            pool, pools[kind] = pools[kind], None
+            if kind == "process":
+                # No public API stops a busy worker; terminate them, then
+                # resubmit whatever else was running on this pool.
+                for process in list(getattr(pool, "_processes", {}).values()):
+                    process.terminate()
+                pool.shutdown(wait=False, cancel_futures=True)
+                for entry in entries:
+                    if entry[1] == kind and entry[2] is not None and not entry[2].done():
+                        entry[2] = None
+            else:
+                # A thread cannot be stopped: leave it running on the old pool,
+                # whose other files finish normally.
+                abandoned = True
+                pool.shutdown(wait=False)
+
+        def collect() -> Tuple[str, Optional[str]]:
+            while True:
+                submit_ready()
+                file_path, kind, future, deadline = entries[0]
+                if future.done():
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    entries.popleft()
+                    recycle(kind)
+                    self._record_failure(file_path, f"timed out after {self.file_timeout}s")
+                    return file_path, None
+                # Wake up for any completion, so freed workers get new files.
+                running = [e[2] for e in entries if e[2] is not None and not e[2].done()]
+                wait(running, timeout=remaining, return_when=FIRST_COMPLETED)
+            entries.popleft()
+            try:
+                # Timed in the worker, so time spent queued is not counted.
+                text, seconds = future.result()
+                ingest_profiler.record_file(file_path, seconds)
+                return file_path, text
+            except Exception as e:
+                self._record_failure(file_path, f"{type(e).__name__}: {e}")
+            return file_path, None
+
+        try:
+            for file_path in file_paths:
                 file_ext = os.path.splitext(file_path)[1].lower()
-                # if file_ext not in self.supported_types:
-                # raise ValueError(f"Unsupported file type: {file_ext}")
-
-                # Extract text based on file type
-                if file_ext == ".pdf":
-                    text = self._extract_pdf_text(file_path)
-                elif file_ext == ".docx":
-                    text = self._extract_docx_text(file_path)
-                elif file_ext == ".md":
-                    text = self._extract_markdown_text(file_path)
-                elif file_ext == ".csv":
-                    text = self._extract_csv(file_path)
-                elif file_ext in [".png", "jpeg", "jpg"]:
-                    text = self._extract_image(file_path)
-                else:  # .txt
-                    text = self._extract_text_file(file_path)
-
-                # Chunk the text
-                chunks = self._chunk_text(text)
-                chunks_collection.append({"chunks": chunks, "file_path": file_path})
-
-        # Add metadata to chunks
-        return self._add_metadata(chunks_collection)
+                kind = "process" if use_processes and file_ext in CPU_BOUND_TYPES else "thread"
+                entries.append([file_path, kind, None, math.inf])
+                submit_ready()
+                if len(entries) >= window:
+                    yield collect()
+            while entries:
+                yield collect()
+        finally:
+            for pool in pools.values():
+                if pool is not None:
+                    # Do not block on a thread stuck in a timed-out file.
+                    pool.shutdown(wait=not abandoned, cancel_futures=True)
+
+    def _record_failure(self, file_path: str, error: str) -> None:
+        print(f"Failed to extract {file_path}: {error}")
+        self.failed_files[file_path] = error
 
     def _extract_csv(self, file_path: str) -> str:
+        import pandas as pd
+
         texts = ""
         df = pd.read_csv(file_path)
         for i, row in df.iterrows():
@@ -64,12 +267,17 @@ class DocumentProcessor:
         return texts
 
     def _extract_image(self, file_path: str) -> str:
+        import pytesseract
+        from PIL import Image
+
         img = Image.open(file_path)
         text = pytesseract.image_to_string(img)
         return text
 
     def _extract_pdf_text(self, file_path: str) -> str:
         """Extract text from PDF file."""
+        import PyPDF2
+
         text = ""
         with open(file_path, "rb") as file:
             pdf_reader = PyPDF2.PdfReader(file)
@@ -79,11 +287,15 @@ class DocumentProcessor:
 
     def _extract_docx_text(self, file_path: str) -> str:
         """Extract text from DOCX file."""
+        from docx import Document
+
         doc = Document(file_path)
         return "\n".join([paragraph.text for paragraph in doc.paragraphs])
 
     def _extract_markdown_text(self, file_path: str) -> str:
         """Extract text from Markdown file."""
+        import markdown
+
         with open(file_path, "r", encoding="utf-8") as file:
             md_text = file.read()
             return markdown.markdown(md_text)
@@ -95,28 +307,59 @@ class DocumentProcessor:
 
     def _chunk_text(self, text: str) -> List[str]:
         """Split text into overlapping chunks."""
+        start = time.perf_counter()
         chunks = self.text_splitter.split_text(text)
-
+        ingest_profiler.record(
+            "chunk", time.perf_counter() - start, chunks=len(chunks), chars=len(text)
+        )
         return chunks
 
     def _add_metadata(self, chunks_collection: List[dict]) -> List[Dict[str, Any]]:
         """Add metadata to each chunk."""
         results = []
-        idx = 0
         for data in chunks_collection:
             chunks = data["chunks"]
             file_path = data["file_path"]
             file_name = os.path.basename(file_path)
-            for chunk in chunks:
+            seen = set()
+            for idx, chunk in enumerate(chunks):
+                chunk_id = make_chunk_id(file_path, chunk)
+                if chunk_id in seen:  # identical text repeated within a file
+                    continue
+                seen.add(chunk_id)
                 results.append(
                     {
                         "text": chunk,
                         "metadata": {
+                            "chunk_id": chunk_id,
                             "source": file_path,
                             "file_name": file_name,
                             "chunk_index": idx,
                         },
                     }
                 )
-                idx += 1
         return results
+
+
+_worker_processor: Optional[DocumentProcessor] = None
+
+
+def _timed(extract, file_path: str) -> Tuple[str, float]:
+    """Runs *extract* on *file_path*; returns ``(text, seconds)``."""
+    start = time.perf_counter()
+    text = extract(file_path)
+    return text, time.perf_counter() - start
+
+
+def _extract_in_worker(file_path: str) -> Tuple[str, float]:
+    """Process-pool entry point; reuses one processor per worker process."""
+    global _worker_processor
+    if _worker_processor is None:
+        _worker_processor = DocumentProcessor(process_workers=0, thread_workers=1)
+    return _timed(_worker_processor.extract_text, file_path)
+
+
+def make_chunk_id(source: str, text: str) -> str:
+    """Content-addressed chunk ID: stable across runs for the same file and text."""
+    digest = hashlib.sha256(f"{source}\0{text}".encode("utf-8")).hexdigest()
+    return digest[:32]
@@ -0,0 +1,155 @@
+# profiling.py
+"""
+Lightweight timing and counters for the ingestion pipeline.
+
+Instrumented code records into the module-level ``ingest_profiler``; the
+cost is one ``perf_counter`` pair and a locked dict update per event, so it
+is always on. ``data_ingestion.py`` prints (and optionally saves) the report
+at the end of a run. Stages overlap in the streaming pipeline, so stage
+totals are busy time per stage, not shares of the wall-clock time.
+"""
+import os
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+class _Stage:
+    __slots__ = ("count", "seconds", "max_seconds", "counters")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.counters: Dict[str, float] = defaultdict(int)
+
+
+class IngestProfiler:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stages: Dict[str, _Stage] = defaultdict(_Stage)
+            self._files: List[Dict[str, Any]] = []
+            self._started = time.perf_counter()
+
+    # ─────────────────────────────── recording ───────────────────────────── #
+
+    def record(self, stage: str, seconds: float, **counters: float) -> None:
+        """Adds one timed event (plus counters such as ``chunks=10``) to *stage*."""
+        with self._lock:
+            s = self._stages[stage]
+            s.count += 1
+            s.seconds += seconds
+            s.max_seconds = max(s.max_seconds, seconds)
+            for name, value in counters.items():
+                s.counters[name] += value
+
+    @contextmanager
+    def stage(self, stage: str, **counters: float):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start, **counters)
+
+    def record_file(self, file_path: str, extract_seconds: float) -> None:
+        """Per-file extraction timing, by file type."""
+        ext = os.path.splitext(file_path)[1].lower() or "(none)"
+        try:
+            size = os.path.getsize(file_path)
+        except OSError:
+            size = 0
+        self.record(f"extract{ext}", extract_seconds, files=1, bytes=size)
+        with self._lock:
+            self._files.append(
+                {"file_path": file_path, "seconds": extract_seconds, "bytes": size}
+            )
+
+    # ──────────────────────────────── report ─────────────────────────────── #
+
+    def report(self, slowest: int = 10) -> Dict[str, Any]:
+        with self._lock:
+            wall = time.perf_counter() - self._started
+            stages = {
+                name: {
+                    "count": s.count,
+                    "seconds": s.seconds,
+                    "mean_ms": s.seconds / s.count * 1000 if s.count else 0.0,
+                    "max_ms": s.max_seconds * 1000,
+                    **s.counters,
+                }
+                for name, s in sorted(self._stages.items())
+            }
+            files = sorted(self._files, key=lambda f: f["seconds"], reverse=True)
+
+        extract = [s for name, s in stages.items() if name.startswith("extract")]
+        n_files = sum(s.get("files", 0) for s in extract)
+        n_bytes = sum(s.get("bytes", 0) for s in extract)
+        n_chunks = stages.get("chunk", {}).get("chunks", 0)
+        return {
+            "wall_seconds": wall,
+            "files": n_files,
+            "chunks": n_chunks,
+            "bytes": n_bytes,
+            "files_per_second": n_files / wall if wall else 0.0,
+            "chunks_per_second": n_chunks / wall if wall else 0.0,
+            "bytes_per_second": n_bytes / wall if wall else 0.0,
+            "memory": peak_memory(),
+            "stages": stages,
+            "slowest_files": files[:slowest],
+        }
+
+
+def peak_memory() -> Dict[str, Optional[float]]:
+    """Peak RSS of this process and of (the largest) worker process, in MB."""
+    memory: Dict[str, Optional[float]] = {"peak_rss_mb": None, "peak_child_rss_mb": None}
+    if resource is not None:
+        # ru_maxrss is in kilobytes on Linux (bytes on macOS).
+        scale = 1024 * 1024 if os.uname().sysname == "Darwin" else 1024
+        memory["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+        memory["peak_child_rss_mb"] = (
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale
+        )
+    if tracemalloc.is_tracing():
+        memory["peak_python_heap_mb"] = tracemalloc.get_traced_memory()[1] / 2**20
+    return memory
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    mb = 2**20
+    print("\nIngestion profile")
+    print(
+        f"  {report['files']} files, {report['chunks']} chunks, "
+        f"{report['bytes'] / mb:.1f} MB in {report['wall_seconds']:.1f}s: "
+        f"{report['files_per_second']:.2f} files/s, "
+        f"{report['chunks_per_second']:.1f} chunks/s, "
+        f"{report['bytes_per_second'] / mb:.2f} MB/s"
+    )
+    memory = ", ".join(
+        f"{name} {value:.0f}" for name, value in report["memory"].items() if value is not None
+    )
+    print(f"  memory: {memory}")
+    print(f"  {'stage':<16}{'count':>8}{'busy s':>10}{'mean ms':>10}{'max ms':>10}")
+    for name, s in report["stages"].items():
+        print(
+            f"  {name:<16}{s['count']:>8}{s['seconds']:>10.2f}"
+            f"{s['mean_ms']:>10.1f}{s['max_ms']:>10.1f}"
+        )
+    if report["slowest_files"]:
+        print("  slowest files:")
+        for f in report["slowest_files"]:
+            print(f"    {f['seconds']:8.2f}s  {f['bytes'] / mb:8.2f} MB  {f['file_path']}")
+
+
+ingest_profiler = IngestProfiler()
@@ -0,0 +1,177 @@
+# quantization.py
+"""
+Compact codes for float32 embeddings.
+
+``ScalarQuantizer`` stores one byte per dimension (4x smaller);
+``ProductQuantizer`` splits a vector into ``m`` sub-vectors and stores the
+index of the nearest of 256 sub-centroids for each, i.e. ``m`` bytes per
+vector (32x smaller at 768 dimensions and ``m=96``). Both score float
+queries against codes directly (asymmetric distance computation), so
+queries lose no precision and stored vectors are never decoded in bulk.
+"""
+from typing import Dict
+
+import numpy as np
+
+# Rows scored per block: keeps the temporary float32 buffers in CPU cache.
+_BLOCK = 1024
+
+
+def _kmeans(x: np.ndarray, k: int, iterations: int = 12, seed: int = 0) -> np.ndarray:
+    """Euclidean k-means; returns ``(k, d)`` centroids."""
+    rng = np.random.default_rng(seed)
+    centroids = x[rng.choice(len(x), size=k, replace=len(x) < k)].copy()
+    x_sq = np.einsum("ij,ij->i", x, x)
+    for _ in range(iterations):
+        assign = _nearest(x, centroids, x_sq)
+        # Per-dimension bincount is much faster than np.add.at here.
+        sums = np.stack(
+            [np.bincount(assign, weights=x[:, d], minlength=k) for d in range(x.shape[1])],
+            axis=1,
+        )
+        counts = np.bincount(assign, minlength=k)
+        empty = counts == 0
+        # Re-seed empty clusters from random points so k stays effective.
+        sums[empty] = x[rng.choice(len(x), size=int(empty.sum()))]
+        counts[empty] = 1
+        centroids = (sums / counts[:, None]).astype(np.float32)
+    return centroids
+
+
+def _nearest(x: np.ndarray, centroids: np.ndarray, x_sq=None) -> np.ndarray:
+    """Index of the closest centroid (L2) for each row of *x*."""
+    if x_sq is None:
+        x_sq = np.einsum("ij,ij->i", x, x)
+    c_sq = np.einsum("ij,ij->i", centroids, centroids)
+    return np.argmin(x_sq[:, None] - 2 * x @ centroids.T + c_sq[None, :], axis=1)
+
+
+class ScalarQuantizer:
+    """
+    8-bit scalar quantization with a per-dimension range learned from the
+    training sample (0.1 / 99.9 percentiles, so outliers do not waste
+    resolution; values outside are clipped).
+    """
+
+    kind = "int8"
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        self.code_size = dim
+        self.low = None
+        self.scale = None
+
+    @property
+    def trained(self) -> bool:
+        return self.low is not None
+
+    def train(self, vectors: np.ndarray) -> None:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        low = np.quantile(vectors, 0.001, axis=0)
+        high = np.quantile(vectors, 0.999, axis=0)
+        self.low = low.astype(np.float32)
+        self.scale = (np.maximum(high - low, 1e-12) / 255).astype(np.float32)
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        codes = np.rint((np.asarray(vectors, dtype=np.float32) - self.low) / self.scale)
+        return np.clip(codes, 0, 255).astype(np.uint8)
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        return self.low + codes.astype(np.float32) * self.scale
+
+    def scores(self, queries: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        """Inner products of *queries* with the encoded vectors, ``(nq, n)``."""
+        # q·x ≈ q·low + (q * scale)·code
+        offset = queries @ self.low
+        weighted = queries * self.scale
+        out = np.empty((len(queries), len(codes)), dtype=np.float32)
+        for i in range(0, len(codes), _BLOCK):
+            block = codes[i : i + _BLOCK].astype(np.float32)
+            out[:, i : i + _BLOCK] = weighted @ block.T
+        out += offset[:, None]
+        return out
+
+    def state(self) -> Dict[str, np.ndarray]:
+        return {"low": self.low, "scale": self.scale}
+
+    def load_state(self, state) -> None:
+        self.low, self.scale = state["low"], state["scale"]
+
+
+class ProductQuantizer:
+    """
+    Product quantization: ``m`` sub-spaces of ``dim / m`` dimensions, each
+    with 256 k-means centroids. A query is scored against all centroids once
+    (an ``(m, 256)`` lookup table) and each vector's score is the sum of its
+    ``m`` table entries.
+    """
+
+    kind = "pq"
+    ksub = 256
+    # Training points per sub-centroid; more adds time but little accuracy.
+    train_points_per_centroid = 64
+
+    def __init__(self, dim: int, m: int = 96):
+        if dim % m:
+            raise ValueError(f"Dimension {dim} is not divisible by {m} sub-vectors")
+        self.dim = dim
+        self.m = m
+        self.dsub = dim // m
+        self.code_size = m
+        self.centroids = None  # (m, ksub, dsub)
+        # Offsets into the flattened (m * ksub) lookup table.
+        self._offsets = np.arange(m, dtype=np.intp) * self.ksub
+
+    @property
+    def trained(self) -> bool:
+        return self.centroids is not None
+
+    def _split(self, vectors: np.ndarray) -> np.ndarray:
+        return np.asarray(vectors, dtype=np.float32).reshape(-1, self.m, self.dsub)
+
+    def train(self, vectors: np.ndarray) -> None:
+        sub = self._split(vectors)
+        limit = self.ksub * self.train_points_per_centroid
+        if len(sub) > limit:
+            rng = np.random.default_rng(0)
+            sub = sub[rng.choice(len(sub), size=limit, replace=False)]
+        self.centroids = np.stack(
+            [_kmeans(np.ascontiguousarray(sub[:, j]), self.ksub) for j in range(self.m)]
+        )
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        sub = self._split(vectors)
+        codes = np.empty((len(sub), self.m), dtype=np.uint8)
+        for j in range(self.m):
+            codes[:, j] = _nearest(sub[:, j], self.centroids[j])
+        return codes
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        parts = self.centroids[np.arange(self.m), codes]  # (n, m, dsub)
+        return parts.reshape(len(codes), self.dim)
+
+    def scores(self, queries: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        """Inner products of *queries* with the encoded vectors, ``(nq, n)``."""
+        # (nq, m, ksub): each query sub-vector against its sub-centroids
+        tables = np.einsum("qmd,mkd->qmk", self._split(queries), self.centroids)
+        out = np.empty((len(queries), len(codes)), dtype=np.float32)
+        for i in range(0, len(codes), _BLOCK):
+            index = codes[i : i + _BLOCK].astype(np.intp) + self._offsets
+            for q, table in enumerate(tables):
+                out[q, i : i + _BLOCK] = table.ravel()[index].sum(axis=1)
+        return out
+
+    def state(self) -> Dict[str, np.ndarray]:
+        return {"centroids": self.centroids}
+
+    def load_state(self, state) -> None:
+        self.centroids = state["centroids"]
+
+
+def create_quantizer(kind: str, dim: int, pq_subvectors: int = 96):
+    """A quantizer by name: ``"int8"`` (scalar) or ``"pq"`` (product)."""
+    if kind == "int8":
+        return ScalarQuantizer(dim)
+    if kind == "pq":
+        return ProductQuantizer(dim, m=pq_subvectors)
+    raise ValueError(f"Unknown quantization: {kind!r}")
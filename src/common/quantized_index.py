@@ -0,0 +1,234 @@
+# quantized_index.py
+import json
+import os
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from .local_index import LocalVectorBackend, top_k_indices
+from .quantization import create_quantizer
+from .vector_backends import Neighbor
+
+
+class QuantizedVectorBackend(LocalVectorBackend):
+    """
+    Local index searched over compact codes (``quantization="int8"`` or
+    ``"pq"``) instead of the float32 matrix.
+
+    Codes are kept in memory and scored against float queries (asymmetric
+    distance). The float32 vectors stay the source of truth in
+    ``vectors.npy`` and are never loaded into RAM when the index has a
+    *path*: searches keep them memory-mapped and with *rescore* > 0 read just
+    the rows of the best *rescore* candidates to re-rank them at full
+    precision, and updates write to a memory-mapped working copy that
+    ``flush`` moves into place. Until the quantizer is
+    trained (``build``, or automatically once the index holds
+    ``MIN_TRAIN_VECTORS``) searches are exact. The quantizer and codes are
+    persisted next to the vectors.
+    """
+
+    MIN_TRAIN_VECTORS = 10_000
+
+    def __init__(
+        self,
+        path: Optional[str],
+        dim: int,
+        metric: str = "dot",
+        quantization: str = "int8",
+        pq_subvectors: int = 96,
+        rescore: int = 0,
+    ):
+        self.quantization = quantization
+        self.pq_subvectors = pq_subvectors
+        self.quantizer = create_quantizer(quantization, dim, pq_subvectors)
+        self.rescore = rescore
+        self._codes = np.empty((0, self.quantizer.code_size), dtype=np.uint8)
+        super().__init__(path, dim, metric=metric)
+
+    @property
+    def trained(self) -> bool:
+        return self.quantizer.trained
+
+    @property
+    def code_bytes(self) -> int:
+        """Bytes per stored vector in the searched representation."""
+        return self.quantizer.code_size if self.trained else 4 * self.dim
+
+    @property
+    def resident_bytes(self) -> int:
+        """
+        Bytes per vector held in process memory: the codes, plus the float32
+        row when the vectors are not memory-mapped (an index without a path).
+        """
+        codes = self.quantizer.code_size if self.trained else 0
+        return codes + (0 if isinstance(self._vectors, np.memmap) else 4 * self.dim)
+
+    # ───────────────────────────── persistence ───────────────────────────── #
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, f"{self.quantizer.kind}_{name}")
+
+    def _load(self) -> None:
+        super()._load()
+        if not self.path or not os.path.exists(self._file("quantizer.npz")):
+            return
+        codes = np.load(self._file("codes.npy"))
+        if len(codes) != len(self._ids):
+            # Vectors were changed without this quantizer; re-encode on build.
+            print(f"Quantized codes in {self.path} are stale; searching exactly until rebuilt")
+            return
+        with np.load(self._file("quantizer.npz")) as state:
+            self.quantizer.load_state({k: state[k] for k in state.files})
+        self._codes = codes
+
+    def _working_path(self) -> str:
+        return os.path.join(self.path, "vectors.work.npy")
+
+    def flush(self) -> None:
+        with self._lock:
+            dirty = self._dirty
+            if dirty and self._writable_on_disk():
+                self._publish_vectors()
+            else:
+                super().flush()
+            if dirty and self.trained and self.path:
+                np.savez(self._file("quantizer.npz"), **self.quantizer.state())
+                np.save(self._file("codes.npy"), self._codes[: len(self._ids)])
+
+    # ─────────────────────────────── training ────────────────────────────── #
+
+    def build(self, sample_size: int = 65_536) -> None:
+        """(Re)trains the quantizer on a sample and encodes every vector."""
+        with self._lock:
+            n = len(self._ids)
+            if n == 0:
+                return
+            vectors = self._vectors[:n]
+            rng = np.random.default_rng(0)
+            sample = vectors[np.sort(rng.choice(n, size=min(n, sample_size), replace=False))]
+            # Train and encode into new objects: the index only switches to
+            # codes once every row is encoded.
+            quantizer = create_quantizer(self.quantization, self.dim, self.pq_subvectors)
+            quantizer.train(np.asarray(sample))
+            # Sized to the vector buffer, which has spare capacity beyond n.
+            codes = np.zeros((self._vectors.shape[0], quantizer.code_size), dtype=np.uint8)
+            for i in range(0, n, 65_536):
+                end = min(i + 65_536, n)
+                codes[i:end] = quantizer.encode(vectors[i:end])
+            self.quantizer, self._codes = quantizer, codes
+            self._dirty = True
+
+    # ─────────────────────────────── updates ─────────────────────────────── #
+
+    def _writable_on_disk(self) -> bool:
+        """Whether the vectors are the memory-mapped working copy."""
+        return isinstance(self._vectors, np.memmap) and self._vectors.mode == "r+"
+
+    def _publish_vectors(self) -> None:
+        """Moves the working copy into place as ``vectors.npy`` (see ``flush``)."""
+        vectors_path = os.path.join(self.path, "vectors.npy")
+        ids_path = os.path.join(self.path, "ids.json")
+        # The working copy keeps its spare capacity; ids.json says how many
+        # rows are in use.
+        self._vectors.flush()
+        with open(f"{ids_path}.tmp", "w", encoding="utf-8") as f:
+            json.dump({"metric": self.metric, "ids": self._ids}, f)
+        os.replace(self._working_path(), vectors_path)
+        os.replace(f"{ids_path}.tmp", ids_path)
+        # Published files are read-only; the next change copies them again.
+        self._vectors = np.load(vectors_path, mmap_mode="r")
+        self._dirty = False
+
+    def _ensure_disk_capacity(self, needed: int) -> None:
+        """
+        Makes the float32 rows writable without reading them into RAM: they
+        are copied, file to file, into a memory-mapped working copy with room
+        for *needed* rows.
+        """
+        capacity = self._vectors.shape[0]
+        if self._writable_on_disk() and capacity >= needed:
+            return
+        grown = capacity if capacity >= needed else 2 * capacity
+        os.makedirs(self.path, exist_ok=True)
+        tmp_path = f"{self._working_path()}.tmp.npy"
+        shape = (max(needed, grown, 1024), self.dim)
+        buffer = np.lib.format.open_memmap(
+            tmp_path, mode="w+", dtype=np.float32, shape=shape
+        )
+        n = len(self._ids)
+        for i in range(0, n, 65_536):
+            end = min(i + 65_536, n)
+            buffer[i:end] = self._vectors[i:end]
+        buffer.flush()
+        del buffer
+        os.replace(tmp_path, self._working_path())
+        self._vectors = np.load(self._working_path(), mmap_mode="r+")
+
+    def _ensure_capacity(self, needed: int) -> None:
+        if self.path:
+            self._ensure_disk_capacity(needed)
+        else:
+            super()._ensure_capacity(needed)
+        if self.trained and self._codes.shape[0] < self._vectors.shape[0]:
+            grown = np.zeros(
+                (self._vectors.shape[0], self.quantizer.code_size), dtype=np.uint8
+            )
+            grown[: len(self._codes)] = self._codes
+            self._codes = grown
+
+    def _move_row(self, src: int, dst: int) -> None:
+        super()._move_row(src, dst)
+        if self.trained:
+            self._codes[dst] = self._codes[src]
+
+    def upsert(self, ids: Sequence[str], vectors) -> None:
+        with self._lock:
+            super().upsert(ids, vectors)
+            if self.trained:
+                rows = np.array([self._rows[i] for i in ids], dtype=np.int64)
+                self._codes[rows] = self.quantizer.encode(self._vectors[rows])
+            elif len(self._ids) >= self.MIN_TRAIN_VECTORS:
+                self.build()
+
+    # ──────────────────────────────── search ─────────────────────────────── #
+
+    def search(
+        self,
+        queries,
+        top_k: int,
+        return_vectors: bool = False,
+        rescore: Optional[int] = None,
+    ) -> List[List[Neighbor]]:
+        if not self.trained:
+            return super().search(queries, top_k, return_vectors=return_vectors)
+
+        queries = self._prepare(queries)
+        rescore = self.rescore if rescore is None else rescore
+        with self._lock:
+            n = len(self._ids)
+            if n == 0:
+                return [[] for _ in range(len(queries))]
+            approx = self.quantizer.scores(queries, self._codes[:n])
+            exact = rescore > top_k
+            best = top_k_indices(approx, rescore if exact else top_k)
+            results = []
+            for q in range(len(queries)):
+                if exact:
+                    # Full-precision re-ranking of the best approximate matches.
+                    rows = np.sort(best[q])
+                    scores = self._vectors[rows] @ queries[q]
+                    order = top_k_indices(scores[None, :], top_k)[0]
+                    hits = [(rows[j], scores[j]) for j in order]
+                else:
+                    hits = [(j, approx[q, j]) for j in best[q]]
+                results.append(
+                    [
+                        Neighbor(
+                            self._ids[j],
+                            float(score),
+                            np.array(self._vectors[j]) if return_vectors else None,
+                        )
+                        for j, score in hits
+                    ]
+                )
+            return results
@@ -0,0 +1,105 @@
+# query_cache.py
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """Case- and whitespace-insensitive form of a query, used in cache keys."""
+    return _WHITESPACE.sub(" ", query).strip().lower()
+
+
+class LRUCache:
+    """
+    Thread-safe LRU cache with an optional per-entry TTL.
+
+    Each entry remembers what it cost to compute (``cost`` seconds), so hits
+    can report how much latency the cache saved.
+    """
+
+    def __init__(self, max_entries: int, ttl: Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, cost, expires_at = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    self.saved_seconds += cost
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, value: Any, cost: float = 0.0) -> None:
+        expires_at = None if self.ttl is None else time.monotonic() + self.ttl
+        with self._lock:
+            self._entries[key] = (value, cost, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "saved_seconds": self.saved_seconds,
+            "entries": len(self._entries),
+        }
+
+
+def _version_ref(db, collection: str):
+    return db.collection(f"{collection}_meta").document("index")
+
+
+def bump_index_version(db, collection: str) -> None:
+    """Marks the index as changed; called after every upsert or delete."""
+    from google.cloud import firestore
+
+    _version_ref(db, collection).set({"version": firestore.Increment(1)}, merge=True)
+
+
+class IndexVersion:
+    """
+    Reads the index version written by ``bump_index_version``.
+
+    The value is re-read at most every *refresh_seconds* (0 = on every call),
+    which bounds how long a cached result can outlive an index update.
+    """
+
+    def __init__(self, db, collection: str, refresh_seconds: float = 0.0):
+        self._ref = _version_ref(db, collection)
+        self.refresh_seconds = refresh_seconds
+        self._version = 0
+        self._checked_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def get(self) -> int:
+        now = time.monotonic()
+        with self._lock:
+            if self._checked_at is not None and now - self._checked_at < self.refresh_seconds:
+                return self._version
+        snapshot = self._ref.get()
+        version = (snapshot.to_dict() or {}).get("version", 0) if snapshot.exists else 0
+        with self._lock:
+            self._version, self._checked_at = version, now
+        return version
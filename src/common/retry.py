@@ -0,0 +1,45 @@
+# retry.py
+import random
+import time
+from typing import Callable, Tuple, Type, TypeVar
+
+from google.api_core import exceptions as api_exceptions
+
+T = TypeVar("T")
+
+# Errors worth retrying: quota/rate limiting and transient backend failures.
+TRANSIENT_ERRORS: Tuple[Type[BaseException], ...] = (
+    api_exceptions.TooManyRequests,
+    api_exceptions.ResourceExhausted,
+    api_exceptions.ServiceUnavailable,
+    api_exceptions.DeadlineExceeded,
+    api_exceptions.InternalServerError,
+    api_exceptions.Aborted,
+)
+
+
+def call_with_backoff(
+    fn: Callable[..., T],
+    *args,
+    retry_on: Tuple[Type[BaseException], ...] = TRANSIENT_ERRORS,
+    max_attempts: int = 5,
+    base_delay: float = 1.0,
+    max_delay: float = 30.0,
+    **kwargs,
+) -> T:
+    """
+    Calls ``fn(*args, **kwargs)``, retrying *retry_on* errors with exponential
+    backoff and full jitter. The last error is re-raised after *max_attempts*.
+    """
+    for attempt in range(1, max_attempts + 1):
+        try:
+            return fn(*args, **kwargs)
+        except retry_on as e:
+            if attempt == max_attempts:
+                raise
+            delay = random.uniform(0, min(max_delay, base_delay * 2 ** (attempt - 1)))
+            print(
+                f"{type(e).__name__} (attempt {attempt}/{max_attempts}), "
+                f"retrying in {delay:.1f}s"
+            )
+            time.sleep(delay)
@@ -0,0 +1,166 @@
+# semantic_cache.py
+import itertools
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from .config import settings
+from .local_index import LocalVectorBackend
+
+
+class CachedAnswer(NamedTuple):
+    question: str
+    answer: str
+    # Documents the answer was grounded on ({"file_name", "file_path"}).
+    sources: List[Dict[str, Any]]
+    # Index version the answer was generated against.
+    index_version: int
+
+
+class SemanticAnswerCache:
+    """
+    Answers keyed by the meaning of the question rather than its exact text.
+
+    Question embeddings live in an in-memory cosine index; a lookup returns
+    the closest cached answer if its similarity reaches *threshold*. Each
+    entry records the index version it was answered against, and all entries
+    are dropped as soon as a lookup sees a different version, so
+    re-ingestion invalidates the cache. Beyond *max_entries* the least
+    recently used answers are evicted.
+    """
+
+    def __init__(self, dim: int, threshold: float = 0.92, max_entries: int = 2000):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._index = LocalVectorBackend(None, dim, metric="cosine")
+        self._entries: "OrderedDict[str, CachedAnswer]" = OrderedDict()
+        self._ids = itertools.count()
+        self._version: Optional[int] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._hit_similarity = 0.0
+
+    def _observe_version(self, version: int) -> None:
+        """
+        Drops every entry answered against another index version. Any change
+        counts, since a rebuilt chunk store starts counting again from zero.
+        """
+        if self._version is not None and version != self._version:
+            stale = [k for k, e in self._entries.items() if e.index_version != version]
+            self._index.delete(stale)
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+        self._version = version
+
+    def lookup(
+        self, embedding: Sequence[float], index_version: int
+    ) -> Optional[Tuple[CachedAnswer, float]]:
+        """Returns ``(answer, similarity)`` for the closest match, or None."""
+        with self._lock:
+            self._observe_version(index_version)
+            neighbors = self._index.search([embedding], 1)[0]
+            if neighbors and neighbors[0].distance >= self.threshold:
+                key = neighbors[0].id
+                entry = self._entries[key]
+                if entry.index_version == index_version:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    self._hit_similarity += neighbors[0].distance
+                    return entry, neighbors[0].distance
+            self.misses += 1
+            return None
+
+    def put(
+        self,
+        question: str,
+        embedding: Sequence[float],
+        answer: str,
+        sources: List[Dict[str, Any]],
+        index_version: int,
+    ) -> None:
+        with self._lock:
+            if self._version is None:
+                self._observe_version(index_version)
+            elif index_version != self._version:
+                # Answered against an index that lookups have since seen change.
+                return
+            key = str(next(self._ids))
+            self._index.upsert([key], [embedding])
+            self._entries[key] = CachedAnswer(question, answer, sources, index_version)
+            while len(self._entries) > self.max_entries:
+                oldest, _ = self._entries.popitem(last=False)
+                self._index.delete([oldest])
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "mean_hit_similarity": self._hit_similarity / self.hits if self.hits else 0.0,
+            "entries": len(self._entries),
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "index_version": self._version,
+        }
+
+
+class ChatAnswerCache:
+    """
+    ``SemanticAnswerCache`` wired to the embedding model and the index
+    version of the configured chunk store (Firestore or local), for use in
+    front of the agent by the web servers.
+    """
+
+    def __init__(self):
+        from .chunk_store import create_index_version
+        from .embedding_generator import EmbeddingGenerator
+
+        # Questions are not written to the ingestion embedding cache: that
+        # would put a SQLite write on every chat request and evict document
+        # embeddings.
+        self.embedder = EmbeddingGenerator(persistent_cache=False)
+        self.index_version = create_index_version(
+            settings.FIRESTORE_COLLECTION,
+            refresh_seconds=settings.SEMANTIC_CACHE_VERSION_REFRESH_SECONDS,
+        )
+        self.cache = SemanticAnswerCache(
+            settings.EMBEDDING_DIM,
+            threshold=settings.SEMANTIC_CACHE_THRESHOLD,
+            max_entries=settings.SEMANTIC_CACHE_SIZE,
+        )
+
+    def lookup(self, question: str) -> Tuple[Optional[CachedAnswer], tuple]:
+        """
+        Returns the cached answer (or None) and a key to pass to ``store``
+        after a miss, so the question is not embedded twice.
+        """
+        embedding = self.embedder.embed_texts([question.strip()])[0]
+        version = self.index_version.get()
+        match = self.cache.lookup(embedding, version)
+        return (match[0] if match else None), (embedding, version)
+
+    def store(
+        self, question: str, key: tuple, answer: str, sources: List[Dict[str, Any]]
+    ) -> None:
+        # Only grounded answers are cached: replies that did not retrieve
+        # anything (greetings, follow-ups relying on chat history) are not
+        # reusable across users.
+        if answer.strip() and sources:
+            embedding, version = key
+            self.cache.put(question, embedding, answer, sources, version)
+
+    def stats(self) -> Dict[str, float]:
+        return self.cache.stats()
+
+
+def create_answer_cache() -> Optional[ChatAnswerCache]:
+    """The configured answer cache, or None when ``SEMANTIC_CACHE_SIZE`` is 0."""
+    if settings.SEMANTIC_CACHE_SIZE <= 0:
+        return None
+    return ChatAnswerCache()
@@ -0,0 +1,224 @@
+# session_pool.py
+"""
+Agent-engine sessions for the async web server.
+
+Each browser gets its own session, so conversations are isolated and their
+history is bounded by idle eviction. Sessions are pre-created in the
+background and handed out on first use, and all blocking SDK calls run on a
+dedicated thread pool so they never stall the event loop.
+"""
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+_DONE = object()
+
+
+class _Session:
+    def __init__(self, session_id: str):
+        self.id = session_id
+        self.last_used = time.monotonic()
+        # One turn at a time per session; turns of other sessions run freely.
+        self.lock = asyncio.Lock()
+
+
+class AgentSessionPool:
+    def __init__(
+        self,
+        agent_engine,
+        user_id: str = "web",
+        max_concurrent_streams: int = 32,
+        idle_seconds: float = 1800,
+        max_sessions: int = 1000,
+        warm_sessions: int = 4,
+    ):
+        self.agent_engine = agent_engine
+        self.user_id = user_id
+        self.idle_seconds = idle_seconds
+        self.max_sessions = max_sessions
+        self.warm_sessions = warm_sessions
+        # Streams hold a thread for their whole duration; leave room for
+        # session create/delete calls next to them.
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrent_streams + max(warm_sessions, 4),
+            thread_name_prefix="agent",
+        )
+        self._stream_slots = asyncio.Semaphore(max_concurrent_streams)
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+        self._warm: asyncio.Queue = asyncio.Queue()
+        self._refill = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+        self._deletions: set = set()
+        self.active_streams = 0
+        self.sessions_created = 0
+        self.sessions_evicted = 0
+
+    # ───────────────────────────── lifecycle ─────────────────────────────── #
+
+    async def start(self) -> None:
+        self._tasks = [
+            asyncio.create_task(self._keep_warm()),
+            asyncio.create_task(self._evict_idle()),
+        ]
+        self._refill.set()
+
+    async def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _run(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, lambda: fn(*args, **kwargs))
+
+    async def _create_session(self) -> str:
+        session = await self._run(self.agent_engine.create_session, user_id=self.user_id)
+        self.sessions_created += 1
+        return session["id"]
+
+    async def _delete_session(self, session_id: str) -> None:
+        try:
+            await self._run(
+                self.agent_engine.delete_session,
+                user_id=self.user_id,
+                session_id=session_id,
+            )
+        except Exception as e:
+            print(f"Failed to delete session {session_id}: {e}")
+
+    async def _keep_warm(self) -> None:
+        """Tops up the queue of pre-created sessions whenever one is taken."""
+        while True:
+            await self._refill.wait()
+            self._refill.clear()
+            while self._warm.qsize() < self.warm_sessions:
+                try:
+                    self._warm.put_nowait(await self._create_session())
+                except Exception as e:
+                    print(f"Failed to pre-create session: {e}")
+                    await asyncio.sleep(5)
+
+    async def _evict_idle(self) -> None:
+        interval = max(1.0, min(60.0, self.idle_seconds / 4))
+        while True:
+            await asyncio.sleep(interval)
+            cutoff = time.monotonic() - self.idle_seconds
+            idle = [
+                client_id
+                for client_id, s in self._sessions.items()
+                if s.last_used < cutoff and not s.lock.locked()
+            ]
+            for client_id in idle:
+                await self._evict(client_id)
+
+    async def _evict(self, client_id: str) -> None:
+        session = self._sessions.pop(client_id, None)
+        if session is not None:
+            self.sessions_evicted += 1
+            task = asyncio.create_task(self._delete_session(session.id))
+            self._deletions.add(task)
+            task.add_done_callback(self._deletions.discard)
+
+    # ────────────────────────────── sessions ─────────────────────────────── #
+
+    async def _get_session(self, client_id: str) -> _Session:
+        session = self._sessions.get(client_id)
+        if session is None:
+            try:
+                session_id = self._warm.get_nowait()
+            except asyncio.QueueEmpty:
+                session_id = await self._create_session()
+            self._refill.set()
+            # Another request of the same client may have won the race.
+            session = self._sessions.setdefault(client_id, _Session(session_id))
+            if session.id != session_id:
+                self._warm.put_nowait(session_id)
+            # Least recently used first; sessions in the middle of a turn are
+            # kept, so the cap may be exceeded until they finish.
+            excess = len(self._sessions) - self.max_sessions
+            if excess > 0:
+                evictable = [
+                    other_id
+                    for other_id, s in self._sessions.items()
+                    if other_id != client_id and not s.lock.locked()
+                ]
+                for other_id in evictable[:excess]:
+                    await self._evict(other_id)
+        self._sessions.move_to_end(client_id)
+        session.last_used = time.monotonic()
+        return session
+
+    @asynccontextmanager
+    async def session(self, client_id: str):
+        """Holds *client_id*'s session (created on first use) for one turn."""
+        while True:
+            session = await self._get_session(client_id)
+            await session.lock.acquire()
+            # The session may have been evicted while this turn was queued.
+            if self._sessions.get(client_id) is session:
+                break
+            session.lock.release()
+        try:
+            yield session.id
+        finally:
+            session.last_used = time.monotonic()
+            session.lock.release()
+
+    # ────────────────────────────── streaming ────────────────────────────── #
+
+    async def stream_query(self, client_id: str, message: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yields ``stream_query`` events for one turn of *client_id*.
+
+        At most ``max_concurrent_streams`` upstream calls run at once; extra
+        requests wait for a slot. The blocking SDK iterator runs on a worker
+        thread and hands events over through an asyncio queue, and stops
+        early if the client goes away.
+        """
+        async with self.session(client_id) as session_id, self._stream_slots:
+            loop = asyncio.get_running_loop()
+            queue: asyncio.Queue = asyncio.Queue()
+            stop = threading.Event()
+
+            def pump() -> None:
+                try:
+                    for event in self.agent_engine.stream_query(
+                        user_id=self.user_id, session_id=session_id, message=message
+                    ):
+                        if stop.is_set():
+                            break
+                        loop.call_soon_threadsafe(queue.put_nowait, event)
+                except Exception as e:
+                    loop.call_soon_threadsafe(queue.put_nowait, e)
+                finally:
+                    loop.call_soon_threadsafe(queue.put_nowait, _DONE)
+
+            self.active_streams += 1
+            worker = loop.run_in_executor(self._executor, pump)
+            try:
+                while True:
+                    item = await queue.get()
+                    if item is _DONE:
+                        break
+                    if isinstance(item, Exception):
+                        raise item
+                    yield item
+            finally:
+                stop.set()
+                self.active_streams -= 1
+                # Keep the slot until the worker thread has really finished.
+                await asyncio.shield(worker)
+
+    def stats(self) -> Dict[str, Optional[int]]:
+        return {
+            "sessions": len(self._sessions),
+            "warm_sessions": self._warm.qsize(),
+            "active_streams": self.active_streams,
+            "sessions_created": self.sessions_created,
+            "sessions_evicted": self.sessions_evicted,
+        }
@@ -0,0 +1,349 @@
+# vector_backends.py
+"""
+Vector index backends behind ``VectorStore``.
+
+A backend only stores (ID, vector) pairs and answers nearest-neighbour
+queries; chunk text and metadata live elsewhere. ``create_backend`` picks the
+implementation named by ``settings.VECTOR_BACKEND``.
+"""
+from __future__ import annotations
+
+import json
+import os
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from .config import settings
+from .metrics import metrics
+from .retry import call_with_backoff
+
+
+class Neighbor(NamedTuple):
+    id: str
+    # Similarity score as returned by the backend (dot product / cosine for
+    # the default configurations): larger means closer.
+    distance: float
+    # Stored embedding, only filled when requested with ``return_vectors``.
+    vector: Optional[Sequence[float]] = None
+
+
+class VectorBackend(ABC):
+    # True when reads (``get_vectors``, ``return_vectors``) cost a network
+    # round trip rather than a memory access.
+    remote = False
+
+    @abstractmethod
+    def upsert(self, ids: Sequence[str], vectors: Sequence[Sequence[float]]) -> None:
+        """Inserts or replaces the vectors stored under *ids*."""
+
+    @abstractmethod
+    def delete(self, ids: Sequence[str]) -> None:
+        """Removes *ids*; unknown IDs are ignored."""
+
+    @abstractmethod
+    def search(
+        self,
+        queries: Sequence[Sequence[float]],
+        top_k: int,
+        return_vectors: bool = False,
+    ) -> List[List[Neighbor]]:
+        """
+        Returns the *top_k* neighbors of each query, best first; with
+        *return_vectors* each neighbor carries its stored embedding.
+        """
+
+    def get_vectors(self, ids: Sequence[str]) -> Dict[str, np.ndarray]:
+        """Stored vectors of the *ids* the index holds; unknown IDs are skipped."""
+        raise NotImplementedError(f"{type(self).__name__} cannot read vectors")
+
+    def flush(self) -> None:
+        """Persists pending changes (no-op for remote backends)."""
+
+
+class VertexVectorBackend(VectorBackend):
+    """Vertex AI Vector Search: a stream-updated index deployed to an endpoint."""
+
+    remote = True
+
+    def __init__(self, endpoint, deployed_index_id: str, index=None):
+        # *endpoint* and *index* are SDK objects or resource names; names are
+        # resolved on first use, so e.g. a delete never loads the endpoint.
+        self._endpoint = endpoint
+        self.deployed_index_id = deployed_index_id
+        # Only needed for upsert/delete; query-only callers leave it unset.
+        self._index = index
+
+    @property
+    def endpoint(self):
+        if isinstance(self._endpoint, str):
+            from google.cloud.aiplatform.matching_engine import (
+                MatchingEngineIndexEndpoint,
+            )
+
+            self._endpoint = MatchingEngineIndexEndpoint(
+                index_endpoint_name=self._endpoint
+            )
+        return self._endpoint
+
+    @property
+    def index(self):
+        if isinstance(self._index, str):
+            from google.cloud.aiplatform.matching_engine import MatchingEngineIndex
+
+            self._index = MatchingEngineIndex(index_name=self._index)
+        return self._index
+
+    @classmethod
+    def from_settings(cls, refresh: bool = False) -> "VertexVectorBackend":
+        """
+        Resolves (creating and deploying if necessary) the configured index.
+
+        Resolved resource names are cached in ``VERTEX_RESOURCE_CACHE_PATH``
+        and reused without any control-plane call; *refresh* ignores the
+        cache and resolves them again.
+        """
+        from google.cloud import aiplatform
+
+        aiplatform.init(
+            project=settings.GOOGLE_CLOUD_PROJECT,
+            location=settings.VERTEX_AI_LOCATION,
+        )
+
+        cache_key = "/".join(
+            (
+                settings.GOOGLE_CLOUD_PROJECT,
+                settings.VERTEX_AI_LOCATION,
+                settings.INDEX_DISPLAY_NAME,
+                settings.ENDPOINT_ID,
+            )
+        )
+        cached = None if refresh else _read_resource_cache(cache_key)
+        if cached is not None:
+            return cls(cached["endpoint"], cached["deployed_index_id"], index=cached["index"])
+
+        # Index (create if it does not exist)
+        index = cls._get_or_create_index(settings.INDEX_DISPLAY_NAME)
+
+        # Endpoint (create / deploy if needed)
+        endpoint = cls._get_or_create_endpoint(settings.ENDPOINT_ID)
+        deployed_index_id = cls._get_or_deploy_index_to_endpoint(endpoint, index)
+        _write_resource_cache(
+            cache_key,
+            {
+                "index": index.resource_name,
+                "endpoint": endpoint.resource_name,
+                "deployed_index_id": deployed_index_id,
+            },
+        )
+        return cls(endpoint, deployed_index_id, index=index)
+
+    @classmethod
+    def for_queries(cls, endpoint_id: str, deployed_index_id: str) -> "VertexVectorBackend":
+        """Query-only backend; skips the index lookup control-plane calls."""
+        from google.cloud.aiplatform.matching_engine import MatchingEngineIndexEndpoint
+
+        endpoint = MatchingEngineIndexEndpoint(index_endpoint_name=endpoint_id)
+        return cls(endpoint, deployed_index_id)
+
+    @staticmethod
+    def _get_or_create_index(display_name: str):
+        """Returns a MatchingEngineIndex. Creates one if it doesn’t exist."""
+        from google.cloud.aiplatform.matching_engine import MatchingEngineIndex
+
+        matches = MatchingEngineIndex.list(filter=f'display_name="{display_name}"')
+
+        if matches:
+            return matches[0]
+
+        # STREAM_UPDATE means we can upsert / delete after creation.
+        return MatchingEngineIndex.create_tree_ah_index(
+            display_name=display_name,
+            contents_delta_uri=None,  # no bulk import at creation
+            dimensions=settings.EMBEDDING_DIM,
+            approximate_neighbors_count=150,
+            # distance_measure_type=aiplatform.matching_engine.matching_engine_index_config.DistanceMeasureType.DOT_PRODUCT_DISTANCE,
+            index_update_method="STREAM_UPDATE",
+        )
+
+    @staticmethod
+    def _get_or_create_endpoint(endpoint_id: str):
+        """Returns an index endpoint; creates one if necessary."""
+        from google.cloud import aiplatform
+        from google.cloud.aiplatform.matching_engine import MatchingEngineIndexEndpoint
+
+        try:
+            endpoint = aiplatform.MatchingEngineIndexEndpoint(
+                index_endpoint_name=endpoint_id
+            )
+            return endpoint
+        except:
+            return MatchingEngineIndexEndpoint.create(
+                display_name=settings.ENDPOINT_DISPLAY_NAME,
+                public_endpoint_enabled=True,
+            )
+
+    @staticmethod
+    def _get_or_deploy_index_to_endpoint(endpoint, index) -> str:
+        """Deploys the managed index to the endpoint (if not already deployed)."""
+        # Already deployed?
+        for deployed in endpoint.gca_resource.deployed_indexes:
+            if deployed.index == index.resource_name:
+                return deployed.id  # ← already deployed, just reuse its ID
+
+        # Not yet deployed – deploy now.
+        deployed_index_id = f"deployed_index_{index.resource_name.split('/')[-1]}_v1"
+        endpoint.deploy_index(index=index, deployed_index_id=deployed_index_id)
+        return deployed_index_id
+
+    def upsert(self, ids, vectors) -> None:
+        """
+        Sends datapoints in ``UPSERT_BATCH_SIZE`` batches on a bounded thread
+        pool; a failed batch is retried on its own.
+        """
+        from google.cloud.aiplatform_v1.types import IndexDatapoint
+
+        vectors = np.asarray(vectors, dtype=np.float32).tolist()
+        datapoints = [
+            IndexDatapoint(datapoint_id=i, feature_vector=v)
+            for i, v in zip(ids, vectors)
+        ]
+        batch_size = settings.UPSERT_BATCH_SIZE
+        with ThreadPoolExecutor(max_workers=settings.UPSERT_MAX_WORKERS) as pool:
+            futures = [
+                pool.submit(
+                    call_with_backoff,
+                    self.index.upsert_datapoints,
+                    datapoints=datapoints[i : i + batch_size],
+                    max_attempts=settings.WRITE_MAX_ATTEMPTS,
+                )
+                for i in range(0, len(datapoints), batch_size)
+            ]
+            for future in as_completed(futures):
+                future.result()
+
+    def delete(self, ids) -> None:
+        """Removes datapoints in ``UPSERT_BATCH_SIZE`` batches, like ``upsert``."""
+        ids = list(ids)
+        batch_size = settings.UPSERT_BATCH_SIZE
+        with ThreadPoolExecutor(max_workers=settings.UPSERT_MAX_WORKERS) as pool:
+            futures = [
+                pool.submit(
+                    call_with_backoff,
+                    self.index.remove_datapoints,
+                    datapoint_ids=ids[i : i + batch_size],
+                    max_attempts=settings.WRITE_MAX_ATTEMPTS,
+                )
+                for i in range(0, len(ids), batch_size)
+            ]
+            for future in as_completed(futures):
+                future.result()
+
+    def search(self, queries, top_k, return_vectors=False) -> List[List[Neighbor]]:
+        with metrics.span("rag_find_neighbors_seconds"):
+            response = self.endpoint.find_neighbors(
+                deployed_index_id=self.deployed_index_id,
+                queries=np.asarray(queries, dtype=np.float32).tolist(),
+                num_neighbors=top_k,
+                return_full_datapoint=return_vectors,
+            )
+        return [
+            [
+                Neighbor(
+                    str(n.id),
+                    n.distance,
+                    list(n.feature_vector) if return_vectors else None,
+                )
+                for n in matches
+            ]
+            for matches in response
+        ]
+
+    def get_vectors(self, ids) -> Dict[str, np.ndarray]:
+        datapoints = self.endpoint.read_index_datapoints(
+            deployed_index_id=self.deployed_index_id, ids=list(ids)
+        )
+        return {
+            d.datapoint_id: np.asarray(d.feature_vector, dtype=np.float32)
+            for d in datapoints
+        }
+
+
+def _read_resource_cache(key: str) -> Optional[Dict[str, str]]:
+    path = settings.VERTEX_RESOURCE_CACHE_PATH
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f).get(key)
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable resource cache {path}: {e}")
+        return None
+
+
+def _write_resource_cache(key: str, resources: Dict[str, str]) -> None:
+    path = settings.VERTEX_RESOURCE_CACHE_PATH
+    if not path:
+        return
+    entries = {}
+    if os.path.exists(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            entries = {}
+    entries[key] = resources
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(entries, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def create_backend(
+    kind: Optional[str] = None, query_only: bool = False, refresh: bool = False
+) -> VectorBackend:
+    """
+    Builds the backend named *kind* (default ``settings.VECTOR_BACKEND``).
+
+    ``query_only`` lets serving code skip control-plane setup that only
+    ingestion needs. ``refresh`` re-resolves cached Vertex resource names.
+    """
+    kind = kind or settings.VECTOR_BACKEND
+    if kind == "vertex":
+        if query_only:
+            return VertexVectorBackend.for_queries(
+                settings.ENDPOINT_ID, settings.DEPLOYED_INDEX_ID
+            )
+        return VertexVectorBackend.from_settings(refresh=refresh)
+    if kind == "local" and settings.LOCAL_INDEX_QUANTIZATION:
+        from .quantized_index import QuantizedVectorBackend
+
+        return QuantizedVectorBackend(
+            settings.LOCAL_INDEX_DIR,
+            dim=settings.EMBEDDING_DIM,
+            metric=settings.LOCAL_INDEX_METRIC,
+            quantization=settings.LOCAL_INDEX_QUANTIZATION,
+            pq_subvectors=settings.PQ_SUBVECTORS,
+            rescore=settings.QUANTIZATION_RESCORE,
+        )
+    if kind == "local":
+        from .local_index import LocalVectorBackend
+
+        return LocalVectorBackend(
+            settings.LOCAL_INDEX_DIR,
+            dim=settings.EMBEDDING_DIM,
+            metric=settings.LOCAL_INDEX_METRIC,
+        )
+    if kind == "ivf":
+        from .ivf_index import IVFVectorBackend
+
+        return IVFVectorBackend(
+            settings.LOCAL_INDEX_DIR,
+            dim=settings.EMBEDDING_DIM,
+            metric=settings.LOCAL_INDEX_METRIC,
+            nlist=settings.IVF_NLIST,
+            nprobe=settings.IVF_NPROBE,
+        )
+    raise ValueError(f"Unknown vector backend: {kind!r}")
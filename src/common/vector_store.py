@@ -1,109 +1,131 @@
 # vector_store.py
 from __future__ import annotations
 
-from typing import List, Dict, Any, Optional
-from google.cloud import aiplatform
-from google.cloud.aiplatform.matching_engine import (
-    MatchingEngineIndex,
-    MatchingEngineIndexEndpoint,
-)
-from google.cloud.aiplatform_v1.types import IndexDatapoint
-from google.cloud import firestore
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Sequence, Union
 
+from .chunk_store import ChunkStore, create_chunk_store
 from .config import settings
+from .hybrid import load_lexical_index, search_neighbors, search_neighbors_many
+from .hydration import hydrate_from_store
+from .metrics import metrics
+from .profiling import ingest_profiler
+from .vector_backends import VectorBackend, create_backend
 
 
 class VectorStore:
-    def __init__(self):
-        aiplatform.init(
-            project=settings.GOOGLE_CLOUD_PROJECT,
-            location=settings.VERTEX_AI_LOCATION,
-        )
-
+    def __init__(
+        self,
+        backend: Optional[VectorBackend] = None,
+        embedder=None,
+        chunk_store: Optional[ChunkStore] = None,
+        lexical_path: Optional[str] = None,
+    ):
         self._embedding_dim = settings.EMBEDDING_DIM
         # self._distance_measure_type = distance_measure_type
 
-        # for storing metadata and text mapping
-        self.db = firestore.Client()
+        # for storing metadata and text mapping (Firestore or local, per CHUNK_STORE)
+        self.chunk_store = create_chunk_store() if chunk_store is None else chunk_store
 
-        # Index (create if it does not exist)
-        self.index = self._get_or_create_index(settings.INDEX_DISPLAY_NAME)
+        # Vector index (Vertex AI Vector Search or local, per VECTOR_BACKEND)
+        self.backend = create_backend() if backend is None else backend
 
-        # Endpoint (create / deploy if needed)
-        self.endpoint = self._get_or_create_endpoint(settings.ENDPOINT_ID)
-        self.deployed_index_id = self._get_or_deploy_index_to_endpoint(self.endpoint)
+        # BM25 index over chunk text for hybrid search (None when disabled;
+        # *lexical_path* overrides LEXICAL_INDEX_PATH, '' disables it)
+        self.lexical = load_lexical_index(lexical_path)
 
-    def _get_or_create_index(self, display_name: str) -> MatchingEngineIndex:
-        """Returns a MatchingEngineIndex. Creates one if it doesn’t exist."""
-        matches = MatchingEngineIndex.list(filter=f'display_name="{display_name}"')
-
-        if matches:
-            return matches[0]
-
-        # STREAM_UPDATE means we can upsert / delete after creation.
-        return MatchingEngineIndex.create_tree_ah_index(
-            display_name=display_name,
-            contents_delta_uri=None,  # no bulk import at creation
-            dimensions=self._embedding_dim,
-            approximate_neighbors_count=150,
-            # distance_measure_type=aiplatform.matching_engine.matching_engine_index_config.DistanceMeasureType.DOT_PRODUCT_DISTANCE,
-            index_update_method="STREAM_UPDATE",
-        )
+        # EmbeddingGenerator for text queries in search_many, created on demand
+        self._embedder = embedder
 
-    def _get_or_create_endpoint(self, endpoint_id: str) -> MatchingEngineIndexEndpoint:
-        """Returns an index endpoint; creates one if necessary."""
-        try:
-            endpoint = aiplatform.MatchingEngineIndexEndpoint(
-                index_endpoint_name=endpoint_id
-            )
-            return endpoint
-        except:
-            return MatchingEngineIndexEndpoint.create(
-                display_name=display_name, public_endpoint_enabled=True
+    def upsert_vectors(self, data, collection: Optional[str] = None) -> None:
+        """
+        Upserts embeddings into the index and chunk metadata into the chunk
+        store (Firestore by default), in *collection* (default
+        ``FIRESTORE_COLLECTION``, the collection the agent reads from).
+
+        The backend upsert runs on a worker thread while the chunk store (a
+        Firestore BulkWriter) streams the metadata writes in parallel. Failed datapoint batches and
+        failed individual writes are retried on their own; nothing else is
+        resent.
+        """
+        collection = collection or settings.FIRESTORE_COLLECTION
+        print("Updating index...")
+        start = time.perf_counter()
+        ids = [e["metadata"]["chunk_id"] for e in data]
+        vectors = [e["embedding"] for e in data]
+
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            future = pool.submit(self.backend.upsert, ids, vectors)
+
+            # Metadata writes and lexical indexing overlap with the vector
+            # upsert above.
+            failed_writes = self.chunk_store.write(collection, data)
+            if self.lexical is not None:
+                self.lexical.add_many(zip(ids, (e["text"] for e in data)))
+
+            try:
+                future.result()
+            finally:
+                # Invalidate cached query results even after a partial write.
+                self.chunk_store.bump_version(collection)
+
+        if failed_writes:
+            raise RuntimeError(
+                f"Failed to write {len(failed_writes)} chunk documents: "
+                f"{failed_writes[:10]}"
             )
 
-    def _get_or_deploy_index_to_endpoint(
-        self, endpoint: MatchingEngineIndexEndpoint
-    ) -> str:
-        """Deploys the managed index to the endpoint (if not already deployed)."""
-        # Already deployed?
-        for deployed in endpoint.gca_resource.deployed_indexes:
-            if deployed.index == self.index.resource_name:
-                return deployed.id  # ← already deployed, just reuse its ID
-
-        # Not yet deployed – deploy now.
-        deployed_index_id = (
-            f"deployed_index_{self.index.resource_name.split('/')[-1]}_v1"
+        elapsed = time.perf_counter() - start
+        ingest_profiler.record("upsert", elapsed, chunks=len(data))
+        print(
+            f"Upserted {len(data)} chunks in {elapsed:.1f}s "
+            f"({len(data) / max(elapsed, 1e-9):.1f} chunks/s)"
         )
-        endpoint.deploy_index(index=self.index, deployed_index_id=deployed_index_id)
-        return deployed_index_id
 
-    def upsert_vectors(self, data, collection="rag") -> None:
-        print("Updating index...")
-        datapoints = [
-            IndexDatapoint(datapoint_id=str(i), feature_vector=e["embedding"])
-            for i, e in enumerate(data)
-        ]
-
-        # `upsert_datapoints` (Vertex AI 2.15+)
-        self.index.upsert_datapoints(datapoints=datapoints)
-
-        # update db
-        for item in data:
-            text = item["text"]
-            metadata = item["metadata"]
-            idx = metadata["chunk_index"]
-            file_name = metadata["file_name"]
-            source = metadata["source"]
-            doc_ref = self.db.collection(collection).document(str(idx))
-            doc_ref.set(
-                {"file_path": source, "file_name": file_name, "text": item["text"]}
+    def update_chunk_metadata(
+        self, data, collection: Optional[str] = None
+    ) -> None:
+        """
+        Rewrites the chunk documents of already indexed chunks (e.g. a new
+        ``chunk_index`` after an earlier chunk of the file was inserted)
+        without re-embedding them. *data* are chunks as produced by the
+        processor, without embeddings.
+        """
+        if not data:
+            return
+        collection = collection or settings.FIRESTORE_COLLECTION
+        failed_writes = self.chunk_store.write(collection, data)
+        self.chunk_store.bump_version(collection)
+        if failed_writes:
+            raise RuntimeError(
+                f"Failed to update {len(failed_writes)} chunk documents: "
+                f"{failed_writes[:10]}"
             )
 
-    def delete_vectors(self, vector_ids: List[str], collection="rag") -> None:
-        self.index.remove_datapoints(datapoint_ids=vector_ids)
-        for idx in vector_ids:
-            self.db.collection(collection).document(idx).delete()
+    def delete_vectors(
+        self, vector_ids: List[str], collection: Optional[str] = None
+    ) -> None:
+        if not vector_ids:
+            return
+        collection = collection or settings.FIRESTORE_COLLECTION
+        with ingest_profiler.stage("delete", chunks=len(vector_ids)):
+            self.backend.delete(vector_ids)
+            if self.lexical is not None:
+                self.lexical.remove_many(vector_ids)
+            self.chunk_store.delete(collection, vector_ids)
+            self.chunk_store.bump_version(collection)
+
+    def flush(self) -> None:
+        """
+        Persists local index state (local vector backends, the lexical index,
+        a local chunk store). Called once per checkpoint rather than per batch,
+        since saving rewrites the index files.
+        """
+        self.backend.flush()
+        self.chunk_store.flush()
+        if self.lexical is not None:
+            self.lexical.save()
 
     # ─────────────────────────── ANN / SIMILARITY SEARCH ───────────────────────── #
 
@@ -111,30 +133,61 @@ class VectorStore:
         self,
         query_embedding: List[float],
         top_k: int = 3,
-        collection="rag",
+        collection: Optional[str] = None,
+        query_text: Optional[str] = None,
     ) -> List[Dict[str, Any]]:
         """
-        Runs an ANN lookup against the deployed index endpoint.
+        Runs a nearest-neighbour lookup against the vector backend. With
+        *query_text* and a lexical index, BM25 matches are fused in as well.
+        With ``MMR_FETCH_K`` set, candidates are de-duplicated and diversified
+        with MMR before hydration.
+        """
+        neighbors = search_neighbors(
+            self.backend, self.lexical, query_embedding, query_text, top_k
+        )
+        return self.hydrate([neighbors], collection)[0]
+
+    def search_many(
+        self,
+        queries: Sequence[Union[str, Sequence[float]]],
+        top_k: int = 3,
+        collection: Optional[str] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Batched ``search_vectors``: one result list per query.
+
+        *queries* are either all texts or all embeddings. Texts are embedded
+        in one ``EmbeddingGenerator`` call (and also drive the lexical side of
+        hybrid search), all queries go to the backend in a single neighbour
+        lookup, and every hit is hydrated with one chunk store read.
         """
-        response = self.endpoint.find_neighbors(
-            deployed_index_id=self.deployed_index_id,
-            queries=[query_embedding],
-            num_neighbors=top_k,
+        if not queries:
+            return []
+        if all(isinstance(q, str) for q in queries):
+            texts = list(queries)
+            with metrics.span("rag_query_embedding_seconds"):
+                embeddings = self._get_embedder().embed_texts(texts)
+        elif any(isinstance(q, str) for q in queries):
+            raise TypeError("search_many expects either all texts or all embeddings")
+        else:
+            texts, embeddings = None, list(queries)
+
+        neighbor_lists = search_neighbors_many(
+            self.backend, self.lexical, embeddings, texts, top_k
+        )
+        return self.hydrate(neighbor_lists, collection)
+
+    def hydrate(
+        self, neighbor_lists, collection: Optional[str] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """Chunk text and source for each neighbor list, in one batched read."""
+        return hydrate_from_store(
+            self.chunk_store, collection or settings.FIRESTORE_COLLECTION, neighbor_lists
         )
 
-        # Only one query, so response is a single MatchResponse.
-        try:
-            retrieved_results = []
-            for response_ in response[0]:
-                r = response_.id
-                r = self.db.collection(collection).document(r).get().to_dict()
-                retrieved_results.append(
-                    {
-                        "text": r["text"],
-                        "file_name": r["file_name"],
-                        "file_path": r["file_path"],
-                    }
-                )
-        except:
-            retrieved_results = [{"text": "", "file_name": "", "file_path": ""}]
-        return retrieved_results
+    def _get_embedder(self):
+        if self._embedder is None:
+            from .embedding_generator import EmbeddingGenerator
+
+            self._embedder = EmbeddingGenerator()
+        return self._embedder
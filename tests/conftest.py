@@ -0,0 +1,87 @@
+import hashlib
+import os
+import sys
+import types
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+# Tests import the application as `src.common...`, like the scripts do.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.common.config import settings  # noqa: E402
+from src.common.lexical_index import tokenize  # noqa: E402
+
+
+class HashingEmbedder:
+    """
+    Offline stand-in for ``EmbeddingGenerator``: hashed bag-of-words vectors,
+    L2-normalised, so texts sharing words are close. Counts ``embed_texts``
+    calls.
+    """
+
+    def __init__(self, dim):
+        self.dim = dim
+        self.calls = 0
+
+    def _embed(self, text):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for token in tokenize(text):
+            digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dim
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def embed_texts(self, texts):
+        self.calls += 1
+        if not texts:
+            return np.empty((0, self.dim), dtype=np.float32)
+        return np.stack([self._embed(t) for t in texts])
+
+    def generate_embeddings(self, chunks):
+        for chunk, embedding in zip(chunks, self.embed_texts([c["text"] for c in chunks])):
+            chunk["embedding"] = embedding
+        return chunks
+
+
+@pytest.fixture
+def hashing_embedder():
+    """Factory for ``HashingEmbedder(dim)``."""
+    return HashingEmbedder
+
+
+class FakeEmbeddingModel:
+    """
+    Stands in for ``TextEmbeddingModel``: records each request and raises
+    the errors queued in ``failures`` first.
+    """
+
+    def __init__(self, dim):
+        self.dim = dim
+        self.requests = []
+        self.failures = []
+
+    def get_embeddings(self, texts):
+        self.requests.append(list(texts))
+        if self.failures:
+            raise self.failures.pop(0)
+        return [
+            SimpleNamespace(values=[float(len(t))] + [1.0] * (self.dim - 1))
+            for t in texts
+        ]
+
+
+@pytest.fixture
+def embedding_model(monkeypatch):
+    """Installs a fake ``vertexai`` SDK whose embedding model is returned."""
+    model = FakeEmbeddingModel(settings.EMBEDDING_DIM)
+    language_models = types.ModuleType("vertexai.language_models")
+    language_models.TextEmbeddingModel = SimpleNamespace(from_pretrained=lambda name: model)
+    vertexai = types.ModuleType("vertexai")
+    vertexai.init = lambda **kwargs: None
+    vertexai.language_models = language_models
+    monkeypatch.setitem(sys.modules, "vertexai", vertexai)
+    monkeypatch.setitem(sys.modules, "vertexai.language_models", language_models)
+    return model
@@ -0,0 +1,163 @@
+import hashlib
+import os
+
+import pytest
+
+from src.common.chunk_store import (
+    LocalIndexVersion,
+    MmapChunkStore,
+    create_index_version,
+)
+from src.common.config import settings
+
+
+def chunk(source, index, text):
+    return {
+        "text": text,
+        "metadata": {
+            "chunk_id": hashlib.sha256(f"{source}\0{text}".encode()).hexdigest()[:32],
+            "source": source,
+            "file_name": os.path.basename(source),
+            "chunk_index": index,
+        },
+    }
+
+
+def ids(items):
+    return [item["metadata"]["chunk_id"] for item in items]
+
+
+@pytest.fixture
+def items():
+    return [chunk(f"/docs/f{f}.txt", i, f"héllo {f} {i}") for f in range(5) for i in range(10)]
+
+
+def test_reads_before_and_after_flush(tmp_path, items):
+    store = MmapChunkStore(str(tmp_path))
+    store.write("rag", items)
+    first = ids(items)[0]
+    expected = {"file_path": "/docs/f0.txt", "file_name": "f0.txt", "chunk_index": 0, "text": "héllo 0 0"}
+    assert store.get_many("rag", [first]) == {first: expected}
+    store.flush()
+
+    reopened = MmapChunkStore(str(tmp_path))
+    docs = reopened.get_many("rag", ids(items) + ["0" * 32])
+    assert len(docs) == len(items)
+    assert docs[first] == expected
+
+
+def test_delete_and_rewrite(tmp_path, items):
+    store = MmapChunkStore(str(tmp_path))
+    store.write("rag", items)
+    store.flush()
+    store.delete("rag", ids(items[:10]))
+    store.write("rag", items[:2])  # re-added before the next flush
+    assert set(store.get_many("rag", ids(items[:10]))) == set(ids(items[:2]))
+    store.flush()
+
+    reopened = MmapChunkStore(str(tmp_path))
+    assert set(reopened.get_many("rag", ids(items[:10]))) == set(ids(items[:2]))
+    assert len(reopened.get_many("rag", ids(items))) == len(items) - 8
+
+
+def test_unchanged_chunks_are_not_appended_twice(tmp_path, items):
+    store = MmapChunkStore(str(tmp_path))
+    store.write("rag", items)
+    store.flush()
+    size = os.path.getsize(tmp_path / "rag.blob")
+    store.write("rag", items)
+    assert os.path.getsize(tmp_path / "rag.blob") == size
+
+
+def test_rejects_long_ids(tmp_path):
+    store = MmapChunkStore(str(tmp_path))
+    with pytest.raises(ValueError):
+        store.get_many("rag", ["x" * 33])
+
+
+def test_version_is_visible_to_other_processes_after_flush(tmp_path, items):
+    version = LocalIndexVersion(str(tmp_path), "rag")
+    assert version.get() == 0
+    store = MmapChunkStore(str(tmp_path))
+    store.write("rag", items)
+    store.bump_version("rag")
+    assert version.get() == 0  # not flushed yet
+    store.flush()
+    assert version.get() == 1
+
+
+def test_version_refresh_interval(tmp_path, items):
+    version = LocalIndexVersion(str(tmp_path), "rag", refresh_seconds=3600)
+    assert version.get() == 0
+    store = MmapChunkStore(str(tmp_path))
+    store.bump_version("rag")
+    store.flush()
+    assert version.get() == 0
+
+
+def test_index_version_follows_chunk_store_setting(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "CHUNK_STORE", "local")
+    monkeypatch.setattr(settings, "CHUNK_STORE_PATH", str(tmp_path))
+    assert isinstance(create_index_version("rag"), LocalIndexVersion)
+
+
+def test_len_counts_collections_on_disk(tmp_path, items):
+    store = MmapChunkStore(str(tmp_path))
+    store.write("rag", items)
+    store.write("other", items[:5])
+    store.flush()
+    store.delete("rag", ids(items[:3]) + ["0" * 32])
+    assert len(store) == len(items) + 2
+
+    assert len(MmapChunkStore(str(tmp_path))) == len(items) + 5
+    assert len(MmapChunkStore(str(tmp_path / "missing"))) == 0
+
+
+def test_len_counts_rewritten_chunks_once(tmp_path, items):
+    store = MmapChunkStore(str(tmp_path))
+    store.write("rag", items[:1])
+    store.flush()
+    store.delete("rag", ids(items[:1]))
+    store.write("rag", items[:1])
+    assert len(store) == 1
+
+
+def test_empty_text_is_readable(tmp_path):
+    store = MmapChunkStore(str(tmp_path))
+    item = chunk("/docs/empty.txt", 0, "")
+    store.write("rag", [item])
+    store.flush()
+    reopened = MmapChunkStore(str(tmp_path))
+    assert reopened.get_many("rag", ids([item]))[ids([item])[0]]["text"] == ""
+
+
+def test_reader_sees_chunks_flushed_by_another_store(tmp_path, items):
+    writer = MmapChunkStore(str(tmp_path))
+    writer.write("rag", items[:10])
+    writer.flush()
+    reader = MmapChunkStore(str(tmp_path))
+    assert len(reader.get_many("rag", ids(items[:10]))) == 10
+
+    writer.write("rag", items[10:])
+    writer.delete("rag", ids(items[:2]))
+    writer.bump_version("rag")
+    assert len(reader.get_many("rag", ids(items))) == 10  # not flushed yet
+    writer.flush()
+    docs = reader.get_many("rag", ids(items))
+    assert set(docs) == set(ids(items[2:]))
+    assert docs[ids(items)[-1]]["text"] == items[-1]["text"]
+    assert len(reader) == len(items) - 2
+
+
+def test_rewrite_updates_metadata_without_appending_text(tmp_path, items):
+    store = MmapChunkStore(str(tmp_path))
+    store.write("rag", items[:1])
+    store.flush()
+    size = os.path.getsize(tmp_path / "rag.blob")
+
+    moved = dict(items[0], metadata=dict(items[0]["metadata"], chunk_index=7))
+    store.write("rag", [moved])
+    store.flush()
+    assert os.path.getsize(tmp_path / "rag.blob") == size
+    doc = MmapChunkStore(str(tmp_path)).get_many("rag", ids(items[:1]))[ids(items[:1])[0]]
+    assert doc["chunk_index"] == 7 and doc["text"] == items[0]["text"]
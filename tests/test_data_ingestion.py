@@ -0,0 +1,105 @@
+import pytest
+
+import data_ingestion
+from src.common.chunk_store import MemoryChunkStore
+from src.common.config import settings
+from src.common.local_index import LocalVectorBackend
+from src.common.manifest import IngestManifest
+from src.common.vector_store import VectorStore
+
+DIM = 64
+
+
+@pytest.fixture
+def corpus(tmp_path, monkeypatch, hashing_embedder):
+    docs = tmp_path / "docs"
+    (docs / "sub").mkdir(parents=True)
+    (docs / "a.txt").write_text("annual leave policy " * 20, encoding="utf-8")
+    (docs / "b.txt").write_text("vpn setup guide " * 20, encoding="utf-8")
+    (docs / "sub" / "c.txt").write_text("expense claims " * 20, encoding="utf-8")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(settings, "MANIFEST_PATH", str(tmp_path / "manifest.json"))
+    store = VectorStore(
+        backend=LocalVectorBackend(None, DIM),
+        embedder=hashing_embedder(DIM),
+        chunk_store=MemoryChunkStore(),
+        lexical_path="",
+    )
+    monkeypatch.setattr(data_ingestion, "_vector_store", store)
+    data_ingestion.update_index_from_path("docs")
+    return docs, store
+
+
+def indexed_files():
+    return sorted(IngestManifest(settings.MANIFEST_PATH).files)
+
+
+def test_update_with_another_spelling_adds_nothing(corpus):
+    docs, store = corpus
+    count = len(store.backend)
+    data_ingestion.update_index_from_path(str(docs))
+    data_ingestion.update_index_from_path("./docs/")
+    assert len(store.backend) == count
+    assert len(indexed_files()) == 3
+
+
+def test_remove_path_deletes_only_that_subtree(corpus):
+    docs, store = corpus
+    before = len(store.backend)
+    c_ids = IngestManifest(settings.MANIFEST_PATH).chunk_ids(str(docs / "sub" / "c.txt"))
+    # Spelled differently from the `update` call that ingested it.
+    data_ingestion.remove_paths([str(docs / "sub")])
+    assert len(store.backend) == before - len(c_ids)
+    assert store.chunk_store.get_many("rag", c_ids) == {}
+    assert [p.rsplit("/", 1)[1] for p in indexed_files()] == ["a.txt", "b.txt"]
+
+
+def test_remove_unknown_path_warns(corpus, capsys):
+    _, store = corpus
+    before = len(store.backend)
+    data_ingestion.remove_paths(["elsewhere"])
+    assert len(store.backend) == before
+    assert "Warning: no ingested files" in capsys.readouterr().out
+
+
+def test_sync_updates_changed_and_drops_deleted_files(corpus):
+    docs, store = corpus
+    manifest = IngestManifest(settings.MANIFEST_PATH)
+    old_a = set(manifest.chunk_ids(str(docs / "a.txt")))
+    b_ids = manifest.chunk_ids(str(docs / "b.txt"))
+
+    (docs / "a.txt").write_text("annual leave policy, revised " * 20, encoding="utf-8")
+    (docs / "b.txt").unlink()
+    data_ingestion.sync_paths(["docs/a.txt", "docs/b.txt"])
+
+    manifest = IngestManifest(settings.MANIFEST_PATH)
+    new_a = set(manifest.chunk_ids(str(docs / "a.txt")))
+    assert new_a and new_a != old_a
+    assert store.chunk_store.get_many("rag", list(old_a - new_a)) == {}
+    assert store.chunk_store.get_many("rag", b_ids) == {}
+    assert [p.rsplit("/", 1)[1] for p in indexed_files()] == ["a.txt", "c.txt"]
+
+
+def test_inserted_chunk_updates_positions_of_unchanged_chunks(corpus, monkeypatch):
+    docs, store = corpus
+    monkeypatch.setattr(
+        data_ingestion.processor,
+        "_chunk_text",
+        lambda text: [p for p in text.split("\n\n") if p.strip()],
+    )
+    path = docs / "a.txt"
+    path.write_text("alpha\n\nbeta", encoding="utf-8")
+    data_ingestion.update_index_from_path("docs")
+    old_ids = IngestManifest(settings.MANIFEST_PATH).chunk_ids(str(path))
+
+    path.write_text("intro\n\nalpha\n\nbeta", encoding="utf-8")
+    embedded_before = len(store.backend)
+    data_ingestion.update_index_from_path("docs")
+
+    manifest = IngestManifest(settings.MANIFEST_PATH)
+    ids = manifest.chunk_ids(str(path))
+    assert ids[1:] == old_ids
+    assert len(store.backend) == embedded_before + 1  # only "intro" is new
+    docs_by_id = store.chunk_store.get_many("rag", ids)
+    assert [docs_by_id[i]["chunk_index"] for i in ids] == [0, 1, 2]
+    assert manifest.chunk_indexes(str(path)) == dict(zip(ids, [0, 1, 2]))
@@ -0,0 +1,73 @@
+import numpy as np
+
+from src.common.config import settings
+from src.common.diversify import diversify_neighbors, mmr_select
+from src.common.hybrid import search_neighbors
+from src.common.local_index import LocalVectorBackend
+from src.common.vector_backends import Neighbor
+
+
+class RemoteBackend(LocalVectorBackend):
+    """A local index that fails any vector read, standing in for Vertex AI."""
+
+    remote = True
+
+    def get_vectors(self, ids):
+        raise AssertionError("remote backends must not be read for MMR")
+
+
+def test_mmr_drops_near_duplicates():
+    vectors = np.array([[1, 0, 0], [0.999, 0.01, 0], [0, 1, 0], [0, 0, 1]], dtype=np.float32)
+    relevance = np.array([1.0, 0.99, 0.5, 0.4])
+    assert mmr_select(relevance, vectors, 3, lambda_mult=0.7, dedup_threshold=0.95) == [0, 2, 3]
+
+
+def test_mmr_with_lambda_one_ranks_by_relevance():
+    vectors = np.eye(4, dtype=np.float32)
+    relevance = np.array([0.1, 0.9, 0.5, 0.7])
+    assert mmr_select(relevance, vectors, 4, lambda_mult=1.0) == [1, 3, 2, 0]
+
+
+def test_vectorless_candidates_are_read_from_a_local_backend():
+    backend = LocalVectorBackend(None, 2)
+    backend.upsert(["a", "b", "c"], [[1, 0], [1, 0], [0, 1]])
+    neighbors = [Neighbor("a", 0.9), Neighbor("b", 0.8), Neighbor("c", 0.1)]
+    result = diversify_neighbors(backend, neighbors, 2)
+    # "b" duplicates "a" once its vector is read.
+    assert [n.id for n in result] == ["a", "c"]
+    assert all(n.vector is None for n in result)
+
+
+def test_candidates_missing_from_a_local_backend_keep_their_rank():
+    backend = LocalVectorBackend(None, 2)
+    backend.upsert(["a", "a2", "c"], [[1, 0], [1, 0], [0, 1]])
+    neighbors = [
+        Neighbor("a", 0.9),
+        Neighbor("bm25-only", 0.85),
+        Neighbor("a2", 0.8),
+        Neighbor("c", 0.2),
+    ]
+    result = diversify_neighbors(backend, neighbors, 3)
+    assert [n.id for n in result] == ["a", "bm25-only", "c"]
+
+
+def test_vectorless_candidates_keep_their_rank_on_remote_backends():
+    backend = RemoteBackend(None, 2)
+    neighbors = [
+        Neighbor("a", 0.9, np.array([1, 0])),
+        Neighbor("bm25", 0.85),
+        Neighbor("a2", 0.8, np.array([1, 0])),
+        Neighbor("c", 0.2, np.array([0, 1])),
+    ]
+    result = diversify_neighbors(backend, neighbors, 3)
+    assert [n.id for n in result] == ["a", "bm25", "c"]
+
+
+def test_mmr_is_off_by_default():
+    assert settings.MMR_FETCH_K <= settings.RETRIEVAL_TOP_K
+    backend = RemoteBackend(None, 2)
+    backend.upsert(["a", "b"], [[1, 0], [1, 0]])
+    # Without MMR the backend is not asked for vectors: identical chunks stay.
+    result = search_neighbors(backend, None, [1, 0], "query", 2)
+    assert sorted(n.id for n in result) == ["a", "b"]
+    assert all(n.vector is None for n in result)
@@ -0,0 +1,67 @@
+import numpy as np
+
+from src.common.embedding_cache import EmbeddingCache
+
+
+def vectors(texts):
+    return {t: np.full(4, i, dtype=np.float32) for i, t in enumerate(texts)}
+
+
+def test_round_trip_is_keyed_by_model_and_dim(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite"))
+    cache.put_many("m", 4, vectors(["a", "b"]))
+    found = cache.get_many("m", 4, ["a", "b", "c"])
+    assert set(found) == {"a", "b"}
+    np.testing.assert_array_equal(found["b"], np.ones(4, dtype=np.float32))
+    assert cache.get_many("other", 4, ["a"]) == {}
+    assert cache.get_many("m", 8, ["a"]) == {}
+    assert (cache.hits, cache.misses) == (2, 3)
+
+
+def test_persists_across_instances(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = EmbeddingCache(path)
+    cache.put_many("m", 4, vectors(["a"]))
+    cache.close()
+    assert set(EmbeddingCache(path).get_many("m", 4, ["a"])) == {"a"}
+
+
+def test_evicts_least_recently_used_below_the_limit(tmp_path, monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr("src.common.embedding_cache.time.time", lambda: now[0])
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite"), max_entries=10)
+    for i in range(10):
+        now[0] += 1
+        cache.put_many("m", 4, vectors([f"t{i}"]))
+    now[0] += 1
+    cache.get_many("m", 4, ["t0"])  # t0 is now the most recently used
+    now[0] += 1
+    cache.put_many("m", 4, vectors(["new"]))
+
+    assert cache.stats()["entries"] == 9
+    kept = cache.get_many("m", 4, ["t0", "t1", "t2", "t3", "new"])
+    assert set(kept) == {"t0", "t3", "new"}
+
+
+def test_table_is_not_counted_on_every_insert(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite"), max_entries=100)
+    counts = []
+    cache._conn.set_trace_callback(lambda sql: counts.append(sql) if "COUNT(*)" in sql else None)
+    for i in range(200):
+        cache.put_many("m", 4, vectors([f"t{i}"]))
+    # One count per EVICT_TO slack (10 inserts) after the cache first fills.
+    assert 0 < len(counts) <= 12
+    assert cache.stats()["entries"] <= 100
+
+
+def test_stats_and_misses_do_not_touch_the_table(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite"))
+    cache.put_many("m", 4, vectors(["a", "b"]))
+    statements = []
+    cache._conn.set_trace_callback(statements.append)
+    assert cache.stats()["entries"] == 2
+    assert cache.get_many("m", 4, ["missing"]) == {}
+    assert not [sql for sql in statements if "COUNT(*)" in sql or "UPDATE" in sql]
+    assert "COMMIT" not in statements
+    cache.get_many("m", 4, ["a"])
+    assert any("UPDATE" in sql for sql in statements)
@@ -0,0 +1,48 @@
+import pytest
+from google.api_core import exceptions as api_exceptions
+
+from src.common import retry
+from src.common.config import settings
+from src.common.embedding_generator import EmbeddingGenerator, estimate_tokens
+
+
+@pytest.fixture
+def generator(embedding_model, monkeypatch):
+    monkeypatch.setattr(settings, "EMBED_MAX_BATCH_ITEMS", 4)
+    monkeypatch.setattr(settings, "EMBED_MAX_BATCH_TOKENS", 100)
+    monkeypatch.setattr(retry.time, "sleep", lambda _: None)
+    return EmbeddingGenerator(parallelism=3, persistent_cache=False)
+
+
+def test_batches_are_bounded_by_count_and_tokens(generator):
+    short = "x" * 20  # 6 tokens
+    assert estimate_tokens(short) == 6
+    assert generator._plan_batches([short] * 10) == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]]
+
+    long = "y" * 300  # 76 tokens
+    texts = [short, long, short, long, "z" * 10_000]
+    # Capped at MAX_INPUT_TOKENS, an oversized text still gets its own batch.
+    assert generator._plan_batches(texts) == [[0, 1, 2], [3], [4]]
+    assert generator._plan_batches([]) == []
+
+
+def test_parallel_batches_keep_input_order(generator, embedding_model):
+    texts = [f"text {'w' * i}" for i in range(10)]
+    embeddings = generator.embed_texts(texts)
+    assert embeddings.shape == (10, settings.EMBEDDING_DIM)
+    assert embeddings[:, 0].tolist() == [float(len(t)) for t in texts]
+    assert sorted(len(r) for r in embedding_model.requests) == [2, 4, 4]
+
+
+def test_rate_limited_batch_is_retried_alone(generator, embedding_model):
+    embedding_model.failures = [api_exceptions.ResourceExhausted("quota")]
+    embeddings = generator.embed_texts(["a", "bb", "ccc"])
+    assert embeddings[:, 0].tolist() == [1.0, 2.0, 3.0]
+    assert embedding_model.requests == [["a", "bb", "ccc"]] * 2
+
+
+def test_oversized_request_is_split(generator, embedding_model):
+    embedding_model.failures = [api_exceptions.InvalidArgument("too many tokens")]
+    embeddings = generator.embed_texts(["a", "bb", "ccc"])
+    assert embeddings[:, 0].tolist() == [1.0, 2.0, 3.0]
+    assert embedding_model.requests == [["a", "bb", "ccc"], ["a"], ["bb", "ccc"]]
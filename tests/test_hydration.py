@@ -0,0 +1,50 @@
+from src.common.chunk_store import MemoryChunkStore
+from src.common.hydration import hydrate_from_store
+from src.common.vector_backends import Neighbor
+
+
+class CountingStore(MemoryChunkStore):
+    def __init__(self):
+        super().__init__()
+        self.reads = []
+
+    def get_many(self, collection, ids):
+        self.reads.append(list(ids))
+        return super().get_many(collection, ids)
+
+
+def chunk(chunk_id, text):
+    return {
+        "text": text,
+        "metadata": {
+            "chunk_id": chunk_id,
+            "source": "/docs/a.txt",
+            "file_name": "a.txt",
+            "chunk_index": 0,
+        },
+    }
+
+
+def test_hydrates_many_queries_in_one_read():
+    store = CountingStore()
+    store.write("rag", [chunk("a", "alpha"), chunk("b", "beta")])
+    results = hydrate_from_store(
+        store,
+        "rag",
+        [[Neighbor("b", 0.9), Neighbor("a", 0.5)], [Neighbor("a", 0.8), Neighbor("gone", 0.7)]],
+    )
+    assert store.reads == [["b", "a", "gone"]]
+    assert [[r["id"] for r in rs] for rs in results] == [["b", "a"], ["a"]]
+    assert results[0][0] == {
+        "id": "b",
+        "text": "beta",
+        "file_name": "a.txt",
+        "file_path": "/docs/a.txt",
+        "distance": 0.9,
+    }
+
+
+def test_empty_results_skip_the_read():
+    store = CountingStore()
+    assert hydrate_from_store(store, "rag", [[], []]) == [[], []]
+    assert store.reads == []
@@ -0,0 +1,47 @@
+import numpy as np
+
+from src.common.ivf_index import IVFVectorBackend
+
+DIM = 16
+
+
+def clustered(n, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((8, DIM)) * 5
+    return (centers[rng.integers(0, 8, n)] + rng.standard_normal((n, DIM))).astype(np.float32)
+
+
+def test_untrained_index_searches_exactly():
+    backend = IVFVectorBackend(None, DIM, nlist=4)
+    vectors = clustered(50)
+    backend.upsert([f"v{i}" for i in range(50)], vectors)
+    assert not backend.trained
+    assert backend.search(vectors[:1], 1)[0][0].id == "v0"
+
+
+def test_full_probe_equals_exact_search():
+    vectors = clustered(2000)
+    ids = [f"v{i}" for i in range(2000)]
+    backend = IVFVectorBackend(None, DIM, nlist=16, nprobe=16)
+    backend.upsert(ids, vectors)
+    backend.build()
+    assert backend.trained
+    queries = clustered(10, seed=1)
+    exact = np.argsort(-(queries @ vectors.T), axis=1)[:, :5]
+    results = backend.search(queries, 5)
+    assert [[n.id for n in r] for r in results] == [[ids[j] for j in row] for row in exact]
+
+
+def test_updates_after_training_are_searchable(tmp_path):
+    vectors = clustered(2000)
+    backend = IVFVectorBackend(str(tmp_path), DIM, nlist=16, nprobe=4)
+    backend.upsert([f"v{i}" for i in range(2000)], vectors)
+    backend.build()
+    backend.upsert(["new"], vectors[:1] * 2)
+    backend.delete(["v1"])
+    backend.flush()
+
+    reloaded = IVFVectorBackend(str(tmp_path), DIM, nlist=16, nprobe=4)
+    assert reloaded.trained
+    assert reloaded.search(vectors[:1] * 2, 1)[0][0].id == "new"
+    assert "v1" not in {n.id for n in reloaded.search(vectors[1:2], 10)[0]}
@@ -0,0 +1,78 @@
+from src.common.hybrid import fuse_neighbors, hybrid_search
+from src.common.lexical_index import BM25Index, reciprocal_rank_fusion, tokenize
+from src.common.local_index import LocalVectorBackend
+from src.common.vector_backends import Neighbor
+
+DOCS = [
+    ("d0", "How to reset the router after ERR-404"),
+    ("d1", "Router setup guide for the office network"),
+    ("d2", "Expense policy for travel and meals"),
+    ("d3", "Meals are reimbursed up to the daily limit"),
+]
+
+
+def make_index(path=None):
+    index = BM25Index(path)
+    index.add_many(DOCS)
+    return index
+
+
+def test_tokenize_keeps_codes_whole_and_split():
+    assert tokenize("See ERR-404 now") == ["see", "err-404", "err", "404", "now"]
+
+
+def test_search_ranks_matching_documents():
+    index = make_index()
+    hits = index.search("router reset", 10)
+    assert [doc_id for doc_id, _ in hits] == ["d0", "d1"]
+    assert hits[0][1] > hits[1][1] > 0
+    assert index.search("404", 1)[0][0] == "d0"
+    assert index.search("unrelated words", 5) == []
+
+
+def test_add_replaces_and_remove_drops_documents():
+    index = make_index()
+    index.add_many([("d1", "Expense report template")])
+    index.remove_many(["d0", "missing"])
+    assert len(index) == 3
+    assert index.search("router", 5) == []
+    assert "d1" in [doc_id for doc_id, _ in index.search("expense", 5)]
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = str(tmp_path / "bm25.npz")
+    index = make_index(path)
+    index.remove_many(["d2"])
+    index.save()
+    expected = index.search("meals router", 5)
+
+    loaded = BM25Index(path)
+    assert len(loaded) == 3
+    assert loaded.search("meals router", 5) == expected
+    loaded.add_many([("d4", "Router firmware notes")])
+    assert "d4" in [doc_id for doc_id, _ in loaded.search("router", 5)]
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "d"]], k=60)
+    assert [doc_id for doc_id, _ in fused] == ["b", "a", "d", "c"]
+    assert fused[0][1] == 1 / 62 + 1 / 61
+
+
+def test_fuse_neighbors_keeps_vectors_of_vector_hits():
+    vector_neighbors = [Neighbor("a", 0.9, [1.0]), Neighbor("b", 0.5, [2.0])]
+    fused = fuse_neighbors(vector_neighbors, [("c", 7.0), ("b", 3.0)], top_k=2)
+    assert [n.id for n in fused] == ["b", "a"]
+    assert fused[0].vector == [2.0]
+
+
+def test_hybrid_search_adds_lexical_only_matches():
+    backend = LocalVectorBackend(None, 2)
+    backend.upsert(["d0", "d1", "d2", "d3"], [[1, 0], [0.9, 0.1], [0, 1], [0.1, 0.9]])
+    lexical = make_index()
+
+    plain = hybrid_search(backend, None, [[1, 0]], ["meals"], top_k=2)[0]
+    assert [n.id for n in plain] == ["d0", "d1"]
+
+    fused = hybrid_search(backend, lexical, [[1, 0]], ["meals"], top_k=2, candidates=2)[0]
+    assert {n.id for n in fused} == {"d0", "d2"}
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from src.common.config import settings
+from src.common.local_index import LocalVectorBackend, top_k_indices
+from src.common.vector_backends import create_backend
+
+
+def test_top_k_indices_orders_best_first():
+    scores = np.array([[0.1, 0.9, 0.5, 0.7], [3, 2, 1, 0]])
+    np.testing.assert_array_equal(top_k_indices(scores, 3), [[1, 3, 2], [0, 1, 2]])
+    assert top_k_indices(scores, 10).shape == (2, 4)
+
+
+def test_exact_search_matches_brute_force():
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((200, 8)).astype(np.float32)
+    queries = rng.standard_normal((5, 8)).astype(np.float32)
+    backend = LocalVectorBackend(None, 8)
+    backend.upsert([f"v{i}" for i in range(200)], vectors)
+    results = backend.search(queries, 3)
+    expected = np.argsort(-(queries @ vectors.T), axis=1)[:, :3]
+    assert [[n.id for n in r] for r in results] == [[f"v{j}" for j in row] for row in expected]
+
+
+def test_upsert_replaces_and_delete_swaps_rows():
+    backend = LocalVectorBackend(None, 2)
+    backend.upsert(["a", "b", "c"], [[1, 0], [0, 1], [1, 1]])
+    backend.upsert(["a"], [[0, 5]])
+    backend.delete(["b", "unknown"])
+    assert len(backend) == 2
+    vectors = backend.get_vectors(["c", "a", "b"])
+    assert list(vectors) == ["c", "a"]
+    np.testing.assert_array_equal(vectors["a"], [0, 5])
+    assert backend.search([[0, 1]], 1)[0][0].id == "a"
+
+
+def test_cosine_metric_normalises_vectors():
+    backend = LocalVectorBackend(None, 2, metric="cosine")
+    backend.upsert(["long", "aligned"], [[10, 1], [1, 0]])
+    hits = backend.search([[1, 0]], 2)[0]
+    assert hits[0].id == "aligned"
+    assert hits[0].distance == pytest.approx(1.0)
+
+
+def test_flush_and_reload_memory_maps_vectors(tmp_path):
+    backend = LocalVectorBackend(str(tmp_path), 2)
+    backend.upsert(["a", "b"], [[1, 0], [0, 1]])
+    backend.flush()
+    reloaded = LocalVectorBackend(str(tmp_path), 2)
+    assert isinstance(reloaded._vectors, np.memmap)
+    assert reloaded.search([[0, 1]], 1)[0][0].id == "b"
+    reloaded.upsert(["c"], [[1, 1]])  # copied out of the read-only map
+    assert len(reloaded) == 3
+
+
+def test_reload_rejects_a_different_metric(tmp_path):
+    backend = LocalVectorBackend(str(tmp_path), 2)
+    backend.upsert(["a"], [[1, 0]])
+    backend.flush()
+    with pytest.raises(ValueError):
+        LocalVectorBackend(str(tmp_path), 2, metric="cosine")
+
+
+def test_create_backend_local(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "LOCAL_INDEX_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "LOCAL_INDEX_QUANTIZATION", "")
+    assert type(create_backend("local")) is LocalVectorBackend
+    with pytest.raises(ValueError):
+        create_backend("nope")
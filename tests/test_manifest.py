@@ -0,0 +1,83 @@
+import os
+
+from src.common.manifest import IngestManifest, canonical_path
+from src.common.processor import DocumentProcessor
+
+
+def write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+
+
+def record_all(manifest, file_paths):
+    for fp, sha in manifest.diff(file_paths).changed.items():
+        manifest.record(fp, sha, [f"{os.path.basename(fp)}-0"])
+
+
+def test_diff_reports_new_changed_and_removed(tmp_path):
+    write(tmp_path / "a.txt", "alpha")
+    write(tmp_path / "b.txt", "beta")
+    manifest = IngestManifest(str(tmp_path / "manifest.json"))
+    files = [str(tmp_path / "a.txt"), str(tmp_path / "b.txt")]
+    assert set(manifest.diff(files).changed) == {canonical_path(f) for f in files}
+    record_all(manifest, files)
+
+    write(tmp_path / "a.txt", "alpha, edited")
+    diff = manifest.diff([str(tmp_path / "a.txt")], root_path=str(tmp_path))
+    assert list(diff.changed) == [canonical_path(tmp_path / "a.txt")]
+    assert diff.removed == [canonical_path(tmp_path / "b.txt")]
+
+
+def test_touched_but_unmodified_file_is_not_changed(tmp_path):
+    write(tmp_path / "a.txt", "alpha")
+    manifest = IngestManifest(str(tmp_path / "manifest.json"))
+    record_all(manifest, [str(tmp_path / "a.txt")])
+    os.utime(tmp_path / "a.txt", (1, 1))
+    assert manifest.diff([str(tmp_path / "a.txt")]).changed == {}
+
+
+def test_relative_and_absolute_roots_share_entries(tmp_path, monkeypatch):
+    write(tmp_path / "corpus" / "a.txt", "alpha")
+    write(tmp_path / "corpus" / "sub" / "b.txt", "beta")
+    monkeypatch.chdir(tmp_path)
+    processor = DocumentProcessor(process_workers=0)
+    manifest_path = str(tmp_path / "manifest.json")
+
+    manifest = IngestManifest(manifest_path)
+    record_all(manifest, processor.list_files("corpus"))
+    manifest.save()
+
+    manifest = IngestManifest(manifest_path)
+    for root in (str(tmp_path / "corpus"), "./corpus/", "corpus/sub/.."):
+        diff = manifest.diff(processor.list_files(root), root_path=root)
+        assert diff.changed == {} and diff.removed == []
+    assert len(manifest.files) == 2
+    assert manifest.files_under(str(tmp_path / "corpus" / "sub")) == [
+        canonical_path(tmp_path / "corpus" / "sub" / "b.txt")
+    ]
+
+
+def test_chunk_ids_do_not_depend_on_path_spelling(tmp_path, monkeypatch):
+    write(tmp_path / "corpus" / "a.txt", "alpha")
+    monkeypatch.chdir(tmp_path)
+    processor = DocumentProcessor(process_workers=0)
+
+    def ids(root):
+        return [
+            c["metadata"]["chunk_id"]
+            for _, chunks in processor.iter_processed_files(processor.list_files(root))
+            for c in chunks
+        ]
+
+    assert ids("corpus") == ids(str(tmp_path / "corpus"))
+
+
+def test_legacy_relative_keys_are_canonicalised_on_load(tmp_path, monkeypatch):
+    write(tmp_path / "corpus" / "a.txt", "alpha")
+    monkeypatch.chdir(tmp_path)
+    manifest = IngestManifest(str(tmp_path / "manifest.json"))
+    manifest.files["corpus/a.txt"] = {"sha256": "x", "mtime": 0, "size": 0, "chunk_ids": ["c"]}
+    manifest.save()
+
+    reloaded = IngestManifest(str(tmp_path / "manifest.json"))
+    assert reloaded.chunk_ids(str(tmp_path / "corpus" / "a.txt")) == ["c"]
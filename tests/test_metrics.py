@@ -0,0 +1,44 @@
+from src.common.metrics import MetricsRegistry
+
+
+def test_counter_exposition():
+    registry = MetricsRegistry()
+    registry.counter("turns_total", "Chat turns, by outcome.")
+    registry.inc("turns_total", outcome="ok")
+    registry.inc("turns_total", 2, outcome="ok")
+    registry.inc("turns_total", outcome='say "hi"\n')
+    assert registry.render() == (
+        "# HELP turns_total Chat turns, by outcome.\n"
+        "# TYPE turns_total counter\n"
+        'turns_total{outcome="ok"} 3\n'
+        'turns_total{outcome="say \\"hi\\"\\n"} 1\n'
+    )
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    registry.histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        registry.observe("latency_seconds", value, cache="miss")
+    assert registry.render().splitlines() == [
+        "# HELP latency_seconds Latency.",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{cache="miss",le="0.1"} 2',
+        'latency_seconds_bucket{cache="miss",le="1"} 3',
+        'latency_seconds_bucket{cache="miss",le="+Inf"} 4',
+        'latency_seconds_sum{cache="miss"} 3.650000',
+        'latency_seconds_count{cache="miss"} 4',
+    ]
+
+
+def test_span_observes_elapsed_time_even_on_error():
+    registry = MetricsRegistry()
+    registry.histogram("work_seconds", "Work.")
+    try:
+        with registry.span("work_seconds"):
+            raise RuntimeError("boom")
+    except RuntimeError:
+        pass
+    with registry.span("work_seconds"):
+        pass
+    assert "work_seconds_count 2" in registry.render().splitlines()
@@ -0,0 +1,56 @@
+import time
+
+import pytest
+
+from src.common.pipeline import prefetch
+
+
+def test_items_arrive_in_order():
+    assert list(prefetch(iter(range(100)), maxsize=3)) == list(range(100))
+    assert list(prefetch([], maxsize=3)) == []
+
+
+def test_producer_errors_are_raised_in_the_consumer():
+    def failing():
+        yield 1
+        yield 2
+        raise ValueError("extraction failed")
+
+    consumed = []
+    with pytest.raises(ValueError, match="extraction failed"):
+        for item in prefetch(failing(), maxsize=1):
+            consumed.append(item)
+    assert consumed == [1, 2]
+
+
+def test_bounded_queue_applies_backpressure():
+    produced = []
+
+    def producer():
+        for i in range(50):
+            produced.append(i)
+            yield i
+
+    items = prefetch(producer(), maxsize=2)
+    assert next(items) == 0
+    time.sleep(0.3)
+    # Two queued items plus one blocked in ``put``, besides the one consumed.
+    assert len(produced) <= 4
+    assert list(items) == list(range(1, 50))
+
+
+def test_closing_the_consumer_stops_the_producer():
+    produced = []
+
+    def producer():
+        for i in range(10_000):
+            produced.append(i)
+            yield i
+
+    items = prefetch(producer(), maxsize=2)
+    assert [next(items), next(items)] == [0, 1]
+    items.close()
+    time.sleep(0.3)
+    count = len(produced)
+    time.sleep(0.3)
+    assert len(produced) == count < 10
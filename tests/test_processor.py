@@ -0,0 +1,64 @@
+import threading
+import time
+
+import pytest
+
+from src.common import processor as processor_module
+from src.common.processor import DocumentProcessor
+
+release = threading.Event()
+
+
+class FakeExtractor(DocumentProcessor):
+    """Extraction driven by the file name, without reading any file."""
+
+    def extract_text(self, file_path):
+        if "bad" in file_path:
+            raise ValueError("corrupt file")
+        if "hang" in file_path:
+            release.wait(30)
+        return f"text of {file_path}"
+
+
+def extract_in_worker(file_path):
+    """Process-pool stand-in for ``_extract_in_worker``."""
+    if "hang" in file_path:
+        time.sleep(60)
+    return f"text of {file_path}", 0.0
+
+
+@pytest.fixture(autouse=True)
+def release_hung_threads():
+    release.clear()
+    yield
+    release.set()
+
+
+def test_results_keep_input_order_and_failures_are_isolated():
+    extractor = FakeExtractor(process_workers=0, thread_workers=4)
+    files = [f"f{i}.txt" for i in range(10)] + ["bad.txt", "last.txt"]
+    results = list(extractor._iter_extracted(files, max_in_flight=3))
+    assert [fp for fp, _ in results] == files
+    assert results[0][1] == "text of f0.txt"
+    assert results[10][1] is None
+    assert "corrupt file" in extractor.failed_files["bad.txt"]
+
+
+def test_hung_thread_does_not_block_later_files():
+    extractor = FakeExtractor(process_workers=0, thread_workers=1, file_timeout=0.3)
+    start = time.monotonic()
+    results = dict(extractor._iter_extracted(["hang.txt", "a.txt", "b.txt"]))
+    assert results == {"hang.txt": None, "a.txt": "text of a.txt", "b.txt": "text of b.txt"}
+    assert "timed out" in extractor.failed_files["hang.txt"]
+    assert time.monotonic() - start < 5
+
+
+def test_hung_process_worker_is_terminated(monkeypatch):
+    monkeypatch.setattr(processor_module, "_extract_in_worker", extract_in_worker)
+    extractor = DocumentProcessor(process_workers=1, thread_workers=1, file_timeout=5)
+    start = time.monotonic()
+    results = dict(extractor._iter_extracted(["hang.pdf", "a.pdf"]))
+    assert results["hang.pdf"] is None
+    assert results["a.pdf"] == "text of a.pdf"
+    # Well under the 60s the hung worker would have taken.
+    assert time.monotonic() - start < 30
@@ -0,0 +1,116 @@
+import numpy as np
+import pytest
+
+from src.common.local_index import LocalVectorBackend
+from src.common.quantization import ProductQuantizer, ScalarQuantizer
+from src.common.quantized_index import QuantizedVectorBackend
+
+DIM = 16
+
+
+def random_vectors(n, seed=0):
+    return np.random.default_rng(seed).standard_normal((n, DIM)).astype(np.float32)
+
+
+def test_scalar_scores_match_decoded_inner_products():
+    vectors = random_vectors(500)
+    quantizer = ScalarQuantizer(DIM)
+    quantizer.train(vectors)
+    codes = quantizer.encode(vectors)
+    queries = random_vectors(3, seed=1)
+    expected = queries @ quantizer.decode(codes).T
+    np.testing.assert_allclose(quantizer.scores(queries, codes), expected, rtol=1e-4, atol=1e-4)
+
+
+def test_pq_scores_match_decoded_inner_products():
+    vectors = random_vectors(2000)
+    quantizer = ProductQuantizer(DIM, m=4)
+    quantizer.train(vectors)
+    codes = quantizer.encode(vectors)
+    assert codes.shape == (2000, 4) and codes.dtype == np.uint8
+    queries = random_vectors(3, seed=1)
+    expected = queries @ quantizer.decode(codes).T
+    np.testing.assert_allclose(quantizer.scores(queries, codes), expected, rtol=1e-4, atol=1e-4)
+
+
+def test_pq_rejects_indivisible_dimension():
+    with pytest.raises(ValueError):
+        ProductQuantizer(DIM, m=5)
+
+
+@pytest.mark.parametrize("kind", ["int8", "pq"])
+def test_upsert_auto_trains_with_spare_buffer_capacity(kind):
+    backend = QuantizedVectorBackend(None, DIM, quantization=kind, pq_subvectors=4, rescore=50)
+    backend.MIN_TRAIN_VECTORS = 300
+    vectors = random_vectors(300)
+    ids = [f"v{i}" for i in range(300)]
+    backend.upsert(ids[:200], vectors[:200])
+    assert not backend.trained
+    # Crossing the threshold trains while the buffer holds 1024 rows.
+    backend.upsert(ids[200:], vectors[200:])
+    assert backend.trained
+    assert backend._vectors.shape[0] > len(backend)
+
+    exact = LocalVectorBackend(None, DIM)
+    exact.upsert(ids, vectors)
+    queries = vectors[:20]
+    got = backend.search(queries, top_k=1)
+    want = exact.search(queries, top_k=1)
+    assert [g[0].id for g in got] == [w[0].id for w in want]
+
+
+def test_failed_build_keeps_exact_search(monkeypatch):
+    backend = QuantizedVectorBackend(None, DIM, quantization="int8")
+    backend.upsert([f"v{i}" for i in range(50)], random_vectors(50))
+
+    def broken_encode(self, vectors):
+        raise RuntimeError("encode failed")
+
+    monkeypatch.setattr(ScalarQuantizer, "encode", broken_encode)
+    with pytest.raises(RuntimeError):
+        backend.build()
+    assert not backend.trained
+    assert backend.search(random_vectors(1, seed=2), top_k=3)[0]
+
+
+def test_codes_persist_across_reload(tmp_path):
+    vectors = random_vectors(400)
+    ids = [f"v{i}" for i in range(400)]
+    backend = QuantizedVectorBackend(str(tmp_path), DIM, quantization="int8")
+    backend.upsert(ids, vectors)
+    backend.build()
+    backend.flush()
+
+    reloaded = QuantizedVectorBackend(str(tmp_path), DIM, quantization="int8")
+    assert reloaded.trained
+    assert reloaded.search(vectors[:1], top_k=1)[0][0].id == "v0"
+
+
+def test_updates_keep_float_vectors_on_disk(tmp_path):
+    vectors = random_vectors(1500)
+    ids = [f"v{i}" for i in range(1500)]
+
+    def best(query, live):
+        return ids[live[np.argmax(vectors[live] @ query)]]
+
+    backend = QuantizedVectorBackend(str(tmp_path), DIM, quantization="int8")
+    backend.upsert(ids[:1000], vectors[:1000])
+    backend.build()
+    backend.flush()
+
+    updated = QuantizedVectorBackend(str(tmp_path), DIM, quantization="int8", rescore=50)
+    updated.upsert(ids[1000:], vectors[1000:])  # grows past the file's rows
+    updated.delete(["v0"])
+    assert isinstance(updated._vectors, np.memmap)
+    assert updated.resident_bytes == updated.quantizer.code_size
+    live = np.arange(1, 1500)
+    assert updated.search(vectors[1200:1201], top_k=1)[0][0].id == best(vectors[1200], live)
+
+    # Nothing is visible to other processes before the flush.
+    assert len(QuantizedVectorBackend(str(tmp_path), DIM, quantization="int8")) == 1000
+    updated.flush()
+    reloaded = QuantizedVectorBackend(str(tmp_path), DIM, quantization="int8", rescore=50)
+    assert len(reloaded) == 1499 and reloaded.trained
+    np.testing.assert_array_equal(reloaded.get_vectors(["v1499"])["v1499"], vectors[1499])
+    assert reloaded.search(vectors[1:2], top_k=1)[0][0].id == best(vectors[1], live)
+    assert "v0" not in {n.id for n in reloaded.search(vectors[:1], top_k=5)[0]}
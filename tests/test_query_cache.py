@@ -0,0 +1,87 @@
+from src.common.query_cache import IndexVersion, LRUCache, normalize_query
+
+
+class FakeSnapshot:
+    def __init__(self, data):
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self):
+        return self._data
+
+
+class FakeVersionDoc:
+    """The ``{collection}_meta/index`` document, counting reads."""
+
+    def __init__(self):
+        self.data = None
+        self.reads = 0
+
+    def get(self):
+        self.reads += 1
+        return FakeSnapshot(self.data)
+
+
+class FakeDb:
+    def __init__(self):
+        self.doc = FakeVersionDoc()
+
+    def collection(self, name):
+        assert name == "rag_meta"
+        return self
+
+    def document(self, name):
+        assert name == "index"
+        return self.doc
+
+
+def test_normalize_query():
+    assert normalize_query("  What is\tthe  VPN?\n") == "what is the vpn?"
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(2)
+    cache.put("a", 1, cost=0.5)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # "b" is now the oldest
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (2, 1, 2)
+    assert stats["saved_seconds"] == 0.5
+
+
+def test_lru_ttl_expiry(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("src.common.query_cache.time.monotonic", lambda: now[0])
+    cache = LRUCache(10, ttl=60)
+    cache.put("a", 1)
+    now[0] += 59
+    assert cache.get("a") == 1
+    now[0] += 2
+    assert cache.get("a") is None
+
+
+def test_version_change_invalidates_result_keys():
+    db = FakeDb()
+    version = IndexVersion(db, "rag", refresh_seconds=0)
+    cache = LRUCache(10)
+    cache.put(("vpn", 3, version.get()), ["cached"])
+    db.doc.data = {"version": 1}
+    assert cache.get(("vpn", 3, version.get())) is None
+
+
+def test_version_is_reread_only_after_refresh_interval(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("src.common.query_cache.time.monotonic", lambda: now[0])
+    db = FakeDb()
+    version = IndexVersion(db, "rag", refresh_seconds=5)
+    assert version.get() == 0
+    db.doc.data = {"version": 3}
+    now[0] += 4
+    assert version.get() == 0
+    assert db.doc.reads == 1
+    now[0] += 2
+    assert version.get() == 3
+    assert db.doc.reads == 2
@@ -0,0 +1,11 @@
+from retrieval_benchmark import is_relevant
+
+
+def test_benchmark_relevance_matches_file_and_evidence(tmp_path):
+    result = {"file_path": str(tmp_path / "docs" / "leave.txt"), "text": "25 days of  Annual leave"}
+    label = {"file": "leave.txt", "evidence": "annual leave"}
+    assert is_relevant(result, label, str(tmp_path / "docs"))
+    assert is_relevant(result, label, str(tmp_path / "docs" / "."))
+    assert not is_relevant(result, {"file": "vpn.txt"}, str(tmp_path / "docs"))
+    sick = {"file": "leave.txt", "evidence": "sick leave"}
+    assert not is_relevant(result, sick, str(tmp_path / "docs"))
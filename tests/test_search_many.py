@@ -0,0 +1,74 @@
+import pytest
+
+from src.common.chunk_store import MemoryChunkStore
+from src.common.local_index import LocalVectorBackend
+from src.common.vector_store import VectorStore
+
+DIM = 64
+TEXTS = [
+    "router reset instructions",
+    "office network setup",
+    "travel expense policy",
+    "meal reimbursement limit",
+]
+
+
+class CountingChunkStore(MemoryChunkStore):
+    def __init__(self):
+        super().__init__()
+        self.reads = 0
+
+    def get_many(self, collection, ids):
+        self.reads += 1
+        return super().get_many(collection, ids)
+
+
+@pytest.fixture
+def store(hashing_embedder):
+    embedder = hashing_embedder(DIM)
+    store = VectorStore(
+        backend=LocalVectorBackend(None, DIM),
+        embedder=embedder,
+        chunk_store=CountingChunkStore(),
+        lexical_path="",
+    )
+    data = [
+        {
+            "text": text,
+            "embedding": embedding,
+            "metadata": {
+                "chunk_id": f"c{i}",
+                "source": f"/docs/{i}.txt",
+                "file_name": f"{i}.txt",
+                "chunk_index": 0,
+            },
+        }
+        for i, (text, embedding) in enumerate(zip(TEXTS, embedder.embed_texts(TEXTS)))
+    ]
+    store.upsert_vectors(data)
+    embedder.calls = 0
+    return store
+
+
+def test_text_queries_are_embedded_and_hydrated_once(store):
+    results = store.search_many(["router reset", "meal limit"], top_k=2)
+    assert store._embedder.calls == 1
+    assert store.chunk_store.reads == 1
+    assert [r[0]["id"] for r in results] == ["c0", "c3"]
+    assert results[0][0]["file_name"] == "0.txt"
+    assert results[0][0]["text"] == TEXTS[0]
+
+
+def test_batched_results_match_single_queries(store):
+    queries = ["office network", "expense policy", "router"]
+    batched = store.search_many(queries, top_k=3)
+    embeddings = store._embedder.embed_texts(queries)
+    single = [store.search_vectors(e, top_k=3) for e in embeddings]
+    assert batched == single
+    assert store.search_many(list(embeddings), top_k=3) == single
+
+
+def test_empty_and_mixed_queries(store):
+    assert store.search_many([]) == []
+    with pytest.raises(TypeError):
+        store.search_many(["router", [0.0] * DIM])
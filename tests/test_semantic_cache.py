@@ -0,0 +1,70 @@
+from src.common.config import settings
+from src.common.semantic_cache import ChatAnswerCache, SemanticAnswerCache
+
+SOURCES = [{"file_name": "a.txt", "file_path": "/docs/a.txt"}]
+
+
+def test_lookup_hits_above_threshold_only():
+    cache = SemanticAnswerCache(2, threshold=0.9)
+    cache.put("q", [1, 0], "answer", SOURCES, index_version=1)
+
+    match = cache.lookup([1, 0.1], index_version=1)
+    assert match is not None
+    entry, similarity = match
+    assert entry.answer == "answer" and entry.sources == SOURCES
+    assert similarity > 0.99
+    assert cache.lookup([1, 1], index_version=1) is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_newer_index_version_invalidates_entries():
+    cache = SemanticAnswerCache(2, threshold=0.9)
+    cache.put("q", [1, 0], "old", SOURCES, index_version=1)
+
+    assert cache.lookup([1, 0], index_version=2) is None
+    assert cache.stats()["entries"] == 0
+    assert cache.stats()["invalidations"] == 1
+
+    # Answers generated against an outdated index are not stored.
+    cache.put("q", [1, 0], "stale", SOURCES, index_version=1)
+    assert cache.stats()["entries"] == 0
+    cache.put("q", [1, 0], "new", SOURCES, index_version=2)
+    assert cache.lookup([1, 0], index_version=2)[0].answer == "new"
+
+
+def test_lower_index_version_after_rebuild_invalidates_entries():
+    cache = SemanticAnswerCache(2, threshold=0.9)
+    cache.put("q", [1, 0], "before rebuild", SOURCES, index_version=7)
+
+    assert cache.lookup([1, 0], index_version=0) is None
+    cache.put("q", [1, 0], "after rebuild", SOURCES, index_version=0)
+    assert cache.lookup([1, 0], index_version=0)[0].answer == "after rebuild"
+
+
+def test_chat_cache_bypasses_the_ingestion_embedding_cache(
+    tmp_path, monkeypatch, embedding_model
+):
+    monkeypatch.setattr(settings, "CHUNK_STORE", "local")
+    monkeypatch.setattr(settings, "CHUNK_STORE_PATH", str(tmp_path / "chunks"))
+    monkeypatch.setattr(settings, "EMBEDDING_CACHE_PATH", str(tmp_path / "cache.sqlite"))
+    chat = ChatAnswerCache()
+    assert chat.embedder.cache is None
+
+    answer, key = chat.lookup("What is the travel policy?")
+    assert answer is None
+    chat.store("What is the travel policy?", key, "See a.txt", SOURCES)
+    assert chat.lookup("What is the travel policy?")[0].answer == "See a.txt"
+    assert not (tmp_path / "cache.sqlite").exists()
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = SemanticAnswerCache(2, threshold=0.9, max_entries=2)
+    cache.put("a", [1, 0], "A", SOURCES, index_version=1)
+    cache.put("b", [0, 1], "B", SOURCES, index_version=1)
+    assert cache.lookup([1, 0], index_version=1)[0].answer == "A"
+
+    cache.put("c", [-1, 0], "C", SOURCES, index_version=1)
+    assert cache.lookup([0, 1], index_version=1) is None
+    assert cache.lookup([1, 0], index_version=1)[0].answer == "A"
+    assert cache.lookup([-1, 0], index_version=1)[0].answer == "C"
+    assert cache.stats()["evictions"] == 1
@@ -0,0 +1,118 @@
+import asyncio
+import itertools
+
+import pytest
+
+from src.common.session_pool import AgentSessionPool
+
+
+class FakeAgentEngine:
+    def __init__(self):
+        self._ids = itertools.count()
+        self.deleted = []
+
+    def create_session(self, user_id):
+        return {"id": f"s{next(self._ids)}"}
+
+    def delete_session(self, user_id, session_id):
+        self.deleted.append(session_id)
+
+    def stream_query(self, user_id, session_id, message):
+        if message == "fail":
+            raise RuntimeError("upstream error")
+        for word in message.split():
+            yield {"session": session_id, "text": word}
+
+
+def run(coro_fn, **kwargs):
+    async def main():
+        pool = AgentSessionPool(FakeAgentEngine(), **kwargs)
+        try:
+            return await coro_fn(pool)
+        finally:
+            await asyncio.gather(*pool._deletions)
+            await pool.close()
+
+    return asyncio.run(main())
+
+
+def test_turns_of_one_client_are_serialized():
+    async def scenario(pool):
+        order = []
+        release = asyncio.Event()
+
+        async def turn(client_id, name, hold=False):
+            async with pool.session(client_id) as session_id:
+                order.append((name, "start", session_id))
+                if hold:
+                    await release.wait()
+                order.append((name, "end", session_id))
+
+        first = asyncio.create_task(turn("alice", "a1", hold=True))
+        await asyncio.sleep(0.05)
+        second = asyncio.create_task(turn("alice", "a2"))
+        other = asyncio.create_task(turn("bob", "b1"))
+        await asyncio.wait_for(other, 1)
+        assert [name for name, *_ in order] == ["a1", "b1", "b1"]
+        release.set()
+        await asyncio.gather(first, second)
+        return order
+
+    order = run(scenario)
+    alice = [(name, event) for name, event, _ in order if name.startswith("a")]
+    assert alice == [("a1", "start"), ("a1", "end"), ("a2", "start"), ("a2", "end")]
+    sessions = {name[0]: session_id for name, _, session_id in order}
+    assert sessions["a"] != sessions["b"]
+
+
+def test_idle_sessions_are_evicted_unless_in_a_turn():
+    async def scenario(pool):
+        await pool.start()
+        async with pool.session("idle"):
+            pass
+        async with pool.session("busy"):
+            pool._sessions["idle"].last_used -= 60
+            pool._sessions["busy"].last_used -= 60
+            await asyncio.sleep(1.2)  # one eviction pass
+            assert set(pool._sessions) == {"busy"}
+        return pool.stats()
+
+    stats = run(scenario, idle_seconds=1, warm_sessions=0)
+    assert stats["sessions"] == 1
+    assert stats["sessions_evicted"] == 1
+
+
+def test_session_cap_evicts_least_recently_used_idle_sessions():
+    async def scenario(pool):
+        for client_id in ["a", "b", "c"]:
+            async with pool.session(client_id):
+                pass
+        assert list(pool._sessions) == ["b", "c"]
+
+        # "b" is mid-turn and must survive; "c" goes instead.
+        async with pool.session("b"):
+            async with pool.session("d"):
+                pass
+            assert list(pool._sessions) == ["b", "d"]
+            async with pool.session("e"):
+                pass
+            assert list(pool._sessions) == ["b", "e"]
+        await asyncio.gather(*pool._deletions)
+        return pool.agent_engine.deleted
+
+    deleted = run(scenario, max_sessions=2, warm_sessions=0)
+    assert sorted(deleted) == ["s0", "s2", "s3"]
+
+
+def test_stream_query_yields_events_and_raises_upstream_errors():
+    async def scenario(pool):
+        events = [e async for e in pool.stream_query("alice", "hello there")]
+        with pytest.raises(RuntimeError, match="upstream error"):
+            async for _ in pool.stream_query("alice", "fail"):
+                pass
+        return events, pool.stats()
+
+    events, stats = run(scenario, warm_sessions=0)
+    assert [e["text"] for e in events] == ["hello", "there"]
+    assert stats["active_streams"] == 0
+    assert stats["sessions_created"] == 1
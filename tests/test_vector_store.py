@@ -0,0 +1,126 @@
+import numpy as np
+import pytest
+from google.api_core import exceptions as api_exceptions
+
+from src.common import retry
+from src.common.chunk_store import (
+    MemoryChunkStore,
+    create_chunk_store,
+    create_index_version,
+)
+from src.common.config import settings
+from src.common.hydration import hydrate_from_store
+from src.common.local_index import LocalVectorBackend
+from src.common.retry import call_with_backoff
+from src.common.vector_backends import VertexVectorBackend
+from src.common.vector_store import VectorStore
+
+DIM = 4
+
+
+def embedded(n, start=0):
+    return [
+        {
+            "text": f"chunk {i}",
+            "embedding": np.full(DIM, i + 1, dtype=np.float32),
+            "metadata": {
+                "chunk_id": f"c{i}",
+                "source": "/docs/a.txt",
+                "file_name": "a.txt",
+                "chunk_index": i,
+            },
+        }
+        for i in range(start, start + n)
+    ]
+
+
+class FailingChunkStore(MemoryChunkStore):
+    def write(self, collection, data):
+        super().write(collection, data)
+        return [data[0]["metadata"]["chunk_id"]]
+
+
+class FakeIndex:
+    def __init__(self):
+        self.calls = []
+
+    def remove_datapoints(self, datapoint_ids):
+        self.calls.append(list(datapoint_ids))
+
+    def upsert_datapoints(self, datapoints):
+        self.calls.append([d.datapoint_id for d in datapoints])
+
+
+def make_store(chunk_store=None):
+    return VectorStore(
+        backend=LocalVectorBackend(None, DIM),
+        chunk_store=MemoryChunkStore() if chunk_store is None else chunk_store,
+        lexical_path="",
+    )
+
+
+def test_upsert_writes_vectors_and_chunks_and_bumps_version():
+    store = make_store()
+    store.upsert_vectors(embedded(3))
+    assert len(store.backend) == 3
+    assert store.chunk_store.get_many("rag", ["c1"])["c1"]["text"] == "chunk 1"
+    assert store.chunk_store.versions["rag"] == 1
+
+    store.delete_vectors(["c0", "c1"])
+    assert len(store.backend) == 1
+    assert store.chunk_store.get_many("rag", ["c0", "c1", "c2"]).keys() == {"c2"}
+    assert store.chunk_store.versions["rag"] == 2
+
+
+def test_failed_chunk_writes_raise_but_still_invalidate_caches():
+    store = make_store(FailingChunkStore())
+    with pytest.raises(RuntimeError, match="c0"):
+        store.upsert_vectors(embedded(2))
+    assert store.chunk_store.versions["rag"] == 1
+
+
+def test_ingest_and_retrieval_share_the_configured_collection(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "FIRESTORE_COLLECTION", "docs")
+    monkeypatch.setattr(settings, "CHUNK_STORE_PATH", str(tmp_path / "chunks"))
+    store = make_store(create_chunk_store("local"))
+    store.upsert_vectors(embedded(2))
+    store.flush()
+
+    # What the agent's RetrievalContext opens.
+    chunk_store = create_chunk_store("local")
+    version = create_index_version(settings.FIRESTORE_COLLECTION, kind="local")
+    neighbors = store.backend.search([np.ones(DIM)], 2)
+    results = hydrate_from_store(chunk_store, settings.FIRESTORE_COLLECTION, neighbors)
+    assert {r["id"] for r in results[0]} == {"c0", "c1"}
+    assert version.get() == 1
+    assert store.search_vectors(np.ones(DIM), top_k=2) == results[0]
+
+
+def test_call_with_backoff_retries_transient_errors(monkeypatch):
+    monkeypatch.setattr(retry.time, "sleep", lambda _: None)
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise api_exceptions.ServiceUnavailable("try again")
+        return "ok"
+
+    assert call_with_backoff(flaky, max_attempts=5) == "ok"
+    assert len(attempts) == 3
+
+    with pytest.raises(ValueError):
+        call_with_backoff(lambda: (_ for _ in ()).throw(ValueError("permanent")))
+
+
+def test_vertex_writes_are_sent_in_batches(monkeypatch):
+    monkeypatch.setattr(settings, "UPSERT_BATCH_SIZE", 4)
+    index = FakeIndex()
+    backend = VertexVectorBackend("endpoint", "deployed", index=index)
+    backend.delete([f"id{i}" for i in range(10)])
+    assert sorted(len(c) for c in index.calls) == [2, 4, 4]
+
+    pytest.importorskip("google.cloud.aiplatform_v1")
+    index.calls.clear()
+    backend.upsert([f"id{i}" for i in range(10)], np.zeros((10, DIM)))
+    assert sorted(len(c) for c in index.calls) == [2, 4, 4]
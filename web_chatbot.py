@@ -1,23 +1,72 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, render_template, request, jsonify, stream_with_context
 from google import adk
-from typing import List, Dict, Any
+from typing import Iterator, List, Dict, Any, Tuple
 from vertexai import agent_engines
 import vertexai
 
+from src.common.chat_events import TurnRecorder, TurnTimer, format_sse, parse_agent_event
+from src.common.config import settings
+from src.common.metrics import CONTENT_TYPE, metrics
+from src.common.semantic_cache import create_answer_cache
+
 app = Flask(__name__)
 
 # Initialize the agent engine
-agent_engine = vertexai.agent_engines.get(
-    "projects/163097687798/locations/us-central1/reasoningEngines/8537074470983041024"
-)
+agent_engine = vertexai.agent_engines.get(settings.AGENT_ENGINE_RESOURCE)
 session = agent_engine.create_session(user_id="test_user")
 
+# Serves answers to paraphrased repeat questions without calling the agent.
+answer_cache = create_answer_cache()
+
 
 @app.route("/")
 def home():
     return render_template("index.html")
 
 
+def iter_chat_events(query: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Yields ``(event_type, payload)`` pairs for one agent turn as the agent
+    engine produces them: ``text`` for model output, ``tool_call`` and
+    ``tool_result`` for tool activity, then ``sources`` with the documents
+    the answer cites. Answers to questions similar enough to one already
+    answered come from the semantic cache instead (``cached`` is set on the
+    ``sources`` event).
+    """
+    timer = TurnTimer()
+    cache_key = None
+    if answer_cache is not None:
+        try:
+            with metrics.span("chat_answer_cache_lookup_seconds"):
+                cached, cache_key = answer_cache.lookup(query)
+        except Exception as e:
+            print(f"Answer cache lookup failed: {e}")
+            cached = None
+        if cached is not None:
+            timer.finish("cached")
+            yield "text", {"text": cached.answer}
+            yield "sources", {"sources": cached.sources, "cached": True}
+            return
+
+    turn = TurnRecorder()
+    try:
+        for event in agent_engine.stream_query(
+            user_id="test_user", session_id=session["id"], message=query
+        ):
+            for event_type, payload in parse_agent_event(event):
+                timer.record(event_type)
+                turn.record(event_type, payload)
+                yield event_type, payload
+    except Exception:
+        timer.finish("error")
+        raise
+    timer.finish("agent")
+    yield "sources", {"sources": turn.sources, "cached": False}
+
+    if cache_key is not None:
+        answer_cache.store(query, cache_key, turn.text, turn.sources)
+
+
 @app.route("/chat", methods=["POST"])
 def chat():
     query = request.json.get("message", "")
@@ -25,16 +74,56 @@ def chat():
         return jsonify({"response": "Please enter a message"})
 
     response_text = ""
-    for event in agent_engine.stream_query(
-        user_id="test_user", session_id=session["id"], message=query
-    ):
-        text = event["content"]["parts"][0].get("text", None)
-        role = event["content"]["role"]
-        if (text is not None) and (role == "model"):
-            response_text += text
+    for event_type, payload in iter_chat_events(query):
+        if event_type == "text":
+            response_text += payload["text"]
 
     return jsonify({"response": response_text})
 
 
+@app.route("/chat/stream", methods=["POST"])
+def chat_stream():
+    """
+    Same as ``/chat`` but streams the answer as Server-Sent Events, so the
+    browser can render text as soon as the first token arrives.
+    """
+    query = request.json.get("message", "")
+
+    def generate():
+        if not query.strip():
+            yield format_sse("text", {"text": "Please enter a message"})
+            yield format_sse("done", {})
+            return
+        try:
+            for event_type, payload in iter_chat_events(query):
+                yield format_sse(event_type, payload)
+        except Exception as e:
+            print(f"Streaming query failed: {e}")
+            yield format_sse("error", {"message": "Could not get response from the agent"})
+        yield format_sse("done", {})
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            # Stop reverse proxies from buffering the stream.
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+
+@app.route("/cache/stats")
+def cache_stats():
+    """Hit rate and size of the semantic answer cache."""
+    return jsonify(answer_cache.stats() if answer_cache is not None else {})
+
+
+@app.route("/metrics")
+def metrics_endpoint():
+    """Latency histograms and counters in the Prometheus text format."""
+    return Response(metrics.render(), mimetype=CONTENT_TYPE)
+
+
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=8000)
+    app.run(host="0.0.0.0", port=8000, threaded=True)
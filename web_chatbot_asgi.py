@@ -0,0 +1,149 @@
+import asyncio
+import uuid
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+import uvicorn
+import vertexai
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
+
+from src.common.chat_events import TurnRecorder, TurnTimer, format_sse, parse_agent_event
+from src.common.config import settings
+from src.common.metrics import CONTENT_TYPE, metrics
+from src.common.semantic_cache import create_answer_cache
+from src.common.session_pool import AgentSessionPool
+
+# Browser identity; each value maps to its own agent session.
+CLIENT_COOKIE = "chat_client_id"
+INDEX_HTML = (Path(__file__).parent / "templates" / "index.html").read_text(
+    encoding="utf-8"
+)
+
+agent_engine = vertexai.agent_engines.get(settings.AGENT_ENGINE_RESOURCE)
+pool = AgentSessionPool(
+    agent_engine,
+    max_concurrent_streams=settings.CHAT_MAX_CONCURRENT_STREAMS,
+    idle_seconds=settings.CHAT_SESSION_IDLE_SECONDS,
+    max_sessions=settings.CHAT_MAX_SESSIONS,
+    warm_sessions=settings.CHAT_WARM_SESSIONS,
+)
+answer_cache = create_answer_cache()
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    await pool.start()
+    yield
+    await pool.close()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+def client_id_of(request: Request) -> str:
+    return request.cookies.get(CLIENT_COOKIE) or uuid.uuid4().hex
+
+
+def with_client_cookie(response, client_id: str):
+    response.set_cookie(CLIENT_COOKIE, client_id, httponly=True, samesite="lax")
+    return response
+
+
+@app.get("/", response_class=HTMLResponse)
+async def home(request: Request):
+    return with_client_cookie(HTMLResponse(INDEX_HTML), client_id_of(request))
+
+
+async def chat_events(client_id: str, query: str):
+    """Async counterpart of ``web_chatbot.iter_chat_events``."""
+    timer = TurnTimer()
+    cache_key = None
+    if answer_cache is not None:
+        try:
+            with metrics.span("chat_answer_cache_lookup_seconds"):
+                cached, cache_key = await asyncio.to_thread(answer_cache.lookup, query)
+        except Exception as e:
+            print(f"Answer cache lookup failed: {e}")
+            cached = None
+        if cached is not None:
+            timer.finish("cached")
+            yield "text", {"text": cached.answer}
+            yield "sources", {"sources": cached.sources, "cached": True}
+            return
+
+    turn = TurnRecorder()
+    try:
+        async for event in pool.stream_query(client_id, query):
+            for event_type, payload in parse_agent_event(event):
+                timer.record(event_type)
+                turn.record(event_type, payload)
+                yield event_type, payload
+    except Exception:
+        timer.finish("error")
+        raise
+    timer.finish("agent")
+    yield "sources", {"sources": turn.sources, "cached": False}
+
+    if cache_key is not None:
+        answer_cache.store(query, cache_key, turn.text, turn.sources)
+
+
+@app.post("/chat")
+async def chat(request: Request):
+    client_id = client_id_of(request)
+    query = (await request.json()).get("message", "")
+    if not query.strip():
+        return JSONResponse({"response": "Please enter a message"})
+
+    response_text = ""
+    async for event_type, payload in chat_events(client_id, query):
+        if event_type == "text":
+            response_text += payload["text"]
+    return with_client_cookie(JSONResponse({"response": response_text}), client_id)
+
+
+@app.post("/chat/stream")
+async def chat_stream(request: Request):
+    """Server-Sent Events version of ``/chat`` (same events as web_chatbot.py)."""
+    client_id = client_id_of(request)
+    query = (await request.json()).get("message", "")
+
+    async def generate():
+        if not query.strip():
+            yield format_sse("text", {"text": "Please enter a message"})
+            yield format_sse("done", {})
+            return
+        try:
+            async for event_type, payload in chat_events(client_id, query):
+                yield format_sse(event_type, payload)
+        except Exception as e:
+            print(f"Streaming query failed: {e}")
+            yield format_sse("error", {"message": "Could not get response from the agent"})
+        yield format_sse("done", {})
+
+    response = StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+    return with_client_cookie(response, client_id)
+
+
+@app.get("/stats")
+async def stats():
+    """Session pool and answer cache counters."""
+    return {
+        "sessions": pool.stats(),
+        "answer_cache": answer_cache.stats() if answer_cache is not None else {},
+    }
+
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Latency histograms and counters in the Prometheus text format."""
+    return Response(metrics.render(), media_type=CONTENT_TYPE)
+
+
+if __name__ == "__main__":
+    uvicorn.run(app, host=settings.HOST, port=settings.PORT)